@@ -3,17 +3,60 @@ import sys
 from pathlib import Path
 
 GLOBAL_TIMEOUT = 1.5
+ASYNC_MAX_CONCURRENCY = 500
+ASYNC_MAX_REDIRECTS = 5
+POOL_MAXSIZE = 32
+POOL_IDLE_TIMEOUT = 30.0
+POOL_MAX_REDIRECTS = 5
+RETRY_ATTEMPTS = 3
+RETRY_BACKOFF_BASE = 0.1
+RETRY_BACKOFF_MAX = 1.0
+CIRCUIT_BREAKER_FAILURE_THRESHOLD = 5
+CIRCUIT_BREAKER_RESET_TIMEOUT = 30.0
+HEDGE_PERCENTILE = 95
+HEDGE_INITIAL_DELAY = 0.5
+HEDGE_HISTORY_SIZE = 256
+HEDGE_MAX_WORKERS = 64
+RATE_LIMIT_PER_SECOND = 20.0
+RATE_LIMIT_BURST = 20
+RATE_LIMIT_MAX_CONCURRENCY = 10
+AIMD_INITIAL_LIMIT = 4
+AIMD_MIN_LIMIT = 1
+AIMD_MAX_LIMIT = 64
+AIMD_INCREASE_STEP = 1.0
+AIMD_DECREASE_FACTOR = 0.5
+AIMD_LATENCY_THRESHOLD = GLOBAL_TIMEOUT
+# Cities submitted to the fetch pool ahead of completed ones
+FETCH_MAX_PENDING_CITIES = 1024
+# Shipped with the code, so it does not depend on working directory
+CITY_CATALOG_PATH = Path(__file__).parent / "cities.csv"
+# Cities with own latency histograms, the rest are recorded together
+LATENCY_MAX_LABELS = 1024
+PIPELINE_QUEUE_MAXSIZE = 64
+PIPELINE_POLL_INTERVAL = 0.1
+# How long a stopped pipeline waits for its fetch thread, requests still running are abandoned
+PIPELINE_JOIN_TIMEOUT = GLOBAL_TIMEOUT
+# Cities analyzed by one call of a pool worker with engines reducing over many forecasts at once
+ANALYZE_BATCH_SIZE = 32
+# Forecasts held in memory between fetch and aggregation, None disables the limit
+IN_FLIGHT_MAX_FORECASTS = 256
+IN_FLIGHT_MAX_BYTES = 256 * 1024 * 1024
 SAVE_JSON_DIR = Path("./weather_data")
 ANALYZE_DIR = Path("./analyze_data")
 SAVE_JSON_DIR.mkdir(parents=True, exist_ok=True)
 ANALYZE_DIR.mkdir(parents=True, exist_ok=True)
 AGGREGATED_DATA_CSV_PATH = Path("./aggregated_data.csv")
+HTTP_CACHE_ENABLED = True
+HTTP_CACHE_DIR = Path("./http_cache")
+FORECAST_CACHE_MAXSIZE = 1024
+FORECAST_CACHE_TTL = 600.0
 
 UNEXPECTED_ERROR_MESSAGE_TEMPLATE = "Unexpected error: {error}"
 KEY_ERROR_MESSAGE_TEMPLATE = "Dictionary key does not exist: {error}"
 BAD_DATA_FROM_RESPONSE_MESSAGE_TEMPLATE = "Bad JSON data from response: {error}"
 BAD_REQUEST_MESSAGE_TEMPLATE = "Bad API request: {error}"
 API_ERROR_MESSAGE_TEMPLATE = "Something wrong with API: {error}"
+RETRY_MESSAGE_TEMPLATE = "Attempt {attempt} failed, retrying in {delay:.3f}s: {error}"
 ANALYZE_COMMAND_ERROR_MESSAGE_TEMPLATE = "Analyze command error [Code {exit_code}]: {error}"
 
 # Logging
@@ -1,2 +1,3 @@
 from .client import YandexWeatherAPI  # noqa
-from . import client, utils, exceptions, schemas  # noqa
+from .async_client import AsyncYandexWeatherAPI  # noqa
+from . import client, async_client, utils, exceptions, schemas  # noqa
@@ -1,10 +1,23 @@
 import argparse
+import bisect
+import copy
+import glob
 import json
 import logging
+import os
+import re
+import sys
 from dataclasses import dataclass, field
 from functools import reduce
-from operator import getitem
-from typing import Optional, List, Dict
+from itertools import islice
+from operator import getitem, le
+from typing import Any, Callable, Optional, List, Dict, IO, Iterable, Sequence, Tuple
+
+if __name__ == "__main__":  # run as a script, the external package lives in its parent directory
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from external.conditions import condition_registry  # noqa: E402
+from external.json_stream import extract_json  # noqa: E402
 
 PATH_FROM_INPUT = "../../examples/response.json"
 PATH_TO_OUTPUT = "../../examples/output.json"
@@ -40,9 +53,40 @@ INPUT_DAY_SUITABLE_CONDITIONS = [
     # "thunderstorm-with-hail"
 ]
 
+
+@dataclass(frozen=True)
+class AnalysisPolicy:
+    """
+    Day window (inclusive) and conditions counted as suitable.
+    Conditions are compiled on creation into a bitmask over condition codes and a lookup table,
+    so policies are built once and the compiled form is what gets pickled to workers.
+    """
+    hours_start: int = INPUT_DAY_HOURS_START
+    hours_end: int = INPUT_DAY_HOURS_END
+    suitable_conditions: Tuple[str, ...] = tuple(INPUT_DAY_SUITABLE_CONDITIONS)
+    suitable_conditions_mask: int = field(init=False, repr=False, compare=False)
+    # suitable_conditions_table[code] is 1 for suitable condition codes, for vectorized lookups
+    suitable_conditions_table: bytes = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        if self.hours_start > self.hours_end:
+            raise ValueError(f"Empty hours window: {self.hours_start}..{self.hours_end}")
+
+        # object.__setattr__ as the dataclass is frozen
+        object.__setattr__(self, "suitable_conditions", tuple(self.suitable_conditions))
+        mask = condition_registry.get_mask(self.suitable_conditions)
+        object.__setattr__(self, "suitable_conditions_mask", mask)
+        object.__setattr__(self, "suitable_conditions_table", condition_registry.get_lookup_table(mask))
+
+    def is_cond_suitable(self, condition_code: int) -> bool:
+        return condition_registry.is_in_mask(condition_code, self.suitable_conditions_mask)
+
+
+DEFAULT_ANALYSIS_POLICY = AnalysisPolicy()
+
 OUTPUT_RAW_DATA_KEY = "raw_data"
 OUTPUT_DAYS_KEY = "days"
-DEFAULT_OUTPUT_RESULT = {
+DEFAULT_OUTPUT_RESULT: Dict[str, Any] = {
     OUTPUT_DAYS_KEY: [],
     # OUTPUT_RAW_DATA_KEY: None,
 }
@@ -55,7 +99,45 @@ def deep_getitem(obj, path: str):
         return None
 
 
-def load_data(input_path: str = PATH_FROM_INPUT):
+def sort_by_key(items: Sequence, key: Callable[[Any], Any]) -> Tuple[List, Sequence]:
+    """
+    Keys of items and items in ascending key order, stable for equal keys.
+    Items that are already sorted (as API responses are) are returned without copying.
+    """
+    keys = [key(item) for item in items]
+    if all(map(le, keys, islice(keys, 1, None))):
+        return keys, items
+
+    order = sorted(range(len(keys)), key=keys.__getitem__)
+    return [keys[index] for index in order], [items[index] for index in order]
+
+
+def get_day_key(day_data) -> str:
+    return deep_getitem(day_data, INPUT_DATE_PATH) or ""
+
+
+def sort_days(days_data: Sequence) -> Sequence:
+    """Days with data in ascending date order, empty days keep their positions"""
+    positions = [position for position, day_data in enumerate(days_data) if day_data]
+    dated_days = [days_data[position] for position in positions]
+    _, sorted_days = sort_by_key(dated_days, get_day_key)
+    if sorted_days is dated_days:
+        return days_data
+
+    days_data = list(days_data)
+    for position, day_data in zip(positions, sorted_days):
+        days_data[position] = day_data
+    return days_data
+
+
+READ_CHUNK_SIZE = 64 * 1024
+
+
+def load_data(input_path: str = PATH_FROM_INPUT, selective: bool = False):
+    if selective:
+        with open(input_path, mode="rb") as file:
+            return extract_json(iter(lambda: file.read(READ_CHUNK_SIZE), b""))
+
     with open(input_path) as file:
         data = file.read()
         return json.loads(data)
@@ -67,41 +149,165 @@ def dump_data(data, output_path: str = PATH_TO_OUTPUT):
         file.write(formatted_data)
 
 
+GLOB_MAGIC = re.compile(r"[*?[]")
+INPUT_DIR_PATTERN = "*.json"
+NDJSON_ERROR_KEY = "error"
+
+
+def expand_input_paths(inputs: Iterable[str]) -> List[str]:
+    """Files as is, directories as their *.json files, glob patterns as matching files"""
+    paths = []
+    for input_path in inputs:
+        if os.path.isdir(input_path):
+            paths.extend(sorted(glob.glob(os.path.join(input_path, INPUT_DIR_PATTERN))))
+        elif GLOB_MAGIC.search(input_path):
+            paths.extend(sorted(glob.glob(input_path)))
+        else:
+            paths.append(input_path)
+    return paths
+
+
+def is_batch_mode(inputs: List[str], output_path: str) -> bool:
+    return (
+        len(inputs) > 1
+        or os.path.isdir(output_path)
+        or any(os.path.isdir(path) or GLOB_MAGIC.search(path) for path in inputs)
+    )
+
+
+def get_output_paths(input_paths: List[str], output_dir: str) -> List[str]:
+    if not input_paths:
+        return []
+    common_dir = os.path.commonpath([os.path.dirname(os.path.abspath(path)) for path in input_paths])
+    return [os.path.join(output_dir, os.path.relpath(os.path.abspath(path), common_dir)) for path in input_paths]
+
+
+def analyze_files(
+        input_paths: Iterable[str],
+        output_dir: str,
+        selective: bool = False,
+        policy: AnalysisPolicy = DEFAULT_ANALYSIS_POLICY,
+) -> int:
+    """
+    Analyze every input into output_dir keeping its path relative to the common directory of inputs,
+    so inputs with the same file name do not overwrite each other; return count of failed files
+    """
+    input_paths = list(input_paths)
+    os.makedirs(output_dir, exist_ok=True)
+    failed_count = 0
+    for input_path, output_path in zip(input_paths, get_output_paths(input_paths, output_dir)):
+        try:
+            data = analyze_json(load_data(input_path, selective=selective), policy=policy)
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+            dump_data(data, output_path)
+        except Exception as err:
+            logging.error("Failed to analyze %s: %s", input_path, err)
+            failed_count += 1
+    return failed_count
+
+
+def analyze_ndjson(
+        input_stream: IO[str],
+        output_stream: IO[str],
+        policy: AnalysisPolicy = DEFAULT_ANALYSIS_POLICY,
+) -> int:
+    """
+    Analyze one forecast per input line and write one result per output line in the same order,
+    so long-lived analyzer processes can be fed through pipes. Bad or blank line gives {"error": ...} line.
+    """
+    failed_count = 0
+    for line in input_stream:
+        try:
+            result = analyze_json(json.loads(line), policy=policy)
+        except Exception as err:
+            result = {NDJSON_ERROR_KEY: str(err)}
+            failed_count += 1
+        output_stream.write(json.dumps(result) + "\n")
+        output_stream.flush()
+    return failed_count
+
+
 def parse_args():
     parser = argparse.ArgumentParser()
     parser.add_argument(
         "-i",
         "--input",
-        default=PATH_FROM_INPUT,
+        default=[PATH_FROM_INPUT],
+        nargs="+",
         type=str,
-        help="path to file with input data",
+        help="paths to files with input data, directories with *.json files or glob patterns",
     )
     parser.add_argument(
         "-o",
         "--output",
         default=PATH_TO_OUTPUT,
         type=str,
-        help="path to file with result",
+        help="path to file with result, directory for results of several inputs",
+    )
+    parser.add_argument(
+        "--ndjson",
+        action="store_true",
+        help="read forecast per line from stdin and write result per line to stdout",
+    )
+    parser.add_argument(
+        "-s",
+        "--selective",
+        action="store_true",
+        help="read input incrementally keeping only forecast fields used in analysis",
+    )
+    parser.add_argument(
+        "--hours-start",
+        default=INPUT_DAY_HOURS_START,
+        type=int,
+        help="first hour of the day window",
+    )
+    parser.add_argument(
+        "--hours-end",
+        default=INPUT_DAY_HOURS_END,
+        type=int,
+        help="last hour of the day window",
+    )
+    parser.add_argument(
+        "--conditions",
+        default=INPUT_DAY_SUITABLE_CONDITIONS,
+        nargs="*",
+        type=str,
+        help="weather conditions counted as suitable",
     )
     parser.add_argument("-v", "--verbose", action="store_true")
-    return parser.parse_args()
+    args = parser.parse_args()
+    if args.ndjson and args.selective:
+        parser.error("--selective can not be used with --ndjson, lines are already read into memory")
+    return args
+
+
+def get_analysis_policy(args) -> AnalysisPolicy:
+    return AnalysisPolicy(
+        hours_start=args.hours_start,
+        hours_end=args.hours_end,
+        suitable_conditions=tuple(args.conditions),
+    )
+
+
+# Hours as the API sends them, looked up instead of int() as every hour key is read to check the order
+_HOUR_KEYS = {str(hour): hour for hour in range(24)}
 
 
 @dataclass
 class HourInfo:
     raw_data: Dict[str, tuple[str, int]] = field(repr=False)
     condition: Optional[str] = field(init=False, default=None)
+    condition_code: int = field(init=False, default=condition_registry.UNKNOWN_CODE)
     temperature: Optional[int] = field(init=False, default=None)
     hour: Optional[int] = field(init=False, default=None)
 
     @staticmethod
-    def is_hour_suitable(data):
-        hour = int(data[INPUT_HOUR_PATH])
-        return (hour >= INPUT_DAY_HOURS_START) and (hour <= INPUT_DAY_HOURS_END)
-
-    @property
-    def is_cond_suitable(self):
-        return self.condition in INPUT_DAY_SUITABLE_CONDITIONS
+    def get_hour(data) -> int:
+        hour = data[INPUT_HOUR_PATH]
+        try:
+            return _HOUR_KEYS[hour]
+        except KeyError:
+            return int(hour)
 
     def __post_init__(self):
         self.parse()
@@ -113,6 +319,7 @@ class HourInfo:
         self.hour = int(self.raw_data[INPUT_HOUR_PATH])
         self.temperature = int(deep_getitem(self.raw_data, INPUT_TEMPERATURE_PATH))
         self.condition = deep_getitem(self.raw_data, INPUT_CONDITION_PATH)
+        self.condition_code = condition_registry.get_code(self.condition)
 
 
 @dataclass
@@ -127,6 +334,7 @@ class DayInfo:
     hours_count: Optional[int] = field(init=False, default=None)
     temperature_avg: Optional[float] = field(init=False, default=None)
     relevant_condition_hours: int = field(init=False, default=0)
+    policy: AnalysisPolicy = field(repr=False, default=DEFAULT_ANALYSIS_POLICY)
 
     def to_json(self):
         return {
@@ -153,19 +361,18 @@ class DayInfo:
         hours_count = 0
         conds_count = 0
 
-        self.hours = self.raw_data[INPUT_HOURS_PATH]
-        # ToDo force sort by hour key in asc mode
-        for hour_data in self.hours:
-            if not HourInfo.is_hour_suitable(hour_data):
-                continue
-
+        # Keys of all hours are read to check the order, hours are parsed only inside the day window
+        hour_keys, self.hours = sort_by_key(self.raw_data[INPUT_HOURS_PATH], HourInfo.get_hour)
+        window_start = bisect.bisect_left(hour_keys, self.policy.hours_start)
+        window_end = bisect.bisect_right(hour_keys, self.policy.hours_end, lo=window_start)
+        for hour_data in self.hours[window_start:window_end]:
             h_info = HourInfo(raw_data=hour_data)
             h_hour = h_info.hour
             self.hour_start = self.hour_start or h_hour
             self.hour_end = h_hour
 
             temp += h_info.temperature
-            if h_info.is_cond_suitable:
+            if self.policy.is_cond_suitable(h_info.condition_code):
                 conds_count += 1
             hours_count += 1
 
@@ -175,7 +382,7 @@ class DayInfo:
             self.temperature_avg = temp / hours_count
 
 
-def analyze_json(data):
+def analyze_json(data, policy: AnalysisPolicy = DEFAULT_ANALYSIS_POLICY):
     if not data:
         logging.warning("Input data is empty...")
         return {}
@@ -184,11 +391,10 @@ def analyze_json(data):
     time_start = None
     time_end = None
 
-    days_data = deep_getitem(data, INPUT_FORECAST_PATH)
+    days_data = sort_days(deep_getitem(data, INPUT_FORECAST_PATH))
     days = []
-    # ToDo force sort by day in asc mode
     for day_data in days_data:
-        d_info = DayInfo(raw_data=day_data)
+        d_info = DayInfo(raw_data=day_data, policy=policy)
         d_date = d_info.date
 
         time_start = time_start or d_date
@@ -196,22 +402,38 @@ def analyze_json(data):
 
         days.append(d_info.to_json())
 
-    result = DEFAULT_OUTPUT_RESULT
+    # Copy, so results of several calls in one process do not share the template
+    result = copy.deepcopy(DEFAULT_OUTPUT_RESULT)
     # result[OUTPUT_RAW_DATA_KEY] = data
     result[OUTPUT_DAYS_KEY] = days
     return result
 
 
-if __name__ == "__main__":
+def main():
     args = parse_args()
-    input_path = args.input
-    output_path = args.output
     verbose_mode = args.verbose
 
     logging.basicConfig(level=logging.DEBUG if verbose_mode else logging.WARNING)
     logging.info(args)
 
-    data = load_data(input_path)
-    data = analyze_json(data)
+    policy = get_analysis_policy(args)
+    if args.ndjson:
+        failed_count = analyze_ndjson(sys.stdin, sys.stdout, policy=policy)
+    elif is_batch_mode(args.input, args.output):
+        failed_count = analyze_files(
+            expand_input_paths(args.input),
+            args.output,
+            selective=args.selective,
+            policy=policy,
+        )
+    else:
+        data = load_data(args.input[0], selective=args.selective)
+        data = analyze_json(data, policy=policy)
+        dump_data(data, args.output)
+        failed_count = 0
+
+    return 1 if failed_count else 0
+
 
-    dump_data(data, output_path)
+if __name__ == "__main__":
+    sys.exit(main())
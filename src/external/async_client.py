@@ -0,0 +1,224 @@
+import asyncio
+import json
+import socket
+import ssl
+from http import HTTPStatus
+from json import JSONDecodeError
+from typing import AsyncIterator, Iterable, Mapping, Sequence
+from urllib.parse import urljoin, urlsplit
+
+from config import GLOBAL_TIMEOUT, ASYNC_MAX_CONCURRENCY, ASYNC_MAX_REDIRECTS
+from external.coalescing import AsyncSingleFlight
+from external.compression import ACCEPT_ENCODING, READ_CHUNK_SIZE, StreamDecoder
+from external.connection_pool import DEFAULT_PORTS, REDIRECT_STATUSES
+from external.exceptions import BadRequestError, ConnectionApiError, HTTPStatusError, InvalidResponseDataError
+from external.metrics import (measure_phase, measure_request, BODY_READ_PHASE, CONNECT_PHASE, DNS_PHASE,
+                              JSON_DECODE_PHASE, TLS_PHASE, TTFB_PHASE)
+
+
+class AsyncYandexWeatherAPI:
+    """
+    Asyncio based class for requests.
+    Uses plain asyncio streams, so one event loop can keep many requests in flight
+    without a thread per request.
+    """
+
+    # Simultaneous requests for the same url share one download
+    single_flight = AsyncSingleFlight()
+
+    @staticmethod
+    async def __read_headers(reader: asyncio.StreamReader) -> tuple[int, str, Mapping[str, str]]:
+        status_line = await reader.readline()
+        try:
+            _, status, reason = status_line.decode("latin-1").rstrip("\r\n").split(" ", 2)
+        except ValueError:
+            _, status = status_line.decode("latin-1").rstrip("\r\n").split(" ", 1)
+            reason = ""
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        return int(status), reason, headers
+
+    @staticmethod
+    async def __iter_body(reader: asyncio.StreamReader, headers: Mapping[str, str]) -> AsyncIterator[bytes]:
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            while True:
+                size_line = await reader.readline()
+                size = int(size_line.split(b";", 1)[0].strip(), 16)
+                if size == 0:
+                    # Skip trailers
+                    while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                        pass
+                    return
+                yield await reader.readexactly(size)
+                await reader.readexactly(2)
+
+        content_length = headers.get("content-length")
+        if content_length is not None:
+            left = int(content_length)
+            while left > 0:
+                chunk = await reader.readexactly(min(left, READ_CHUNK_SIZE))
+                left -= len(chunk)
+                yield chunk
+            return
+
+        while chunk := await reader.read(READ_CHUNK_SIZE):
+            yield chunk
+
+    @staticmethod
+    async def __read_body(reader: asyncio.StreamReader, headers: Mapping[str, str]) -> bytes:
+        decoder = StreamDecoder(headers.get("content-encoding"))
+        body = bytearray()
+        async for chunk in AsyncYandexWeatherAPI.__iter_body(reader, headers):
+            body += decoder.decompress(chunk)
+        body += decoder.flush()
+        return bytes(body)
+
+    @staticmethod
+    async def __open_connection(
+            host: str,
+            port: int,
+            ssl_context: ssl.SSLContext | None,
+    ) -> tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        """
+        Open connection with name lookup, TCP connect and TLS handshake recorded as separate phases.
+        Socket is connected first and handed to open_connection, which then only does the handshake.
+        """
+        loop = asyncio.get_running_loop()
+        with measure_phase(DNS_PHASE):
+            addresses = await loop.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        with measure_phase(CONNECT_PHASE):
+            sock = await AsyncYandexWeatherAPI.__connect_socket(loop, host, addresses)
+
+        try:
+            if ssl_context is None:
+                return await asyncio.open_connection(sock=sock)
+            with measure_phase(TLS_PHASE):
+                return await asyncio.open_connection(sock=sock, ssl=ssl_context, server_hostname=host)
+        except BaseException:
+            sock.close()
+            raise
+
+    @staticmethod
+    async def __connect_socket(loop: asyncio.AbstractEventLoop, host: str, addresses: Sequence) -> socket.socket:
+        """Connect to the first reachable of resolved addresses"""
+        error = None
+        for family, socktype, proto, _, sockaddr in addresses:
+            sock = socket.socket(family, socktype, proto)
+            sock.setblocking(False)
+            try:
+                await loop.sock_connect(sock, sockaddr)
+                return sock
+            except OSError as err:
+                sock.close()
+                error = err
+            except BaseException:
+                sock.close()
+                raise
+        raise error or OSError(f"getaddrinfo returned no addresses for {host}")
+
+    @staticmethod
+    async def __request(url: str) -> tuple[int, str, Mapping[str, str], bytes]:
+        parts = urlsplit(url)
+        if parts.scheme not in DEFAULT_PORTS:
+            raise ConnectionApiError(f"Unsupported URL scheme: {parts.scheme!r}")
+
+        host = parts.hostname
+        if not host:
+            raise ConnectionApiError(f"URL has no host: {url!r}")
+        port = parts.port or DEFAULT_PORTS[parts.scheme]
+        ssl_context = ssl.create_default_context() if parts.scheme == "https" else None
+        path = parts.path or "/"
+        if parts.query:
+            path = f"{path}?{parts.query}"
+
+        reader, writer = await AsyncYandexWeatherAPI.__open_connection(host, port, ssl_context)
+        try:
+            request = (
+                f"GET {path} HTTP/1.1\r\n"
+                f"Host: {parts.netloc}\r\n"
+                "Accept: application/json\r\n"
+                f"Accept-Encoding: {ACCEPT_ENCODING}\r\n"
+                "Connection: close\r\n"
+                "\r\n"
+            )
+            writer.write(request.encode("latin-1"))
+            await writer.drain()
+
+            with measure_phase(TTFB_PHASE):
+                status, reason, headers = await AsyncYandexWeatherAPI.__read_headers(reader)
+            with measure_phase(BODY_READ_PHASE):
+                body = await AsyncYandexWeatherAPI.__read_body(reader, headers)
+            return status, reason, headers, body
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def __do_req(url: str) -> Mapping:
+        """Base request method"""
+        try:
+            for _ in range(ASYNC_MAX_REDIRECTS + 1):
+                status, reason, headers, body = await asyncio.wait_for(
+                    AsyncYandexWeatherAPI.__request(url),
+                    timeout=GLOBAL_TIMEOUT,
+                )
+                if status in REDIRECT_STATUSES and "location" in headers:
+                    url = urljoin(url, headers["location"])
+                    continue
+                break
+            else:
+                raise ConnectionApiError(f"Too many redirects: {url}")
+
+            if status >= HTTPStatus.BAD_REQUEST:
+                raise HTTPStatusError(status=status, reason=reason)
+
+            with measure_phase(JSON_DECODE_PHASE):
+                data = json.loads(body)
+            if status != HTTPStatus.OK:
+                raise BadRequestError("{}: {}".format(status, reason))
+            return data
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, OSError, ValueError) as ex:
+            if isinstance(ex, (JSONDecodeError, UnicodeDecodeError)):
+                raise InvalidResponseDataError(ex)
+            raise ConnectionApiError(ex)
+
+    @staticmethod
+    async def __do_measured_req(url: str) -> Mapping:
+        """Request recorded to latency metrics, requests that join it through single flight are not"""
+        with measure_request(url):
+            return await AsyncYandexWeatherAPI.__do_req(url)
+
+    @staticmethod
+    async def get_forecasting(url: str) -> Mapping:
+        """
+        :param url: url_to_json_data as str
+        :return: response data as json
+        """
+        return await AsyncYandexWeatherAPI.single_flight.do(url, lambda: AsyncYandexWeatherAPI.__do_measured_req(url))
+
+    @staticmethod
+    async def gather(
+            urls: Iterable[str],
+            limit: int = ASYNC_MAX_CONCURRENCY,
+            return_exceptions: bool = True,
+    ) -> Sequence[Mapping | BaseException]:
+        """
+        Fetch many urls on the running event loop with at most `limit` requests in flight.
+        :param urls: urls to json data
+        :param limit: max count of simultaneous requests
+        :param return_exceptions: return errors in place of results instead of raising the first one
+        :return: results in the same order as urls
+        """
+        semaphore = asyncio.Semaphore(limit)
+
+        async def _bounded_get(url: str) -> Mapping:
+            async with semaphore:
+                return await AsyncYandexWeatherAPI.get_forecasting(url)
+
+        return await asyncio.gather(*(_bounded_get(url) for url in urls), return_exceptions=return_exceptions)
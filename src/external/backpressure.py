@@ -0,0 +1,120 @@
+import sys
+import threading
+from dataclasses import dataclass
+
+from config import IN_FLIGHT_MAX_FORECASTS, IN_FLIGHT_MAX_BYTES
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None  # type: ignore[assignment]
+
+
+@dataclass(frozen=True, slots=True)
+class MemoryUsage:
+    objects: int
+    bytes: int
+    peak_objects: int
+    peak_bytes: int
+
+    def __str__(self) -> str:
+        return (
+            f"{self.objects} forecasts / {format_bytes(self.bytes)} "
+            f"(peak {self.peak_objects} / {format_bytes(self.peak_bytes)})"
+        )
+
+
+def format_bytes(size: int | float) -> str:
+    for unit in ("B", "KiB", "MiB"):
+        if abs(size) < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GiB"
+
+
+class MemoryGauge:
+    """Thread-safe count and size of objects currently held by a stage and their peaks"""
+
+    def __init__(self) -> None:
+        self._objects = 0
+        self._bytes = 0
+        self._peak_objects = 0
+        self._peak_bytes = 0
+        self._lock = threading.Lock()
+
+    def add(self, size: int = 0, objects: int = 1) -> None:
+        with self._lock:
+            self._objects += objects
+            self._bytes += size
+            self._peak_objects = max(self._peak_objects, self._objects)
+            self._peak_bytes = max(self._peak_bytes, self._bytes)
+
+    def remove(self, size: int = 0, objects: int = 1) -> None:
+        self.add(size=-size, objects=-objects)
+
+    @property
+    def usage(self) -> MemoryUsage:
+        with self._lock:
+            return MemoryUsage(
+                objects=self._objects,
+                bytes=self._bytes,
+                peak_objects=self._peak_objects,
+                peak_bytes=self._peak_bytes,
+            )
+
+
+class InFlightLimiter:
+    """
+    Caps forecasts held in memory between their fetch and the end of their processing.
+    acquire() takes a slot before fetch and blocks while max_objects slots are taken or
+    max_bytes are held. Size of a forecast is unknown until it is fetched, so it is added by
+    account() afterwards and byte limit is soft: it may be exceeded by fetches already running.
+    None disables the corresponding limit.
+    """
+
+    def __init__(self, max_objects: int | None = IN_FLIGHT_MAX_FORECASTS, max_bytes: int | None = IN_FLIGHT_MAX_BYTES):
+        self.max_objects = max_objects
+        self.max_bytes = max_bytes
+        self._objects = 0
+        self._bytes = 0
+        self._gauge = MemoryGauge()
+        self._condition = threading.Condition()
+
+    def _has_room(self) -> bool:
+        if self.max_objects is not None and self._objects >= self.max_objects:
+            return False
+        return self.max_bytes is None or self._objects == 0 or self._bytes < self.max_bytes
+
+    def acquire(self, timeout: float | None = None) -> bool:
+        with self._condition:
+            if not self._condition.wait_for(self._has_room, timeout=timeout):
+                return False
+            self._objects += 1
+        self._gauge.add()
+        return True
+
+    def account(self, size: int) -> None:
+        with self._condition:
+            self._bytes += size
+        self._gauge.add(size=size, objects=0)
+
+    def release(self, size: int = 0) -> None:
+        with self._condition:
+            self._objects -= 1
+            self._bytes -= size
+            self._condition.notify_all()
+        self._gauge.remove(size=size)
+
+    @property
+    def usage(self) -> MemoryUsage:
+        return self._gauge.usage
+
+
+def get_peak_rss(children: bool = False) -> int | None:
+    """Peak resident set size in bytes of this process or of the largest of its finished children"""
+    if resource is None:
+        return None
+
+    max_rss = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS reports bytes
+    return max_rss if sys.platform == "darwin" else max_rss * 1024
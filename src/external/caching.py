@@ -0,0 +1,166 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Mapping
+
+from config import root_logger, FORECAST_CACHE_MAXSIZE, FORECAST_CACHE_TTL, UNEXPECTED_ERROR_MESSAGE_TEMPLATE
+from external.compact_forecast import CompactForecast
+from external.forecasting import ForecastWeatherSource
+
+
+@dataclass(slots=True)
+class CacheStats:
+    hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+
+
+class CachingForecastWeatherSource(ForecastWeatherSource):
+    """
+    Wraps any forecast source with an in-memory LRU cache with per-entry TTL
+    and an optional persistent layer stored in cache_dir.
+    With compact entries are kept as CompactForecast, several times less memory per city.
+    get_compact_weather_by_city returns the cached forecast as is, get_weather_by_city
+    builds a dict with only the fields analysis reads on every call.
+    """
+
+    def __init__(
+            self,
+            source: ForecastWeatherSource,
+            maxsize: int = FORECAST_CACHE_MAXSIZE,
+            ttl: float = FORECAST_CACHE_TTL,
+            cache_dir: Path | None = None,
+            compact: bool = False,
+    ) -> None:
+        self.source = source
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.cache_dir = cache_dir
+        self.compact = compact
+        self.stats = CacheStats()
+        # city name -> (expires at as monotonic time, weather data)
+        self._entries: OrderedDict[str, tuple[float, Mapping | CompactForecast]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _get_disk_path(cache_dir: Path, city_name: str) -> Path:
+        key = hashlib.sha256(city_name.encode("utf8")).hexdigest()
+        return cache_dir / f"{key}.json"
+
+    def _get_from_memory(self, city_name: str) -> Mapping | CompactForecast | None:
+        with self._lock:
+            entry = self._entries.get(city_name)
+            if entry is None:
+                return None
+
+            expires_at, weather_data = entry
+            if expires_at <= time.monotonic():
+                del self._entries[city_name]
+                self.stats.expirations += 1
+                return None
+
+            self._entries.move_to_end(city_name)
+            self.stats.hits += 1
+
+        return weather_data
+
+    def _pack(self, weather_data: Mapping) -> Mapping | CompactForecast:
+        return CompactForecast.from_json(weather_data) if self.compact else weather_data
+
+    @staticmethod
+    def _unpack(entry: Mapping | CompactForecast) -> Mapping:
+        return entry.to_json() if isinstance(entry, CompactForecast) else entry
+
+    def _put_to_memory(self, city_name: str, entry: Mapping | CompactForecast, ttl: float) -> None:
+        with self._lock:
+            self._entries[city_name] = (time.monotonic() + ttl, entry)
+            self._entries.move_to_end(city_name)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.stats.evictions += 1
+
+    def _get_from_disk(self, city_name: str) -> Mapping | CompactForecast | None:
+        if self.cache_dir is None:
+            return None
+
+        path = self._get_disk_path(self.cache_dir, city_name)
+        try:
+            with path.open(encoding="utf8") as f:
+                entry = json.load(f)
+            # Disk entries outlive the process, so they keep wall clock expiration time
+            ttl_left = entry["expires_at"] - time.time()
+            if ttl_left <= 0:
+                path.unlink(missing_ok=True)
+                with self._lock:
+                    self.stats.expirations += 1
+                return None
+            memory_entry = self._pack(entry["data"])
+        except FileNotFoundError:
+            return None
+        except Exception as err:
+            root_logger.error(UNEXPECTED_ERROR_MESSAGE_TEMPLATE.format(error=err))
+            return None
+
+        self._put_to_memory(city_name, memory_entry, ttl=ttl_left)
+        with self._lock:
+            self.stats.disk_hits += 1
+        return memory_entry
+
+    def _put_to_disk(self, city_name: str, weather_data: Mapping) -> None:
+        if self.cache_dir is None:
+            return
+
+        path = self._get_disk_path(self.cache_dir, city_name)
+        temp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            entry = {"expires_at": time.time() + self.ttl, "data": weather_data}
+            temp_path.write_text(json.dumps(entry, ensure_ascii=False), encoding="utf8")
+            os.replace(temp_path, path)
+        except Exception as err:
+            root_logger.error(UNEXPECTED_ERROR_MESSAGE_TEMPLATE.format(error=err))
+
+    def _get_entry(self, city_name: str) -> Mapping | CompactForecast | None:
+        entry = self._get_from_memory(city_name)
+        if entry is not None:
+            return entry
+
+        entry = self._get_from_disk(city_name)
+        if entry is not None:
+            return entry
+
+        with self._lock:
+            self.stats.misses += 1
+        weather_data = self.source.get_weather_by_city(city_name=city_name)
+        if weather_data is None:
+            return None
+
+        entry = self._pack(weather_data)
+        self._put_to_memory(city_name, entry, ttl=self.ttl)
+        self._put_to_disk(city_name, self._unpack(entry))
+        return entry
+
+    def get_weather_by_city(self, city_name: str) -> Mapping | None:
+        entry = self._get_entry(city_name)
+        return None if entry is None else self._unpack(entry)
+
+    def get_compact_weather_by_city(self, city_name: str) -> CompactForecast | None:
+        entry = self._get_entry(city_name)
+        if entry is None or isinstance(entry, CompactForecast):
+            return entry
+        return CompactForecast.from_json(entry)
+
+    def clear(self) -> None:
+        """Drop both memory and disk entries"""
+        with self._lock:
+            self._entries.clear()
+        if self.cache_dir is not None:
+            shutil.rmtree(self.cache_dir, ignore_errors=True)
@@ -0,0 +1,194 @@
+import csv
+import json
+import re
+import threading
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Collection, Iterable, Iterator, Mapping, Sequence, TextIO
+
+from external.exceptions import CityCatalogError, CityKeyError
+
+CSV_SUFFIXES = {".csv"}
+JSON_LINES_SUFFIXES = {".jsonl", ".ndjson"}
+_NOT_NAME_CHARS = re.compile(r"[\W_]+")
+
+
+def normalize_city_name(city_name: str) -> str:
+    """"Abu Dhabi", "abu-dhabi" and "ABUDHABI" are the same city"""
+    return _NOT_NAME_CHARS.sub("", city_name).upper()
+
+
+def _parse_coordinate(value: Any) -> float | None:
+    if value is None or value == "":
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise CityCatalogError(f"Bad coordinate value: {value!r}")
+
+
+@dataclass(frozen=True, slots=True)
+class CityRecord:
+    name: str
+    url: str
+    lat: float | None = None
+    lon: float | None = None
+    country: str | None = None
+
+    @classmethod
+    def from_mapping(cls, row: Mapping) -> "CityRecord":
+        name, url = row.get("name"), row.get("url")
+        if not name or not url:
+            raise CityCatalogError(f"City record must have name and url: {dict(row)}")
+
+        return cls(
+            name=name,
+            url=url,
+            lat=_parse_coordinate(row.get("lat")),
+            lon=_parse_coordinate(row.get("lon")),
+            country=row.get("country") or None,
+        )
+
+
+def filter_cities(
+        records: Iterable[CityRecord],
+        predicate: Callable[[CityRecord], bool] | None = None,
+        countries: Collection[str] | None = None,
+) -> Iterator[CityRecord]:
+    for record in records:
+        if countries is not None and record.country not in countries:
+            continue
+        if predicate is not None and not predicate(record):
+            continue
+        yield record
+
+
+def shard_cities(records: Iterable[CityRecord], index: int, count: int) -> Iterator[CityRecord]:
+    """
+    Records of shard `index` out of `count`. Shard of a city depends on its name only,
+    so shards do not change when catalog is reordered and are the same in every process.
+    """
+    if not 0 <= index < count:
+        raise ValueError(f"Shard index must be in [0, {count}), got {index}")
+
+    for record in records:
+        if zlib.crc32(normalize_city_name(record.name).encode("utf8")) % count == index:
+            yield record
+
+
+def city_names(records: Iterable[CityRecord]) -> Iterator[str]:
+    return (record.name for record in records)
+
+
+class CityNames:
+    """
+    Names of records, unlike city_names it can be iterated again if records can,
+    e.g. every iteration over names of a CityCatalog reads the catalog anew
+    """
+
+    def __init__(self, records: Iterable[CityRecord]) -> None:
+        self.records = records
+
+    def __iter__(self) -> Iterator[str]:
+        return city_names(self.records)
+
+
+class CityCatalog:
+    """
+    Cities from CSV (with header) or JSON lines file with name, url, lat, lon and country fields.
+    Records are read lazily on every iteration. Lookup by name uses index of record offsets
+    built on the first lookup, so only the index is kept in memory, never the records.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        suffix = self.path.suffix.lower()
+        if suffix not in CSV_SUFFIXES | JSON_LINES_SUFFIXES:
+            raise CityCatalogError(f"Unsupported city catalog format: {self.path}")
+
+        self._is_csv = suffix in CSV_SUFFIXES
+        self._header: Sequence[str] | None = None
+        self._index: dict[str, int] | None = None
+        self._lock = threading.Lock()
+
+    def _open(self) -> TextIO:
+        return self.path.open(encoding="utf-8-sig", newline="")
+
+    def _iter_rows(self, file: TextIO, header: Sequence[str] | None = None) -> Iterator[tuple[int, Any]]:
+        """
+        Rows with offsets of their first line. Lines are read by readline, which keeps file.tell() usable,
+        csv.DictReader takes as many of them as a record with quoted line breaks needs
+        """
+        lines = iter(file.readline, "")
+        reader = None
+        if self._is_csv:
+            reader = csv.DictReader(lines, fieldnames=header)
+            if header is None:
+                self._header = reader.fieldnames
+        while True:
+            offset = file.tell()
+            try:
+                row = next(reader if reader is not None else lines)
+            except StopIteration:
+                return
+            except csv.Error as err:
+                raise CityCatalogError(f"Bad city record in {self.path} at offset {offset}: {err}")
+            # Blank lines of JSON lines are skipped here, csv.DictReader skips them itself
+            if not isinstance(row, str) or row.strip():
+                yield offset, row
+
+    def _parse_row(self, row: Any, offset: int) -> CityRecord:
+        try:
+            return CityRecord.from_mapping(row if self._is_csv else json.loads(row))
+        except (json.JSONDecodeError, AttributeError, CityCatalogError) as err:
+            raise CityCatalogError(f"Bad city record in {self.path} at offset {offset}: {err}")
+
+    def _iter_records(self) -> Iterator[tuple[int, CityRecord]]:
+        with self._open() as file:
+            for offset, row in self._iter_rows(file):
+                yield offset, self._parse_row(row, offset)
+
+    def _get_index(self) -> dict[str, int]:
+        with self._lock:
+            if self._index is None:
+                index: dict[str, int] = {}
+                for offset, record in self._iter_records():
+                    index.setdefault(normalize_city_name(record.name), offset)
+                self._index = index
+            return self._index
+
+    def __iter__(self) -> Iterator[CityRecord]:
+        return (record for _, record in self._iter_records())
+
+    def __len__(self) -> int:
+        return len(self._get_index())
+
+    def __contains__(self, city_name: object) -> bool:
+        return isinstance(city_name, str) and normalize_city_name(city_name) in self._get_index()
+
+    def get(self, city_name: str) -> CityRecord | None:
+        offset = self._get_index().get(normalize_city_name(city_name))
+        if offset is None:
+            return None
+
+        with self._open() as file:
+            file.seek(offset)
+            _, row = next(self._iter_rows(file, header=self._header))
+            return self._parse_row(row, offset)
+
+    def get_url(self, city_name: str) -> str:
+        record = self.get(city_name)
+        if record is None:
+            raise CityKeyError("Please check that city {} exists".format(city_name))
+        return record.url
+
+    def filter(
+            self,
+            predicate: Callable[[CityRecord], bool] | None = None,
+            countries: Collection[str] | None = None,
+    ) -> Iterator[CityRecord]:
+        return filter_cities(self, predicate=predicate, countries=countries)
+
+    def shard(self, index: int, count: int) -> Iterator[CityRecord]:
+        return shard_cities(self, index=index, count=count)
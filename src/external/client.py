@@ -1,12 +1,20 @@
 import json
+import os
+import threading
+from contextlib import ExitStack
 from http import HTTPStatus
+from http.client import HTTPException
 from json import JSONDecodeError
+from pathlib import Path
 from typing import Mapping
-from urllib.error import HTTPError, URLError
-from urllib.request import urlopen
 
-from config import GLOBAL_TIMEOUT
-from external.exceptions import BadRequestError, ConnectionApiError, InvalidResponseDataError
+from config import HTTP_CACHE_ENABLED
+from external.compression import ACCEPT_ENCODING, iter_decoded
+from external.connection_pool import PoolManager
+from external.exceptions import BadRequestError, ConnectionApiError, HTTPStatusError, InvalidResponseDataError
+from external.json_stream import SelectiveJSONParser, FORECAST_SPEC, extract_json
+from external.metrics import measure_request, measure_phase, BODY_READ_PHASE, JSON_DECODE_PHASE
+from external.http_cache import HTTPDiskCache, CachedResponse, ETAG_HEADER, LAST_MODIFIED_HEADER
 
 
 class YandexWeatherAPI:
@@ -14,17 +22,111 @@ class YandexWeatherAPI:
     Base class for requests
     """
 
+    # Shared by all threads, keeps keep-alive connections per host
+    pool_manager = PoolManager()
+    # Conditional GET cache, set to None to always download full responses
+    http_cache: HTTPDiskCache | None = HTTPDiskCache() if HTTP_CACHE_ENABLED else None
+
+    @staticmethod
+    def __get_request_headers(cached: CachedResponse | None) -> Mapping[str, str]:
+        headers = {"Accept-Encoding": ACCEPT_ENCODING}
+        if cached is not None:
+            headers.update(cached.conditional_headers)
+        return headers
+
+    @staticmethod
+    def __read_response(url: str, headers: Mapping[str, str]) -> tuple[int, str, CachedResponse]:
+        """Send request and return status, reason and decoded body with its validators"""
+        with YandexWeatherAPI.pool_manager.urlopen(url, headers=headers) as response:
+            resp_body = bytearray()
+            with measure_phase(BODY_READ_PHASE):
+                for chunk in iter_decoded(response.read, response.getheader("Content-Encoding")):
+                    resp_body += chunk
+            # Body is passed on as is, copying it to bytes would double peak memory of a large response
+            cacheable_response = CachedResponse(
+                body=resp_body,
+                etag=response.getheader(ETAG_HEADER),
+                last_modified=response.getheader(LAST_MODIFIED_HEADER),
+            )
+            return response.status, response.reason, cacheable_response
+
     @staticmethod
     def __do_req(url: str) -> Mapping:
         """Base request method"""
+        http_cache = YandexWeatherAPI.http_cache
+        cached = http_cache.get(url) if http_cache is not None else None
+        headers = YandexWeatherAPI.__get_request_headers(cached)
+        try:
+            status, reason, response = YandexWeatherAPI.__read_response(url, headers)
+            if status == HTTPStatus.NOT_MODIFIED and cached is not None:
+                with measure_phase(JSON_DECODE_PHASE):
+                    return json.loads(cached.body)
+            if status >= HTTPStatus.BAD_REQUEST:
+                raise HTTPStatusError(status=status, reason=reason)
+            with measure_phase(JSON_DECODE_PHASE):
+                data = json.loads(response.body)
+            if status != HTTPStatus.OK:
+                raise BadRequestError("{}: {}".format(status, reason))
+        except (HTTPException, OSError) as ex:
+            raise ConnectionApiError(ex)
+        except (JSONDecodeError, UnicodeDecodeError) as ex:
+            raise InvalidResponseDataError(ex)
+        except Exception:
+            raise
+
+        if http_cache is not None:
+            http_cache.set(url, response)
+        return data
+
+    @staticmethod
+    def __parse_response(
+            url: str,
+            headers: Mapping[str, str],
+            body_path: Path | None,
+    ) -> tuple[int, str, Mapping | None, CachedResponse]:
+        """
+        Send request and feed decoded body of successful response into selective parser,
+        the body is also written to body_path if it is given
+        """
+        with YandexWeatherAPI.pool_manager.urlopen(url, headers=headers) as response:
+            validators = CachedResponse(
+                body=b"",
+                etag=response.getheader(ETAG_HEADER),
+                last_modified=response.getheader(LAST_MODIFIED_HEADER),
+            )
+            if response.status != HTTPStatus.OK:
+                response.read()
+                return response.status, response.reason, None, validators
+
+            # Parsing goes along with reading, so both are recorded as body read
+            parser = SelectiveJSONParser(spec=FORECAST_SPEC)
+            with ExitStack() as stack, measure_phase(BODY_READ_PHASE):
+                file = stack.enter_context(body_path.open("wb")) if body_path is not None else None
+                for chunk in iter_decoded(response.read, response.getheader("Content-Encoding")):
+                    parser.feed(chunk)
+                    if file is not None:
+                        file.write(chunk)
+            data = parser.close()
+        return response.status, response.reason, data, validators
+
+    @staticmethod
+    def __get_selective_data(
+            url: str,
+            cached: CachedResponse | None,
+            body_path: Path | None,
+    ) -> tuple[Mapping, CachedResponse | None]:
+        """Return selected data and validators of a fresh body, validators are None for a not modified one"""
+        headers = YandexWeatherAPI.__get_request_headers(cached)
         try:
-            with urlopen(url, timeout=GLOBAL_TIMEOUT) as response:
-                resp_body = response.read().decode("utf-8")
-                data = json.loads(resp_body)
-                if response.status != HTTPStatus.OK:
-                    raise BadRequestError("{}: {}".format(resp_body.status, resp_body.reason))
-                return data
-        except (HTTPError, URLError) as ex:
+            status, reason, data, validators = YandexWeatherAPI.__parse_response(url, headers, body_path)
+            if status == HTTPStatus.NOT_MODIFIED and cached is not None:
+                return extract_json([cached.body], spec=FORECAST_SPEC), None
+            if status >= HTTPStatus.BAD_REQUEST:
+                raise HTTPStatusError(status=status, reason=reason)
+            if status != HTTPStatus.OK or data is None:
+                raise BadRequestError("{}: {}".format(status, reason))
+            return data, validators
+        except (HTTPException, OSError) as ex:
             raise ConnectionApiError(ex)
         except (JSONDecodeError, UnicodeDecodeError) as ex:
             raise InvalidResponseDataError(ex)
@@ -32,9 +134,98 @@ class YandexWeatherAPI:
             raise
 
     @staticmethod
-    def get_forecasting(url: str) -> Mapping:
+    def __do_selective_req(url: str) -> Mapping:
+        """
+        Request method keeping only forecast fields used in analysis,
+        a fresh body is parsed while it is read and goes to http cache through a file,
+        a not modified one is parsed from the cached body
+        """
+        http_cache = YandexWeatherAPI.http_cache
+        if http_cache is None:
+            data, _ = YandexWeatherAPI.__get_selective_data(url, cached=None, body_path=None)
+            return data
+
+        body_path = http_cache.get_temp_path(url)
+        try:
+            data, validators = YandexWeatherAPI.__get_selective_data(url, http_cache.get(url), body_path)
+            if validators is not None:
+                http_cache.set_from_file(url, body_path, validators)
+            return data
+        finally:
+            body_path.unlink(missing_ok=True)
+
+    @staticmethod
+    def __save_response(url: str, headers: Mapping[str, str], path: Path) -> tuple[int, str, CachedResponse]:
+        """Send request and stream decoded body of successful response to path"""
+        with YandexWeatherAPI.pool_manager.urlopen(url, headers=headers) as response:
+            validators = CachedResponse(
+                body=b"",
+                etag=response.getheader(ETAG_HEADER),
+                last_modified=response.getheader(LAST_MODIFIED_HEADER),
+            )
+            if response.status != HTTPStatus.OK:
+                response.read()
+                return response.status, response.reason, validators
+
+            with path.open("wb") as file, measure_phase(BODY_READ_PHASE):
+                for chunk in iter_decoded(response.read, response.getheader("Content-Encoding")):
+                    file.write(chunk)
+            return response.status, response.reason, validators
+
+    @staticmethod
+    def __do_save_req(url: str, path: Path, validate: bool) -> CachedResponse:
+        """Base request method writing body to path as is"""
+        http_cache = YandexWeatherAPI.http_cache
+        cached = http_cache.get(url) if http_cache is not None else None
+        headers = YandexWeatherAPI.__get_request_headers(cached)
+        try:
+            status, reason, validators = YandexWeatherAPI.__save_response(url, headers, path)
+            if status == HTTPStatus.NOT_MODIFIED and cached is not None:
+                path.write_bytes(cached.body)
+                return cached
+            if status >= HTTPStatus.BAD_REQUEST:
+                raise HTTPStatusError(status=status, reason=reason)
+            if status != HTTPStatus.OK:
+                raise BadRequestError("{}: {}".format(status, reason))
+            if validate:
+                with path.open("rb") as file, measure_phase(JSON_DECODE_PHASE):
+                    json.load(file)
+        except (HTTPException, OSError) as ex:
+            raise ConnectionApiError(ex)
+        except (JSONDecodeError, UnicodeDecodeError) as ex:
+            raise InvalidResponseDataError(ex)
+        except Exception:
+            raise
+
+        if http_cache is not None:
+            http_cache.set_from_file(url, path, validators)
+        return validators
+
+    @staticmethod
+    def save_forecasting(url: str, path: Path, validate: bool = False) -> None:
+        """
+        Stream response bytes straight to file without building python objects
+        :param url: url_to_json_data as str
+        :param path: path to save json data
+        :param validate: check that saved data is valid json before publishing the file
+        """
+        temp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            with measure_request(url):
+                YandexWeatherAPI.__do_save_req(url, temp_path, validate)
+            os.replace(temp_path, path)
+        finally:
+            temp_path.unlink(missing_ok=True)
+
+    @staticmethod
+    def get_forecasting(url: str, selective: bool = False) -> Mapping:
         """
         :param url: url_to_json_data as str
+        :param selective: parse response while it is read keeping only forecasts > [day] > date/hours,
+            this bounds memory by the selected fields at the cost of about twice the CPU time of json.loads
         :return: response data as json
         """
-        return YandexWeatherAPI.__do_req(url)
+        with measure_request(url):
+            if selective:
+                return YandexWeatherAPI.__do_selective_req(url)
+            return YandexWeatherAPI.__do_req(url)
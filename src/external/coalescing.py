@@ -0,0 +1,88 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Hashable, Mapping
+
+from external.forecasting import ForecastWeatherSource, RawForecastWeatherSource
+
+
+class SingleFlight:
+    """
+    Concurrent calls with the same key from different threads share one execution:
+    the first caller runs the function, the others wait for its result or error
+    """
+
+    def __init__(self) -> None:
+        self._calls: dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, func: Callable, *args: Any, **kwargs: Any) -> Any:
+        with self._lock:
+            future = self._calls.get(key)
+            is_leader = future is None
+            if future is None:
+                future = Future()
+                self._calls[key] = future
+
+        if not is_leader:
+            return future.result()
+
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as err:
+            future.set_exception(err)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+
+class AsyncSingleFlight:
+    """
+    Concurrent awaits with the same key on one event loop share one task.
+    Cancelling one of the callers does not cancel the shared task.
+    """
+
+    def __init__(self) -> None:
+        self._calls: dict[Hashable, asyncio.Future] = {}
+
+    def _forget(self, key: Hashable, task: asyncio.Future) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+
+    async def do(self, key: Hashable, coroutine_factory: Callable[[], Awaitable]) -> Any:
+        task = self._calls.get(key)
+        if task is None or task.get_loop() is not asyncio.get_running_loop():
+            task = asyncio.ensure_future(coroutine_factory())
+            self._calls[key] = task
+            task.add_done_callback(lambda done_task: self._forget(key, done_task))
+        return await asyncio.shield(task)
+
+
+class CoalescingForecastWeatherSource(ForecastWeatherSource, RawForecastWeatherSource):
+    """
+    Wraps forecast source so simultaneous requests for one city make a single fetch.
+    All callers get the same weather data object, so they must not mutate it.
+    """
+
+    def __init__(self, source: ForecastWeatherSource) -> None:
+        self.source = source
+        self._single_flight = SingleFlight()
+
+    def get_weather_by_city(self, city_name: str) -> Mapping | None:
+        return self._single_flight.do(city_name, self.source.get_weather_by_city, city_name=city_name)
+
+    def save_weather_by_city(self, city_name: str, path: Path, validate: bool = False) -> bool:
+        # Saving writes to caller's path, so only calls for the same city and path are coalesced
+        raw_source: RawForecastWeatherSource = self.source  # type: ignore[assignment]
+        return self._single_flight.do(
+            (city_name, path),
+            raw_source.save_weather_by_city,
+            city_name=city_name,
+            path=path,
+            validate=validate,
+        )
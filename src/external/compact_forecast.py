@@ -0,0 +1,183 @@
+import math
+from array import array
+from typing import Dict, Iterator, List, Mapping, Sequence
+
+from external.analyzer import (INPUT_CONDITION_PATH, INPUT_DATE_PATH, INPUT_FORECAST_PATH, INPUT_HOUR_PATH,
+                               INPUT_HOURS_PATH, INPUT_TEMPERATURE_PATH, HourInfo, deep_getitem, sort_by_key,
+                               sort_days)
+from external.conditions import condition_registry
+
+
+def get_code_typecode(code_count: int) -> str:
+    """Smallest unsigned array typecode holding codes 0..code_count - 1"""
+    for typecode in "BHIL":
+        if code_count <= 1 << 8 * array(typecode).itemsize:
+            return typecode
+    return "Q"
+
+
+# array typecodes of the columns
+HOUR_TYPECODE = "h"
+TEMPERATURE_TYPECODE = "d"
+# Sized from the registry, so a longer conditions file never overflows the column
+CONDITION_TYPECODE = get_code_typecode(len(condition_registry))
+OFFSET_TYPECODE = "q"
+
+
+def _parse_temperature(value) -> float:
+    # Missing temperature is NaN, analysis fails on it only for hours it actually uses
+    return math.nan if value is None else float(value)
+
+
+class CompactForecast:
+    """
+    Forecast of one city reduced to what analysis needs, stored column-wise:
+    hour, temperature and condition code of all hours of all days in typed arrays,
+    hours of day i are at day_offsets[i]:day_offsets[i + 1].
+    Days and hours are sorted in the same order as analyzer uses.
+    Condition codes come from condition_registry, conditions unknown to it are coded as missing
+    and their names are kept in unknown_conditions by hour position, so to_json() is lossless.
+    """
+
+    __slots__ = (
+        "dates", "is_empty_day", "day_offsets", "hours", "temperatures", "condition_codes", "unknown_conditions",
+    )
+
+    def __init__(
+            self,
+            dates: Sequence[str | None],
+            is_empty_day: array,
+            day_offsets: array,
+            hours: array,
+            temperatures: "array[float]",
+            condition_codes: array,
+            unknown_conditions: Dict[int, str] | None = None,
+    ) -> None:
+        self.dates = tuple(dates)
+        self.is_empty_day = is_empty_day
+        self.day_offsets = day_offsets
+        self.hours = hours
+        self.temperatures = temperatures
+        self.condition_codes = condition_codes
+        self.unknown_conditions = unknown_conditions or {}
+
+    @classmethod
+    def from_json(cls, data: Mapping) -> "CompactForecast":
+        dates: List[str | None] = []
+        is_empty_day = array("b")
+        day_offsets = array(OFFSET_TYPECODE, [0])
+        hours = array(HOUR_TYPECODE)
+        temperatures: array[float] = array(TEMPERATURE_TYPECODE)
+        condition_codes = array(CONDITION_TYPECODE)
+        unknown_conditions: Dict[int, str] = {}
+
+        days_data = sort_days(deep_getitem(data, INPUT_FORECAST_PATH))
+        for day_data in days_data:
+            is_empty_day.append(not day_data)
+            if not day_data:
+                dates.append(None)
+                day_offsets.append(day_offsets[-1])
+                continue
+
+            dates.append(day_data[INPUT_DATE_PATH])
+            day_hours_keys, day_hours = sort_by_key(day_data[INPUT_HOURS_PATH], HourInfo.get_hour)
+            hours.extend(day_hours_keys)
+            temperatures.extend(_parse_temperature(hour_data.get(INPUT_TEMPERATURE_PATH)) for hour_data in day_hours)
+            for hour_data in day_hours:
+                condition = hour_data.get(INPUT_CONDITION_PATH)
+                code = condition_registry.get_code(condition)
+                if code == condition_registry.UNKNOWN_CODE and condition is not None:
+                    unknown_conditions[len(condition_codes)] = condition
+                condition_codes.append(code)
+            day_offsets.append(len(hours))
+
+        return cls(
+            dates=dates,
+            is_empty_day=is_empty_day,
+            day_offsets=day_offsets,
+            hours=hours,
+            temperatures=temperatures,
+            condition_codes=condition_codes,
+            unknown_conditions=unknown_conditions,
+        )
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def __iter__(self) -> Iterator["DayView"]:
+        return (DayView(self, index) for index in range(len(self.dates)))
+
+    def __getitem__(self, index: int) -> "DayView":
+        if not -len(self.dates) <= index < len(self.dates):
+            raise IndexError("day index out of range")
+        return DayView(self, index % len(self.dates))
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the column buffers"""
+        columns = (self.is_empty_day, self.day_offsets, self.hours, self.temperatures, self.condition_codes)
+        return sum(column.itemsize * len(column) for column in columns)
+
+    def to_json(self) -> Dict:
+        """Forecast in API response layout with only the fields analysis reads"""
+        return {INPUT_FORECAST_PATH: [day.to_json() for day in self]}
+
+
+class DayView:
+    """Day of CompactForecast, reads its slice of the forecast columns without copying the forecast"""
+
+    __slots__ = ("forecast", "index")
+
+    def __init__(self, forecast: CompactForecast, index: int) -> None:
+        self.forecast = forecast
+        self.index = index
+
+    @property
+    def date(self) -> str | None:
+        return self.forecast.dates[self.index]
+
+    @property
+    def is_empty(self) -> bool:
+        return bool(self.forecast.is_empty_day[self.index])
+
+    @property
+    def start(self) -> int:
+        return self.forecast.day_offsets[self.index]
+
+    @property
+    def end(self) -> int:
+        return self.forecast.day_offsets[self.index + 1]
+
+    def __len__(self) -> int:
+        return self.end - self.start
+
+    @property
+    def hours(self) -> array:
+        return self.forecast.hours[self.start:self.end]
+
+    @property
+    def temperatures(self) -> array:
+        return self.forecast.temperatures[self.start:self.end]
+
+    @property
+    def conditions(self) -> List[str | None]:
+        unknown_conditions = self.forecast.unknown_conditions
+        return [
+            unknown_conditions.get(position) if code == condition_registry.UNKNOWN_CODE
+            else condition_registry.get_name(code)
+            for position, code in enumerate(self.forecast.condition_codes[self.start:self.end], start=self.start)
+        ]
+
+    def to_json(self) -> Dict:
+        if self.is_empty:
+            return {}
+
+        hours = []
+        for hour, temperature, condition in zip(self.hours, self.temperatures, self.conditions):
+            hour_data: Dict[str, str | float] = {INPUT_HOUR_PATH: str(hour)}
+            if not math.isnan(temperature):
+                hour_data[INPUT_TEMPERATURE_PATH] = int(temperature) if temperature.is_integer() else temperature
+            if condition is not None:
+                hour_data[INPUT_CONDITION_PATH] = condition
+            hours.append(hour_data)
+        return {INPUT_DATE_PATH: self.date, INPUT_HOURS_PATH: hours}
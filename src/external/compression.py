@@ -0,0 +1,71 @@
+import zlib
+from typing import Callable, Iterator
+
+from external.exceptions import InvalidResponseDataError
+
+ACCEPT_ENCODING = "gzip, deflate"
+READ_CHUNK_SIZE = 64 * 1024
+
+_GZIP_WBITS = 16 + zlib.MAX_WBITS
+_ZLIB_WBITS = zlib.MAX_WBITS
+_RAW_DEFLATE_WBITS = -zlib.MAX_WBITS
+
+
+class StreamDecoder:
+    """
+    Incremental decoder for gzip / deflate / identity content encodings
+    """
+
+    def __init__(self, content_encoding: str | None) -> None:
+        self.content_encoding = (content_encoding or "identity").strip().lower()
+        if self.content_encoding in ("gzip", "x-gzip"):
+            self._decompressor: zlib._Decompress | None = zlib.decompressobj(_GZIP_WBITS)
+        elif self.content_encoding == "deflate":
+            self._decompressor = zlib.decompressobj(_ZLIB_WBITS)
+        elif self.content_encoding == "identity":
+            self._decompressor = None
+        else:
+            raise InvalidResponseDataError(f"Unsupported content encoding: {self.content_encoding}")
+        self._first_chunk = True
+
+    def decompress(self, chunk: bytes) -> bytes:
+        if self._decompressor is None:
+            return chunk
+
+        try:
+            return self._decompressor.decompress(chunk)
+        except zlib.error as err:
+            # Some servers send raw deflate stream without zlib header
+            if self.content_encoding == "deflate" and self._first_chunk:
+                self._first_chunk = False
+                self._decompressor = zlib.decompressobj(_RAW_DEFLATE_WBITS)
+                return self.decompress(chunk)
+            raise InvalidResponseDataError(err)
+        finally:
+            self._first_chunk = False
+
+    def flush(self) -> bytes:
+        if self._decompressor is None:
+            return b""
+
+        try:
+            return self._decompressor.flush()
+        except zlib.error as err:
+            raise InvalidResponseDataError(err)
+
+
+def iter_decoded(
+        read: Callable[[int], bytes],
+        content_encoding: str | None,
+        chunk_size: int = READ_CHUNK_SIZE,
+) -> Iterator[bytes]:
+    """Read body with read callable by chunks and yield decoded chunks"""
+    decoder = StreamDecoder(content_encoding)
+    while chunk := read(chunk_size):
+        decoded = decoder.decompress(chunk)
+        if decoded:
+            yield decoded
+
+    tail = decoder.flush()
+    if tail:
+        yield tail
@@ -0,0 +1,129 @@
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from http import HTTPStatus
+from typing import Iterator
+
+from config import (AIMD_INITIAL_LIMIT, AIMD_MIN_LIMIT, AIMD_MAX_LIMIT, AIMD_INCREASE_STEP, AIMD_DECREASE_FACTOR,
+                    AIMD_LATENCY_THRESHOLD)
+from external.exceptions import ConnectionApiError, HTTPStatusError, CircuitOpenError
+
+
+def is_overload_error(error: BaseException) -> bool:
+    """Timeouts, connection failures and 5xx responses mean the server is overloaded, other errors do not"""
+    if isinstance(error, CircuitOpenError):
+        return False
+    if isinstance(error, HTTPStatusError):
+        return error.status >= HTTPStatus.INTERNAL_SERVER_ERROR
+    return isinstance(error, (ConnectionApiError, OSError))
+
+
+@dataclass(frozen=True, slots=True)
+class ConcurrencyMetrics:
+    limit: int
+    in_flight: int
+    successes: int
+    failures: int
+
+
+class ConcurrencySlot:
+    __slots__ = ("is_failed",)
+
+    def __init__(self) -> None:
+        self.is_failed = False
+
+    def mark_failed(self) -> None:
+        self.is_failed = True
+
+
+# Slot held by the current request, so errors caught deeper in the call stack can be reported
+current_concurrency_slot: ContextVar[ConcurrencySlot | None] = ContextVar("current_concurrency_slot", default=None)
+
+
+def report_request_error(error: BaseException) -> None:
+    """Mark slot of the current request failed if error means overload"""
+    slot = current_concurrency_slot.get()
+    if slot is not None and is_overload_error(error):
+        slot.mark_failed()
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    AIMD limit of in-flight requests:
+    grows additively (by increase_step per window of `limit` successful requests) while requests
+    succeed faster than latency_threshold and shrinks multiplicatively on overload.
+    Limit shrinks at most once per window: failures of requests started before the last decrease
+    were sent under the old limit and are not counted again
+    """
+
+    def __init__(
+            self,
+            initial_limit: int = AIMD_INITIAL_LIMIT,
+            min_limit: int = AIMD_MIN_LIMIT,
+            max_limit: int = AIMD_MAX_LIMIT,
+            increase_step: float = AIMD_INCREASE_STEP,
+            decrease_factor: float = AIMD_DECREASE_FACTOR,
+            latency_threshold: float = AIMD_LATENCY_THRESHOLD,
+    ) -> None:
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self.latency_threshold = latency_threshold
+        self._limit = float(min(max(initial_limit, min_limit), max_limit))
+        self._in_flight = 0
+        self._successes = 0
+        self._failures = 0
+        self._decreased_at = float("-inf")
+        self._condition = threading.Condition()
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    @property
+    def metrics(self) -> ConcurrencyMetrics:
+        with self._condition:
+            return ConcurrencyMetrics(
+                limit=int(self._limit),
+                in_flight=self._in_flight,
+                successes=self._successes,
+                failures=self._failures,
+            )
+
+    def acquire(self) -> None:
+        with self._condition:
+            self._condition.wait_for(lambda: self._in_flight < int(self._limit))
+            self._in_flight += 1
+
+    def release(self, latency: float, is_failed: bool = False) -> None:
+        with self._condition:
+            self._in_flight -= 1
+            if is_failed or latency > self.latency_threshold:
+                self._failures += 1
+                now = time.monotonic()
+                if now - latency >= self._decreased_at:
+                    self._decreased_at = now
+                    self._limit = max(float(self.min_limit), self._limit * self.decrease_factor)
+            else:
+                self._successes += 1
+                self._limit = min(float(self.max_limit), self._limit + self.increase_step / self._limit)
+            self._condition.notify_all()
+
+    @contextmanager
+    def slot(self) -> Iterator[ConcurrencySlot]:
+        """Hold one in-flight slot, mark it failed or raise an overload error to report overload"""
+        self.acquire()
+        slot = ConcurrencySlot()
+        token = current_concurrency_slot.set(slot)
+        start = time.monotonic()
+        try:
+            yield slot
+        except BaseException as err:
+            report_request_error(err)
+            raise
+        finally:
+            current_concurrency_slot.reset(token)
+            self.release(latency=time.monotonic() - start, is_failed=slot.is_failed)
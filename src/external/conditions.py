@@ -0,0 +1,79 @@
+from pathlib import Path
+from typing import Iterable, Sequence
+
+CONDITIONS_PATH = Path(__file__).parents[2] / "examples" / "conditions.txt"
+CONDITION_SEPARATOR = "—"
+# Same as examples/conditions.txt, used when the file is not shipped
+KNOWN_CONDITIONS = (
+    "clear",
+    "partly-cloudy",
+    "cloudy",
+    "overcast",
+    "drizzle",
+    "light-rain",
+    "rain",
+    "moderate-rain",
+    "heavy-rain",
+    "continuous-heavy-rain",
+    "showers",
+    "wet-snow",
+    "light-snow",
+    "snow",
+    "snow-showers",
+    "hail",
+    "thunderstorm",
+    "thunderstorm-with-rain",
+    "thunderstorm-with-hail",
+)
+
+
+def load_conditions(path: Path = CONDITIONS_PATH) -> Sequence[str]:
+    """Condition names from "<name> — <description>" lines"""
+    conditions = []
+    with path.open(encoding="utf8") as file:
+        for line in file:
+            name, separator, _ = line.partition(CONDITION_SEPARATOR)
+            if separator and name.strip():
+                conditions.append(name.strip())
+    return conditions
+
+
+class ConditionRegistry:
+    """
+    Interns condition names as small integer codes, 0 stands for missing or unknown condition.
+    Condition sets are stored as bitmasks over codes, so membership is a shift and a bitwise and.
+    """
+
+    UNKNOWN_CODE = 0
+
+    def __init__(self, conditions: Iterable[str]) -> None:
+        self.names: tuple[str | None, ...] = (None, *conditions)
+        self._codes = {name: code for code, name in enumerate(self.names) if name is not None}
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def get_code(self, condition: str | None) -> int:
+        return self._codes.get(condition, self.UNKNOWN_CODE)  # type: ignore[arg-type]
+
+    def get_name(self, code: int) -> str | None:
+        return self.names[code]
+
+    def get_mask(self, conditions: Iterable[str]) -> int:
+        mask = 0
+        for condition in conditions:
+            if condition not in self._codes:
+                raise ValueError(f"Unknown condition: {condition!r}")
+            mask |= 1 << self._codes[condition]
+        return mask
+
+    @staticmethod
+    def is_in_mask(code: int, mask: int) -> bool:
+        return bool(mask >> code & 1)
+
+    def get_lookup_table(self, mask: int) -> bytes:
+        """table[code] is 1 for codes in mask, for vectorized lookups"""
+        return bytes(self.is_in_mask(code, mask) for code in range(len(self.names)))
+
+
+condition_registry = ConditionRegistry(load_conditions() if CONDITIONS_PATH.exists() else KNOWN_CONDITIONS)
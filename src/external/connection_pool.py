@@ -0,0 +1,245 @@
+import socket
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http import HTTPStatus
+from http.client import HTTPConnection, HTTPSConnection, HTTPResponse, RemoteDisconnected
+from typing import Iterator, Mapping
+from urllib.parse import urljoin, urlsplit
+
+from config import GLOBAL_TIMEOUT, POOL_MAXSIZE, POOL_IDLE_TIMEOUT, POOL_MAX_REDIRECTS
+from external.exceptions import ConnectionApiError
+from external.metrics import add_request_phase, DNS_PHASE, CONNECT_PHASE, TLS_PHASE, TTFB_PHASE
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+REDIRECT_STATUSES = {
+    HTTPStatus.MOVED_PERMANENTLY,
+    HTTPStatus.FOUND,
+    HTTPStatus.SEE_OTHER,
+    HTTPStatus.TEMPORARY_REDIRECT,
+    HTTPStatus.PERMANENT_REDIRECT,
+}
+# Errors that mean a reused keep-alive socket was already closed by the server
+_STALE_CONNECTION_ERRORS = (RemoteDisconnected, ConnectionResetError, BrokenPipeError, ConnectionAbortedError)
+
+
+class _PhaseTimingMixin:
+    """Records DNS and TCP connect durations of new connections"""
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._create_connection = self._timed_create_connection
+        self._tcp_duration = 0.0
+
+    def _timed_create_connection(self, address: tuple[str, int], *args, **kwargs) -> socket.socket:
+        """
+        socket.create_connection with name lookup done ahead, so it is timed apart from connect.
+        Resolved addresses are numeric and create_connection does not go to DNS again.
+        """
+        host, port = address
+        dns_start = time.perf_counter()
+        addresses = socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM)
+        connect_start = time.perf_counter()
+        add_request_phase(DNS_PHASE, connect_start - dns_start)
+
+        error = None
+        try:
+            for *_, sockaddr in addresses:
+                try:
+                    return socket.create_connection((str(sockaddr[0]), port), *args, **kwargs)
+                except OSError as err:
+                    error = err
+            raise error or OSError(f"getaddrinfo returned no addresses for {host}")
+        finally:
+            connect_end = time.perf_counter()
+            add_request_phase(CONNECT_PHASE, connect_end - connect_start)
+            self._tcp_duration = connect_end - dns_start
+
+
+class InstrumentedHTTPConnection(_PhaseTimingMixin, HTTPConnection):
+    pass
+
+
+class InstrumentedHTTPSConnection(_PhaseTimingMixin, HTTPSConnection):
+    def connect(self) -> None:
+        # TLS handshake goes right after TCP connect inside HTTPSConnection.connect
+        start = time.perf_counter()
+        super().connect()
+        add_request_phase(TLS_PHASE, time.perf_counter() - start - self._tcp_duration)
+
+
+_CONNECTION_CLASSES: dict[str, type[HTTPConnection]] = {
+    "http": InstrumentedHTTPConnection,
+    "https": InstrumentedHTTPSConnection,
+}
+
+
+class HTTPConnectionPool:
+    """
+    Thread-safe pool of persistent HTTP/1.1 connections to a single host
+    """
+
+    def __init__(
+            self,
+            scheme: str,
+            host: str,
+            port: int,
+            maxsize: int = POOL_MAXSIZE,
+            idle_timeout: float = POOL_IDLE_TIMEOUT,
+            timeout: float = GLOBAL_TIMEOUT,
+    ) -> None:
+        self.scheme = scheme
+        self.host = host
+        self.port = port
+        self.maxsize = maxsize
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        # (connection, last used monotonic time), most recently used on the right
+        self._idle: deque[tuple[HTTPConnection, float]] = deque()
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(maxsize)
+
+    def _new_conn(self) -> HTTPConnection:
+        connection_class = _CONNECTION_CLASSES[self.scheme]
+        return connection_class(self.host, self.port, timeout=self.timeout)
+
+    def _evict_idle(self, now: float) -> None:
+        while self._idle and now - self._idle[0][1] > self.idle_timeout:
+            conn, _ = self._idle.popleft()
+            conn.close()
+
+    def _get_conn(self) -> tuple[HTTPConnection, bool]:
+        """Return connection and flag whether it was reused"""
+        with self._lock:
+            self._evict_idle(time.monotonic())
+            if self._idle:
+                conn, _ = self._idle.pop()
+                return conn, True
+        return self._new_conn(), False
+
+    def _put_conn(self, conn: HTTPConnection) -> None:
+        with self._lock:
+            self._idle.append((conn, time.monotonic()))
+
+    @staticmethod
+    def _request(conn: HTTPConnection, path: str, headers: Mapping[str, str]) -> HTTPResponse:
+        conn.request("GET", path, headers=dict(headers))
+        start = time.perf_counter()
+        response = conn.getresponse()
+        add_request_phase(TTFB_PHASE, time.perf_counter() - start)
+        return response
+
+    def _send(self, path: str, headers: Mapping[str, str]) -> tuple[HTTPConnection, HTTPResponse]:
+        conn, reused = self._get_conn()
+        try:
+            return conn, self._request(conn, path, headers)
+        except _STALE_CONNECTION_ERRORS:
+            conn.close()
+            if not reused:
+                raise
+        except BaseException:
+            conn.close()
+            raise
+
+        # Stale keep-alive socket: reconnect transparently once
+        conn = self._new_conn()
+        try:
+            return conn, self._request(conn, path, headers)
+        except BaseException:
+            conn.close()
+            raise
+
+    @contextmanager
+    def request(self, path: str, headers: Mapping[str, str] | None = None) -> Iterator[HTTPResponse]:
+        """
+        Send GET request through a pooled connection.
+        Connection goes back to the pool only if the response body was read to the end.
+        """
+        self._slots.acquire()
+        conn = None
+        try:
+            conn, response = self._send(path=path, headers=headers or {})
+            yield response
+            if response.isclosed() and not response.will_close:
+                self._put_conn(conn)
+                conn = None
+        finally:
+            if conn is not None:
+                conn.close()
+            self._slots.release()
+
+    def close(self) -> None:
+        with self._lock:
+            while self._idle:
+                conn, _ = self._idle.popleft()
+                conn.close()
+
+
+class PoolManager:
+    """
+    Keeps one HTTPConnectionPool per scheme, host and port
+    """
+
+    def __init__(
+            self,
+            maxsize: int = POOL_MAXSIZE,
+            idle_timeout: float = POOL_IDLE_TIMEOUT,
+            timeout: float = GLOBAL_TIMEOUT,
+    ) -> None:
+        self.maxsize = maxsize
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self._pools: dict[tuple[str, str, int], HTTPConnectionPool] = {}
+        self._lock = threading.Lock()
+
+    def connection_from_url(self, url: str) -> HTTPConnectionPool:
+        parts = urlsplit(url)
+        if parts.scheme not in _CONNECTION_CLASSES:
+            raise ConnectionApiError(f"Unsupported URL scheme: {parts.scheme!r}")
+
+        if not parts.hostname:
+            raise ConnectionApiError(f"URL has no host: {url!r}")
+
+        key = (parts.scheme, parts.hostname, parts.port or DEFAULT_PORTS[parts.scheme])
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool is None:
+                pool = HTTPConnectionPool(
+                    *key,
+                    maxsize=self.maxsize,
+                    idle_timeout=self.idle_timeout,
+                    timeout=self.timeout,
+                )
+                self._pools[key] = pool
+            return pool
+
+    @staticmethod
+    def _get_request_path(url: str) -> str:
+        parts = urlsplit(url)
+        path = parts.path or "/"
+        if parts.query:
+            path = f"{path}?{parts.query}"
+        return path
+
+    @contextmanager
+    def urlopen(self, url: str, headers: Mapping[str, str] | None = None) -> Iterator[HTTPResponse]:
+        """Send GET request to url following redirects"""
+        for _ in range(POOL_MAX_REDIRECTS + 1):
+            pool = self.connection_from_url(url)
+            with pool.request(path=self._get_request_path(url), headers=headers) as response:
+                location = response.getheader("Location")
+                if response.status in REDIRECT_STATUSES and location:
+                    response.read()
+                    url = urljoin(url, location)
+                    continue
+                yield response
+                return
+
+        raise ConnectionApiError(f"Too many redirects: {url}")
+
+    def clear(self) -> None:
+        with self._lock:
+            for pool in self._pools.values():
+                pool.close()
+            self._pools.clear()
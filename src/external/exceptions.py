@@ -2,6 +2,10 @@ class CityKeyError(Exception):
     pass
 
 
+class CityCatalogError(Exception):
+    pass
+
+
 class BadRequestError(Exception):
     pass
 
@@ -10,9 +14,24 @@ class ConnectionApiError(Exception):
     pass
 
 
+class HTTPStatusError(ConnectionApiError):
+    def __init__(self, status: int, reason: str) -> None:
+        super().__init__(f"HTTP Error {status}: {reason}")
+        self.status = status
+        self.reason = reason
+
+
+class CircuitOpenError(ConnectionApiError):
+    pass
+
+
 class InvalidResponseDataError(Exception):
     pass
 
 
 class AnalyzeError(Exception):
     pass
+
+
+class PipelineError(Exception):
+    pass
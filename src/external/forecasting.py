@@ -1,8 +1,14 @@
+import json
+from pathlib import Path
 from typing import Protocol, Mapping
 
 from config import root_logger, UNEXPECTED_ERROR_MESSAGE_TEMPLATE
 from external import YandexWeatherAPI
+from external.catalog import CityCatalog
+from external.concurrency import report_request_error
 from external.exceptions import CityKeyError
+from external.metrics import request_label
+from external.resilience import RetryPolicy, CircuitBreakerRegistry
 from external.utils import get_url_by_city_name
 
 
@@ -11,12 +17,26 @@ class ForecastWeatherSource(Protocol):
         raise NotImplementedError
 
 
-class YandexWeatherAPIForecastWeatherSource(ForecastWeatherSource):
-    @staticmethod
-    def _get_url_by_city(city_name: str) -> str | None:
+class RawForecastWeatherSource(Protocol):
+    def save_weather_by_city(self, city_name: str, path: Path, validate: bool = False) -> bool:
+        raise NotImplementedError
+
+
+class YandexWeatherAPIForecastWeatherSource(ForecastWeatherSource, RawForecastWeatherSource):
+    retry_policy: RetryPolicy = RetryPolicy()
+    circuit_breakers: CircuitBreakerRegistry = CircuitBreakerRegistry()
+
+    def __init__(self, city_catalog: CityCatalog | None = None) -> None:
+        # Cities are looked up in the default catalog of external.utils unless catalog is given
+        self.city_catalog = city_catalog
+
+    def _get_url_by_city(self, city_name: str) -> str | None:
         city_url = None
         try:
-            city_url = get_url_by_city_name(city_name)
+            if self.city_catalog is not None:
+                city_url = self.city_catalog.get_url(city_name)
+            else:
+                city_url = get_url_by_city_name(city_name)
         except CityKeyError:
             root_logger.error(f"\"{city_name}\" not found in cities")
         except Exception as err:
@@ -24,15 +44,59 @@ class YandexWeatherAPIForecastWeatherSource(ForecastWeatherSource):
 
         return city_url
 
-    @classmethod
-    def get_weather_by_city(cls, city_name: str) -> Mapping | None:
-        city_url = cls._get_url_by_city(city_name=city_name)
+    def _fetch_forecasting(self, city_url: str) -> Mapping:
+        circuit_breaker = self.circuit_breakers.get_breaker(city_url)
+        return self.retry_policy.call(circuit_breaker.call, YandexWeatherAPI.get_forecasting, city_url)
+
+    def get_weather_by_city(self, city_name: str) -> Mapping | None:
+        city_url = self._get_url_by_city(city_name=city_name)
         if city_url is None:
             return None
 
         weather_data = None
         try:
-            weather_data = YandexWeatherAPI.get_forecasting(city_url)
+            with request_label(city_name):
+                weather_data = self._fetch_forecasting(city_url)
+        except Exception as err:
+            report_request_error(err)
+            root_logger.error(UNEXPECTED_ERROR_MESSAGE_TEMPLATE.format(error=err))
+
+        return weather_data
+
+    def save_weather_by_city(self, city_name: str, path: Path, validate: bool = False) -> bool:
+        city_url = self._get_url_by_city(city_name=city_name)
+        if city_url is None:
+            return False
+
+        circuit_breaker = self.circuit_breakers.get_breaker(city_url)
+        try:
+            with request_label(city_name):
+                self.retry_policy.call(
+                    circuit_breaker.call, YandexWeatherAPI.save_forecasting, city_url, path, validate
+                )
+        except Exception as err:
+            report_request_error(err)
+            root_logger.error(UNEXPECTED_ERROR_MESSAGE_TEMPLATE.format(error=err))
+            return False
+
+        return True
+
+
+class JsonFileForecastWeatherSource(ForecastWeatherSource):
+    """
+    Replays forecasts saved by DataFetchingTask as <city>.json files
+    """
+
+    def __init__(self, input_dir: Path) -> None:
+        self.input_dir = input_dir
+
+    def get_weather_by_city(self, city_name: str) -> Mapping | None:
+        weather_data = None
+        try:
+            with (self.input_dir / f"{city_name}.json").open(encoding="utf8") as f:
+                weather_data = json.load(f)
+        except FileNotFoundError:
+            root_logger.error(f"\"{city_name}\" not found in {self.input_dir}")
         except Exception as err:
             root_logger.error(UNEXPECTED_ERROR_MESSAGE_TEMPLATE.format(error=err))
 
@@ -0,0 +1,83 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from typing import Mapping, Sequence
+
+from config import (root_logger, UNEXPECTED_ERROR_MESSAGE_TEMPLATE, HEDGE_PERCENTILE, HEDGE_INITIAL_DELAY,
+                    HEDGE_HISTORY_SIZE, HEDGE_MAX_WORKERS)
+from external.forecasting import ForecastWeatherSource
+
+
+class HedgedForecastWeatherSource(ForecastWeatherSource):
+    """
+    Sends city request to the first source and hedges it to the next one
+    if no valid answer arrived within the latency percentile of previous requests.
+    The first valid answer wins, not started losers are cancelled
+    and results of already running ones are dropped.
+    """
+
+    def __init__(
+            self,
+            sources: Sequence[ForecastWeatherSource],
+            percentile: float = HEDGE_PERCENTILE,
+            initial_delay: float = HEDGE_INITIAL_DELAY,
+            history_size: int = HEDGE_HISTORY_SIZE,
+            max_workers: int = HEDGE_MAX_WORKERS,
+    ) -> None:
+        if not sources:
+            raise ValueError("At least one source is required")
+
+        self.sources = sources
+        self.percentile = percentile
+        self.initial_delay = initial_delay
+        self._latencies: deque[float] = deque(maxlen=history_size)
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hedge")
+
+    @property
+    def hedge_delay(self) -> float:
+        with self._lock:
+            latencies = sorted(self._latencies)
+        if not latencies:
+            return self.initial_delay
+
+        index = min(len(latencies) - 1, int(len(latencies) * self.percentile / 100))
+        return latencies[index]
+
+    def _get_weather(self, source: ForecastWeatherSource, city_name: str) -> Mapping | None:
+        start = time.monotonic()
+        try:
+            weather_data = source.get_weather_by_city(city_name=city_name)
+        except Exception as err:
+            root_logger.error(UNEXPECTED_ERROR_MESSAGE_TEMPLATE.format(error=err))
+            return None
+
+        if weather_data is not None:
+            with self._lock:
+                self._latencies.append(time.monotonic() - start)
+        return weather_data
+
+    def get_weather_by_city(self, city_name: str) -> Mapping | None:
+        pending: set[Future] = set()
+        sources = iter(self.sources)
+        sources_left = len(self.sources)
+
+        while True:
+            if sources_left:
+                pending.add(self._executor.submit(self._get_weather, next(sources), city_name))
+                sources_left -= 1
+            if not pending:
+                return None
+
+            done, pending = wait(pending, timeout=self.hedge_delay if sources_left else None,
+                                 return_when=FIRST_COMPLETED)
+            for future in done:
+                weather_data = future.result()
+                if weather_data is not None:
+                    for loser in pending:
+                        loser.cancel()
+                    return weather_data
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
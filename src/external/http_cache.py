@@ -0,0 +1,102 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Mapping
+
+from config import HTTP_CACHE_DIR
+
+ETAG_HEADER = "ETag"
+LAST_MODIFIED_HEADER = "Last-Modified"
+IF_NONE_MATCH_HEADER = "If-None-Match"
+IF_MODIFIED_SINCE_HEADER = "If-Modified-Since"
+
+
+@dataclass(frozen=True, slots=True)
+class CachedResponse:
+    body: bytes | bytearray
+    etag: str | None = None
+    last_modified: str | None = None
+
+    @property
+    def conditional_headers(self) -> Mapping[str, str]:
+        headers = {}
+        if self.etag:
+            headers[IF_NONE_MATCH_HEADER] = self.etag
+        if self.last_modified:
+            headers[IF_MODIFIED_SINCE_HEADER] = self.last_modified
+        return headers
+
+
+class HTTPDiskCache:
+    """
+    On-disk storage of response bodies with their ETag / Last-Modified validators
+    """
+
+    def __init__(self, cache_dir: Path = HTTP_CACHE_DIR) -> None:
+        self.cache_dir = cache_dir
+
+    def _get_paths(self, url: str) -> tuple[Path, Path]:
+        key = hashlib.sha256(url.encode("utf8")).hexdigest()
+        return self.cache_dir / f"{key}.meta.json", self.cache_dir / f"{key}.body"
+
+    @staticmethod
+    def _get_temp_path(path: Path) -> Path:
+        return path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+    def get_temp_path(self, url: str) -> Path:
+        """Path in cache dir to collect a body before it is stored with set_from_file"""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        _, body_path = self._get_paths(url)
+        return self._get_temp_path(body_path.with_suffix(".incoming"))
+
+    @staticmethod
+    def _write_atomic(path: Path, data: bytes | bytearray) -> None:
+        temp_path = HTTPDiskCache._get_temp_path(path)
+        temp_path.write_bytes(data)
+        os.replace(temp_path, path)
+
+    def get(self, url: str) -> CachedResponse | None:
+        meta_path, body_path = self._get_paths(url)
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf8"))
+            body = body_path.read_bytes()
+        except (OSError, ValueError):
+            return None
+
+        if meta.get("url") != url:
+            return None
+        return CachedResponse(body=body, etag=meta.get("etag"), last_modified=meta.get("last_modified"))
+
+    def _write_meta(self, url: str, response: CachedResponse) -> None:
+        meta_path, _ = self._get_paths(url)
+        meta = {"url": url, "etag": response.etag, "last_modified": response.last_modified}
+        self._write_atomic(meta_path, json.dumps(meta).encode("utf8"))
+
+    def set(self, url: str, response: CachedResponse) -> None:
+        if not (response.etag or response.last_modified):
+            return
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        _, body_path = self._get_paths(url)
+        # Body goes first, so meta never points to a missing or partial body
+        self._write_atomic(body_path, response.body)
+        self._write_meta(url, response)
+
+    def set_from_file(self, url: str, path: Path, response: CachedResponse) -> None:
+        """Store body already saved to path, response is used only for its validators"""
+        if not (response.etag or response.last_modified):
+            return
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        _, body_path = self._get_paths(url)
+        temp_path = self._get_temp_path(body_path)
+        shutil.copyfile(path, temp_path)
+        os.replace(temp_path, body_path)
+        self._write_meta(url, response)
+
+    def clear(self) -> None:
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
@@ -0,0 +1,349 @@
+"""
+Incremental JSON parser which materializes only selected paths of a document.
+
+Selection is described by a spec tree:
+- dict: keep listed keys of an object, every key maps to a nested spec;
+- list with a single spec: keep every item of an array;
+- True: keep the whole value as is.
+Everything else is scanned and thrown away without building python objects.
+
+Module depends only on the standard library, so external/analyzer.py can use it when run as a script.
+"""
+import codecs
+import json
+import re
+from json import JSONDecodeError
+from typing import Any, Iterable
+
+FORECAST_SPEC = {
+    "forecasts": [
+        {
+            "date": True,
+            "hours": [
+                {
+                    "hour": True,
+                    "temp": True,
+                    "condition": True,
+                },
+            ],
+        },
+    ],
+}
+
+_NON_WHITESPACE = re.compile(r"[^ \t\n\r]")
+_STRING = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)
+_NUMBER = re.compile(r"-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][+-]?\d+)?")
+_SKIP_SPECIAL = re.compile(r'["{}\[\]]')
+_LITERALS = ("true", "false", "null")
+
+# Parser states
+_VALUE = 0
+_VALUE_OR_END = 1
+_KEY = 2
+_KEY_OR_END = 3
+_COLON = 4
+_COMMA_OR_END = 5
+_DONE = 6
+
+_NOT_SELECTED = object()
+_RAW_DECODER = json.JSONDecoder()
+
+
+class _Frame:
+    __slots__ = ("is_object", "spec", "value", "key")
+
+    def __init__(self, is_object: bool, spec: Any, value: Any) -> None:
+        self.is_object = is_object
+        self.spec = spec
+        self.value = value
+        self.key = None
+
+
+class SelectiveJSONParser:
+    """
+    Push parser: feed it with chunks while they arrive and call close() to get the selected data
+    """
+
+    def __init__(self, spec: Any = FORECAST_SPEC) -> None:
+        self.spec = spec
+        self.result: Any = None
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+        self._state = _VALUE
+        self._stack: list[_Frame] = []
+        self._skip_depth = 0
+
+    def feed(self, chunk: bytes | bytearray) -> None:
+        self._buffer = self._buffer[self._pos:] + self._decoder.decode(chunk)
+        self._pos = 0
+        self._parse()
+
+    def close(self) -> Any:
+        self._buffer = self._buffer[self._pos:] + self._decoder.decode(b"", final=True)
+        self._pos = 0
+        self._eof = True
+        self._parse()
+        if self._state != _DONE:
+            self._error("Unexpected end of data")
+        return self.result
+
+    def _error(self, message: str) -> None:
+        raise JSONDecodeError(message, self._buffer, self._pos)
+
+    def _get_value_spec(self) -> Any:
+        if not self._stack:
+            return self.spec
+        frame = self._stack[-1]
+        if frame.is_object:
+            return frame.spec.get(frame.key, _NOT_SELECTED)
+        return frame.spec[0]
+
+    def _add_value(self, value: Any) -> None:
+        if not self._stack:
+            self.result = value
+            return
+        frame = self._stack[-1]
+        if frame.value is None:
+            return
+        if frame.is_object:
+            frame.value[frame.key] = value
+        else:
+            frame.value.append(value)
+
+    def _value_done(self) -> None:
+        self._state = _COMMA_OR_END if self._stack else _DONE
+
+    def _skip_compound(self) -> bool:
+        """Fast skip of not selected object or array, return False if more data is needed"""
+        buffer = self._buffer
+        while self._skip_depth:
+            match = _SKIP_SPECIAL.search(buffer, self._pos)
+            if match is None:
+                self._pos = len(buffer)
+                return False
+            char = match.group()
+            if char == '"':
+                string_match = _STRING.match(buffer, match.start())
+                if string_match is None:
+                    self._pos = match.start()
+                    return False
+                self._pos = string_match.end()
+                continue
+            self._skip_depth += 1 if char in "{[" else -1
+            self._pos = match.end()
+
+        self._value_done()
+        return True
+
+    def _read_scalar(self) -> tuple[bool, Any]:
+        """Read string, number or literal, return False as first item if more data is needed"""
+        buffer, pos = self._buffer, self._pos
+        char = buffer[pos]
+        if char == '"':
+            match = _STRING.match(buffer, pos)
+            if match is None:
+                if self._eof:
+                    self._error("Unterminated string")
+                return False, None
+            self._pos = match.end()
+            token = match.group()
+            return True, token[1:-1] if "\\" not in token else json.loads(token)
+
+        match = _NUMBER.match(buffer, pos)
+        if match is None and char == "-" and pos + 1 == len(buffer) and not self._eof:
+            return False, None
+        if match is not None:
+            # Number may continue in the next chunk, e.g. "12" + ".5" or "1" + "e3"
+            end = match.end()
+            if not self._eof and (end == len(buffer) or buffer[end] in ".eE+-"):
+                return False, None
+            self._pos = match.end()
+            token = match.group()
+            return True, int(token) if token.lstrip("-").isdigit() else float(token)
+
+        for literal, value in zip(_LITERALS, (True, False, None)):
+            if buffer.startswith(literal, pos):
+                self._pos = pos + len(literal)
+                return True, value
+            if len(buffer) - pos < len(literal) and literal.startswith(buffer[pos:]) and not self._eof:
+                return False, None
+
+        self._error("Expecting value")
+        return False, None
+
+    @staticmethod
+    def _is_flat_spec(spec: Any) -> bool:
+        if isinstance(spec, list):
+            spec = spec[0]
+        return isinstance(spec, dict) and all(item is True for item in spec.values())
+
+    def _read_flat_value(self, spec: Any) -> bool:
+        """
+        Objects with only leaf keys selected (e.g. hours) and arrays of them are small,
+        so they are decoded at once by C json decoder when fully buffered
+        """
+        try:
+            value, end = _RAW_DECODER.raw_decode(self._buffer, self._pos)
+        except JSONDecodeError:
+            if self._eof:
+                raise
+            return False
+
+        self._pos = end
+        value = _select_flat(value, spec)
+        if value is not _NOT_SELECTED:
+            self._add_value(value)
+        self._value_done()
+        return True
+
+    def _start_value(self) -> bool:
+        spec = self._get_value_spec()
+        char = self._buffer[self._pos]
+        if char in "{[" and self._is_flat_spec(spec):
+            return self._read_flat_value(spec)
+        if char in "{[":
+            is_object = char == "{"
+            if spec is True:
+                spec = _KEEP_ALL
+            elif spec is _NOT_SELECTED or not isinstance(spec, dict if is_object else list):
+                self._pos += 1
+                self._skip_depth = 1
+                return self._skip_compound()
+            value: Any = {} if is_object else []
+            self._add_value(value)
+            self._stack.append(_Frame(is_object=is_object, spec=spec, value=value))
+            self._pos += 1
+            self._state = _KEY_OR_END if is_object else _VALUE_OR_END
+            return True
+
+        is_complete, value = self._read_scalar()
+        if not is_complete:
+            return False
+        if spec is not _NOT_SELECTED:
+            self._add_value(value)
+        self._value_done()
+        return True
+
+    def _end_container(self) -> None:
+        self._stack.pop()
+        self._pos += 1
+        self._value_done()
+
+    def _parse_punctuation(self, char: str) -> None:
+        frame = self._stack[-1]
+        state = self._state
+        if state == _COLON:
+            if char != ":":
+                self._error("Expecting ':' delimiter")
+            self._pos += 1
+            self._state = _VALUE
+        elif state == _COMMA_OR_END:
+            if char == ",":
+                self._pos += 1
+                self._state = _KEY if frame.is_object else _VALUE
+            elif char == ("}" if frame.is_object else "]"):
+                self._end_container()
+            else:
+                self._error("Expecting ',' delimiter")
+        elif state == _VALUE_OR_END and char == "]":
+            self._end_container()
+        elif state == _KEY_OR_END and char == "}":
+            self._end_container()
+        else:
+            self._error("Unexpected character")
+
+    def _parse_key(self) -> bool:
+        if self._buffer[self._pos] != '"':
+            self._error("Expecting property name enclosed in double quotes")
+        is_complete, key = self._read_scalar()
+        if not is_complete:
+            return False
+        self._stack[-1].key = key
+        self._state = _COLON
+        return True
+
+    def _parse(self) -> None:
+        while True:
+            if self._skip_depth and not self._skip_compound():
+                return
+
+            match = _NON_WHITESPACE.search(self._buffer, self._pos)
+            if match is None:
+                self._pos = len(self._buffer)
+                return
+            self._pos = match.start()
+            if self._state == _DONE:
+                self._error("Extra data")
+
+            char = self._buffer[self._pos]
+            if self._state == _VALUE or (self._state == _VALUE_OR_END and char != "]"):
+                is_progress = self._start_value()
+            elif self._state in (_KEY, _KEY_OR_END) and char == '"':
+                is_progress = self._parse_key()
+            else:
+                self._parse_punctuation(char)
+                is_progress = True
+
+            if not is_progress:
+                return
+
+
+class _KeepAll:
+    """Spec for items of a container which is kept entirely"""
+    __slots__ = ()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return True
+
+    def __getitem__(self, index: int) -> Any:
+        return True
+
+
+_KEEP_ALL = _KeepAll()
+
+
+def extract_json(chunks: Iterable[bytes | bytearray], spec: Any = FORECAST_SPEC) -> Any:
+    """Parse chunks of json document and return only the paths selected by spec"""
+    parser = SelectiveJSONParser(spec=spec)
+    for chunk in chunks:
+        parser.feed(chunk)
+    return parser.close()
+
+
+def _select_flat(value: Any, spec: Any) -> Any:
+    """Faster _select for flat specs and arrays of them"""
+    if isinstance(spec, list):
+        if not isinstance(value, list):
+            return _NOT_SELECTED
+        keys = tuple(spec[0])
+        return [{key: item[key] for key in keys if key in item} if isinstance(item, dict) else item
+                for item in value if not isinstance(item, list)]
+    if not isinstance(value, dict):
+        return _NOT_SELECTED
+    return {key: value[key] for key in spec if key in value}
+
+
+def _select(value: Any, spec: Any) -> Any:
+    if spec is True:
+        return value
+    if isinstance(value, dict):
+        if not isinstance(spec, dict):
+            return _NOT_SELECTED
+        selected = {}
+        for key, key_spec in spec.items():
+            if key in value and (item := _select(value[key], key_spec)) is not _NOT_SELECTED:
+                selected[key] = item
+        return selected
+    if isinstance(value, list):
+        if not isinstance(spec, list):
+            return _NOT_SELECTED
+        return [item for item in (_select(item, spec[0]) for item in value) if item is not _NOT_SELECTED]
+    return value
+
+
+def select_json(value: Any, spec: Any = FORECAST_SPEC) -> Any:
+    """Same selection as extract_json for an already parsed document"""
+    selected = _select(value, spec)
+    return None if selected is _NOT_SELECTED else selected
@@ -0,0 +1,164 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Iterator
+
+from config import LATENCY_MAX_LABELS
+
+# Request phases in the order they happen
+DNS_PHASE = "dns"
+CONNECT_PHASE = "connect"
+TLS_PHASE = "tls"
+TTFB_PHASE = "ttfb"
+BODY_READ_PHASE = "body_read"
+JSON_DECODE_PHASE = "json_decode"
+TOTAL_PHASE = "total"
+PHASES = (DNS_PHASE, CONNECT_PHASE, TLS_PHASE, TTFB_PHASE, BODY_READ_PHASE, JSON_DECODE_PHASE, TOTAL_PHASE)
+
+GLOBAL_LABEL = "*"
+# Label of requests recorded after max_labels labels are taken
+OTHER_LABEL = "..."
+_LABEL_TITLES = {GLOBAL_LABEL: "all requests", OTHER_LABEL: "other requests"}
+# Upper bounds of histogram buckets in milliseconds, the last bucket is unbounded
+HISTOGRAM_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+
+@dataclass(slots=True)
+class RequestTimings:
+    """Durations of request phases in seconds, phases of reused connections are absent"""
+    phases: dict[str, float] = field(default_factory=dict)
+
+    def add(self, phase: str, duration: float) -> None:
+        self.phases[phase] = self.phases.get(phase, 0.0) + duration
+
+    @contextmanager
+    def measure(self, phase: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(phase, time.perf_counter() - start)
+
+
+@dataclass(slots=True)
+class Histogram:
+    counts: list[int] = field(default_factory=lambda: [0] * (len(HISTOGRAM_BUCKETS_MS) + 1))
+    count: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+
+    def add(self, value_ms: float) -> None:
+        self.counts[bisect.bisect_left(HISTOGRAM_BUCKETS_MS, value_ms)] += 1
+        self.count += 1
+        self.total_ms += value_ms
+        self.max_ms = max(self.max_ms, value_ms)
+
+    def percentile(self, percent: float) -> float:
+        """Upper bound of the bucket holding the percentile, max value for the last bucket"""
+        rank = self.count * percent / 100
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank and bucket_count:
+                return HISTOGRAM_BUCKETS_MS[index] if index < len(HISTOGRAM_BUCKETS_MS) else self.max_ms
+        return self.max_ms
+
+    def __str__(self) -> str:
+        avg_ms = self.total_ms / self.count if self.count else 0.0
+        return (
+            f"count={self.count} avg={avg_ms:.1f}ms p50<={self.percentile(50):.0f}ms "
+            f"p95<={self.percentile(95):.0f}ms max={self.max_ms:.1f}ms"
+        )
+
+
+class LatencyRecorder:
+    """
+    Aggregates request phase timings into per-label (city) and global histograms.
+    At most max_labels labels get own histograms, requests of the rest share OTHER_LABEL ones,
+    so memory does not grow with the count of cities.
+    """
+
+    def __init__(self, max_labels: int = LATENCY_MAX_LABELS) -> None:
+        self.max_labels = max_labels
+        self._histograms: dict[str, dict[str, Histogram]] = {}
+        self._lock = threading.Lock()
+
+    def _get_label(self, label: str) -> str:
+        if label in self._histograms:
+            return label
+        # Global and other labels are not counted in max_labels
+        label_count = len(self._histograms.keys() - {GLOBAL_LABEL, OTHER_LABEL})
+        return label if label_count < self.max_labels else OTHER_LABEL
+
+    def record(self, label: str, timings: RequestTimings) -> None:
+        with self._lock:
+            for hist_label in (self._get_label(label), GLOBAL_LABEL):
+                label_histograms = self._histograms.setdefault(hist_label, {})
+                for phase, duration in timings.phases.items():
+                    label_histograms.setdefault(phase, Histogram()).add(duration * 1000)
+
+    def get_histogram(self, phase: str, label: str = GLOBAL_LABEL) -> Histogram | None:
+        with self._lock:
+            return self._histograms.get(label, {}).get(phase)
+
+    def dump(self) -> str:
+        lines = []
+        with self._lock:
+            labels = sorted(self._histograms, key=lambda item: (item != GLOBAL_LABEL, item == OTHER_LABEL, item))
+            for label in labels:
+                lines.append(f"[{_LABEL_TITLES.get(label, label)}]")
+                label_histograms = self._histograms[label]
+                for phase in PHASES:
+                    if phase in label_histograms:
+                        lines.append(f"  {phase:<12} {label_histograms[phase]}")
+        return "\n".join(lines)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+
+
+latency_recorder = LatencyRecorder()
+# Timings of the request being made by the current thread or task
+current_request_timings: ContextVar[RequestTimings | None] = ContextVar("current_request_timings", default=None)
+# Label (city name) the current request is recorded under, url by default
+current_request_label: ContextVar[str | None] = ContextVar("current_request_label", default=None)
+
+
+def add_request_phase(phase: str, duration: float) -> None:
+    timings = current_request_timings.get()
+    if timings is not None:
+        timings.add(phase, duration)
+
+
+@contextmanager
+def measure_phase(phase: str) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_request_phase(phase, time.perf_counter() - start)
+
+
+@contextmanager
+def request_label(label: str) -> Iterator[None]:
+    token = current_request_label.set(label)
+    try:
+        yield
+    finally:
+        current_request_label.reset(token)
+
+
+@contextmanager
+def measure_request(url: str, recorder: LatencyRecorder = latency_recorder) -> Iterator[RequestTimings]:
+    timings = RequestTimings()
+    token = current_request_timings.set(timings)
+    try:
+        with timings.measure(TOTAL_PHASE):
+            yield timings
+    finally:
+        current_request_timings.reset(token)
+        recorder.record(current_request_label.get() or url, timings)
@@ -0,0 +1,94 @@
+import multiprocessing
+import time
+from multiprocessing.context import BaseContext
+from pathlib import Path
+from types import TracebackType
+from typing import Mapping
+
+from config import RATE_LIMIT_PER_SECOND, RATE_LIMIT_BURST, RATE_LIMIT_MAX_CONCURRENCY
+from external.forecasting import ForecastWeatherSource, RawForecastWeatherSource
+
+_TOKENS = 0
+_UPDATED_AT = 1
+
+
+class TokenBucketRateLimiter:
+    """
+    Token bucket limiting requests per second and simultaneous requests.
+    Bucket state lives in shared memory guarded by process-shared lock and semaphore,
+    so the limiter is shared by all threads and by child processes it is passed to
+    on creation (Process args or Pool initializer).
+    """
+
+    def __init__(
+            self,
+            rate: float = RATE_LIMIT_PER_SECOND,
+            burst: int = RATE_LIMIT_BURST,
+            max_concurrency: int = RATE_LIMIT_MAX_CONCURRENCY,
+            context: BaseContext | None = None,
+    ) -> None:
+        context = context or multiprocessing.get_context()
+        self.rate = rate
+        self.burst = burst
+        self.max_concurrency = max_concurrency
+        # CLOCK_MONOTONIC is system-wide, so timestamps are comparable between processes
+        self._state = context.RawArray("d", [float(burst), time.monotonic()])
+        self._lock = context.Lock()
+        self._slots = context.BoundedSemaphore(max_concurrency)
+
+    def _take_token(self) -> float:
+        """Take token if available and return 0, otherwise return time to wait for the next one"""
+        with self._lock:
+            now = time.monotonic()
+            elapsed = max(0.0, now - self._state[_UPDATED_AT])
+            tokens = min(float(self.burst), self._state[_TOKENS] + elapsed * self.rate)
+            self._state[_UPDATED_AT] = now
+            if tokens >= 1:
+                self._state[_TOKENS] = tokens - 1
+                return 0.0
+
+            self._state[_TOKENS] = tokens
+            return (1 - tokens) / self.rate
+
+    def acquire(self) -> None:
+        self._slots.acquire()
+        try:
+            while (delay := self._take_token()) > 0:
+                time.sleep(delay)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self) -> None:
+        self._slots.release()
+
+    def __enter__(self) -> "TokenBucketRateLimiter":
+        self.acquire()
+        return self
+
+    def __exit__(
+            self,
+            exc_type: type[BaseException] | None,
+            exc_val: BaseException | None,
+            exc_tb: TracebackType | None,
+    ) -> None:
+        self.release()
+
+
+class RateLimitedForecastWeatherSource(ForecastWeatherSource, RawForecastWeatherSource):
+    """
+    Opt-in rate limiting for any forecast source
+    """
+
+    def __init__(self, source: ForecastWeatherSource, limiter: TokenBucketRateLimiter) -> None:
+        self.source = source
+        self.limiter = limiter
+
+    def get_weather_by_city(self, city_name: str) -> Mapping | None:
+        with self.limiter:
+            return self.source.get_weather_by_city(city_name=city_name)
+
+    def save_weather_by_city(self, city_name: str, path: Path, validate: bool = False) -> bool:
+        raw_source: RawForecastWeatherSource = self.source  # type: ignore[assignment]
+        with self.limiter:
+            return raw_source.save_weather_by_city(city_name=city_name, path=path, validate=validate)
@@ -0,0 +1,128 @@
+import random
+import threading
+import time
+from dataclasses import dataclass
+from enum import Enum
+from http import HTTPStatus
+from typing import Callable, Any
+from urllib.parse import urlsplit
+
+from config import (root_logger, RETRY_ATTEMPTS, RETRY_BACKOFF_BASE, RETRY_BACKOFF_MAX, RETRY_MESSAGE_TEMPLATE,
+                    CIRCUIT_BREAKER_FAILURE_THRESHOLD, CIRCUIT_BREAKER_RESET_TIMEOUT)
+from external.exceptions import ConnectionApiError, HTTPStatusError, CircuitOpenError
+
+
+def is_transient_error(error: BaseException) -> bool:
+    """Timeouts, connection failures, 429 and 5xx responses are worth retrying, other errors are not"""
+    if isinstance(error, CircuitOpenError):
+        return False
+    if isinstance(error, HTTPStatusError):
+        return error.status >= HTTPStatus.INTERNAL_SERVER_ERROR or error.status == HTTPStatus.TOO_MANY_REQUESTS
+    return isinstance(error, ConnectionApiError)
+
+
+@dataclass(frozen=True, slots=True)
+class RetryPolicy:
+    attempts: int = RETRY_ATTEMPTS
+    backoff_base: float = RETRY_BACKOFF_BASE
+    backoff_max: float = RETRY_BACKOFF_MAX
+
+    def get_delay(self, attempt: int) -> float:
+        """Exponential backoff with full jitter"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def call(self, func: Callable, *args: Any, **kwargs: Any) -> Any:
+        for attempt in range(1, self.attempts + 1):
+            try:
+                return func(*args, **kwargs)
+            except Exception as err:
+                if attempt >= self.attempts or not is_transient_error(err):
+                    raise
+                delay = self.get_delay(attempt)
+                root_logger.warning(RETRY_MESSAGE_TEMPLATE.format(attempt=attempt, delay=delay, error=err))
+                time.sleep(delay)
+
+
+class CircuitState(Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+
+class CircuitBreaker:
+    """
+    Opens after failure_threshold consecutive transient failures and fails fast
+    until reset_timeout passes, then lets a single probe call through
+    """
+
+    def __init__(
+            self,
+            failure_threshold: int = CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+            reset_timeout: float = CIRCUIT_BREAKER_RESET_TIMEOUT,
+    ) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CircuitState.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def _before_call(self) -> None:
+        with self._lock:
+            if self.state == CircuitState.CLOSED:
+                return
+            if self.state == CircuitState.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = CircuitState.HALF_OPEN
+                return
+            raise CircuitOpenError("Circuit breaker is open")
+
+    def _on_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self.state = CircuitState.CLOSED
+
+    def _on_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self.state == CircuitState.HALF_OPEN or self._failures >= self.failure_threshold:
+                self.state = CircuitState.OPEN
+                self._opened_at = time.monotonic()
+
+    def call(self, func: Callable, *args: Any, **kwargs: Any) -> Any:
+        self._before_call()
+        try:
+            result = func(*args, **kwargs)
+        except Exception as err:
+            if is_transient_error(err):
+                self._on_failure()
+            else:
+                self._on_success()
+            raise
+
+        self._on_success()
+        return result
+
+
+class CircuitBreakerRegistry:
+    """
+    Keeps one circuit breaker per host
+    """
+
+    def __init__(
+            self,
+            failure_threshold: int = CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+            reset_timeout: float = CIRCUIT_BREAKER_RESET_TIMEOUT,
+    ) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._breakers: dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def get_breaker(self, url: str) -> CircuitBreaker:
+        host = urlsplit(url).netloc
+        with self._lock:
+            breaker = self._breakers.get(host)
+            if breaker is None:
+                breaker = CircuitBreaker(failure_threshold=self.failure_threshold, reset_timeout=self.reset_timeout)
+                self._breakers[host] = breaker
+            return breaker
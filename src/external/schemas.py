@@ -1,5 +1,8 @@
 from dataclasses import dataclass, field
-from typing import Mapping
+from typing import Mapping, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from external.compact_forecast import CompactForecast
 
 
 @dataclass(frozen=True, slots=True)
@@ -8,6 +11,13 @@ class Weather:
     weather_data: Mapping | None = field(default_factory=dict)
 
 
+@dataclass(frozen=True, slots=True)
+class CompactWeather:
+    city: str
+    # None for empty weather data
+    forecast: "CompactForecast | None"
+
+
 @dataclass(frozen=True, slots=True)
 class Statistic:
     average_temperature: float | int
@@ -1,29 +1,11 @@
 import time
 from typing import Callable, Any
 
-from config import root_logger
-from external.exceptions import CityKeyError
-
-CITIES = {
-    "MOSCOW": "https://code.s3.yandex.net/async-module/moscow-response.json",
-    "PARIS": "https://code.s3.yandex.net/async-module/paris-response.json",
-    "LONDON": "https://code.s3.yandex.net/async-module/london-response.json",
-    "BERLIN": "https://code.s3.yandex.net/async-module/berlin-response.json",
-    "BEIJING": "https://code.s3.yandex.net/async-module/beijing-response.json",
-    "KAZAN": "https://code.s3.yandex.net/async-module/kazan-response.json",
-    "SPETERSBURG": "https://code.s3.yandex.net/async-module/spetersburg-response.json",
-    "VOLGOGRAD": "https://code.s3.yandex.net/async-module/volgograd-response.json",
-    "NOVOSIBIRSK": "https://code.s3.yandex.net/async-module/novosibirsk-response.json",
-    "KALININGRAD": "https://code.s3.yandex.net/async-module/kaliningrad-response.json",
-    "ABUDHABI": "https://code.s3.yandex.net/async-module/abudhabi-response.json",
-    "WARSZAWA": "https://code.s3.yandex.net/async-module/warszawa-response.json",
-    "BUCHAREST": "https://code.s3.yandex.net/async-module/bucharest-response.json",
-    "ROMA": "https://code.s3.yandex.net/async-module/roma-response.json",
-    "CAIRO": "https://code.s3.yandex.net/async-module/cairo-response.json",
-    "GIZA": "https://code.s3.yandex.net/async-module/giza-response.json",
-    "MADRID": "https://code.s3.yandex.net/async-module/madrid-response.json",
-    "TORONTO": "https://code.s3.yandex.net/async-module/toronto-response.json"
-}
+from config import root_logger, CITY_CATALOG_PATH
+from external.catalog import CityCatalog
+
+# Cities shipped with the project, the catalog file is the only list of them
+city_catalog = CityCatalog(CITY_CATALOG_PATH)
 
 MIN_MAJOR_PYTHON_VER = 3
 MIN_MINOR_PYTHON_VER = 9
@@ -41,10 +23,7 @@ def check_python_version():
 
 
 def get_url_by_city_name(city_name):
-    try:
-        return CITIES[city_name]
-    except KeyError:
-        raise CityKeyError("Please check that city {} exists".format(city_name))
+    return city_catalog.get_url(city_name)
 
 
 def timer(func: Callable) -> Callable:
@@ -0,0 +1,154 @@
+import copy
+import logging
+from typing import Dict, List, Mapping, Sequence
+
+import numpy as np
+
+from external.analyzer import DEFAULT_ANALYSIS_POLICY, DEFAULT_OUTPUT_RESULT, OUTPUT_DAYS_KEY, AnalysisPolicy
+from external.compact_forecast import CONDITION_TYPECODE, CompactForecast
+
+_EMPTY_DAY_RESULT = {
+    "date": None,
+    "hours_start": None,
+    "hours_end": None,
+    "hours_count": None,
+    "temp_avg": None,
+    "relevant_cond_hours": 0,
+}
+
+
+class _HourArrays:
+    """Columns of many forecasts concatenated, day_index maps every hour to its day across all forecasts"""
+
+    def __init__(self, forecasts: Sequence[CompactForecast], policy: AnalysisPolicy) -> None:
+        day_offsets = [np.frombuffer(forecast.day_offsets, dtype=np.int64) for forecast in forecasts]
+        lengths = np.concatenate([np.diff(offsets) for offsets in day_offsets] or [np.empty(0, dtype=np.int64)])
+
+        self.days_count = len(lengths)
+        self.day_index = np.repeat(np.arange(self.days_count), lengths)
+        self.hour = self._concatenate([forecast.hours for forecast in forecasts], np.int16).astype(np.int64)
+        self.temperature = self._concatenate([forecast.temperatures for forecast in forecasts], np.float64)
+        condition_codes = self._concatenate(
+            [forecast.condition_codes for forecast in forecasts],
+            np.dtype(CONDITION_TYPECODE),
+        )
+        suitable_conditions_table = np.frombuffer(policy.suitable_conditions_table, dtype=np.bool_)
+        self.is_cond_suitable = suitable_conditions_table[condition_codes]
+        self.position = np.arange(len(self.hour))
+
+    @staticmethod
+    def _concatenate(columns: Sequence, dtype: type | np.dtype) -> np.ndarray:
+        return np.concatenate([np.frombuffer(column, dtype=dtype) for column in columns] or [np.empty(0, dtype)])
+
+
+def _reduce_days(arrays: _HourArrays, policy: AnalysisPolicy) -> Dict[str, np.ndarray]:
+    days_count = arrays.days_count
+    mask = (arrays.hour >= policy.hours_start) & (arrays.hour <= policy.hours_end)
+    day_index = arrays.day_index[mask]
+    hour = arrays.hour[mask]
+    position = arrays.position[mask]
+    temperature = arrays.temperature[mask]
+    if np.isnan(temperature).any():
+        # Same error as int(None) in HourInfo for an hour in the window without temperature
+        raise TypeError("Temperature is missing for an hour in the day window")
+
+    hours_count = np.bincount(day_index, minlength=days_count)
+    temperature_sum = np.zeros(days_count, dtype=np.int64)
+    np.add.at(temperature_sum, day_index, np.trunc(temperature).astype(np.int64))
+    cond_hours = np.bincount(day_index, weights=arrays.is_cond_suitable[mask], minlength=days_count)
+    # hour_end is the last hour in the window, hour_start is the first non-zero one (`hour_start or h_hour`)
+    last_position = np.full(days_count, -1)
+    np.maximum.at(last_position, day_index, position)
+    first_position = np.full(days_count, len(arrays.hour))
+    non_zero = hour != 0
+    np.minimum.at(first_position, day_index[non_zero], position[non_zero])
+    return {
+        "hours_count": hours_count,
+        "temperature_sum": temperature_sum,
+        "cond_hours": cond_hours.astype(np.int64),
+        "first_position": first_position,
+        "last_position": last_position,
+    }
+
+
+def _day_to_json(date: str | None, is_empty: bool, day_number: int, hours: np.ndarray, reduced: Dict) -> Dict:
+    if is_empty:
+        return dict(_EMPTY_DAY_RESULT)
+
+    hours_count = int(reduced["hours_count"][day_number])
+    hours_start = hours_end = temperature_avg = None
+    if hours_count > 0:
+        first_position = reduced["first_position"][day_number]
+        hours_start = int(hours[first_position]) if first_position < len(hours) else 0
+        hours_end = int(hours[reduced["last_position"][day_number]])
+        temperature_avg = int(reduced["temperature_sum"][day_number]) / hours_count
+
+    return {
+        "date": date,
+        "hours_start": hours_start,
+        "hours_end": hours_end,
+        "hours_count": hours_count,
+        "temp_avg": round(temperature_avg, 3) if temperature_avg else temperature_avg,
+        "relevant_cond_hours": int(reduced["cond_hours"][day_number]),
+    }
+
+
+def analyze_days(
+        forecasts: Sequence[CompactForecast],
+        policy: AnalysisPolicy = DEFAULT_ANALYSIS_POLICY,
+) -> List[List[Dict]]:
+    """Same as DayInfo(raw_data=day).to_json() for every day of every forecast, reduced over all hours at once"""
+    arrays = _HourArrays(forecasts, policy)
+    reduced = _reduce_days(arrays, policy)
+
+    results = []
+    day_number = 0
+    for forecast in forecasts:
+        days = []
+        for date, is_empty in zip(forecast.dates, forecast.is_empty_day):
+            days.append(_day_to_json(date, bool(is_empty), day_number, arrays.hour, reduced))
+            day_number += 1
+        results.append(days)
+    return results
+
+
+def analyze_compact_batch(
+        forecasts: Sequence[CompactForecast | None],
+        policy: AnalysisPolicy = DEFAULT_ANALYSIS_POLICY,
+) -> List[Dict]:
+    """analyze_json results for compact forecasts, None stands for empty input data"""
+    days_lists = iter(analyze_days([forecast for forecast in forecasts if forecast is not None], policy))
+
+    results: List[Dict] = []
+    for forecast in forecasts:
+        if forecast is None:
+            results.append({})
+            continue
+        result = copy.deepcopy(DEFAULT_OUTPUT_RESULT)
+        result[OUTPUT_DAYS_KEY] = next(days_lists)
+        results.append(result)
+    return results
+
+
+def analyze_compact(forecast: CompactForecast, policy: AnalysisPolicy = DEFAULT_ANALYSIS_POLICY) -> Dict:
+    return analyze_compact_batch([forecast], policy)[0]
+
+
+def to_compact(data: Mapping | None) -> CompactForecast | None:
+    if not data:
+        logging.warning("Input data is empty...")
+        return None
+    return CompactForecast.from_json(data)
+
+
+def analyze_json_batch(
+        data_list: Sequence[Mapping | None],
+        policy: AnalysisPolicy = DEFAULT_ANALYSIS_POLICY,
+) -> List[Dict]:
+    """Same as [analyze_json(data, policy) for data in data_list], days of all cities are reduced at once"""
+    return analyze_compact_batch([to_compact(data) for data in data_list], policy)
+
+
+def analyze_json(data: Mapping | None, policy: AnalysisPolicy = DEFAULT_ANALYSIS_POLICY) -> Dict:
+    """Drop-in replacement for external.analyzer.analyze_json"""
+    return analyze_compact_batch([to_compact(data)], policy)[0]
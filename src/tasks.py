@@ -1,22 +1,42 @@
 import json
+import multiprocessing
 import os
+import pickle
+import queue
 import subprocess
-from concurrent.futures import ThreadPoolExecutor
-from dataclasses import dataclass, field
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor, Future, as_completed, wait, FIRST_COMPLETED
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field, replace
+from enum import Enum
+from functools import partial
+from itertools import islice
 from multiprocessing import cpu_count
 from multiprocessing.pool import Pool
 from pathlib import Path
-from typing import Mapping, Sequence, Any
+from typing import Mapping, Sequence, Any, Callable, ContextManager, Iterable, Iterator, TypeVar, cast
 
 import pandas as pd
 
 from config import (root_logger, UNEXPECTED_ERROR_MESSAGE_TEMPLATE, SAVE_JSON_DIR,
                     ANALYZE_COMMAND_ERROR_MESSAGE_TEMPLATE, KEY_ERROR_MESSAGE_TEMPLATE, AGGREGATED_DATA_CSV_PATH,
-                    ANALYZE_DIR)
-from external.exceptions import (AnalyzeError)
-from external.forecasting import ForecastWeatherSource, YandexWeatherAPIForecastWeatherSource
-from external.schemas import Weather, Statistic
-from external.utils import CITIES, timer
+                    ANALYZE_DIR, FETCH_MAX_PENDING_CITIES, PIPELINE_QUEUE_MAXSIZE,
+                    PIPELINE_POLL_INTERVAL, PIPELINE_JOIN_TIMEOUT, ANALYZE_BATCH_SIZE)
+from external import vectorized_analyzer
+from external.compact_forecast import CompactForecast
+from external.analyzer import AnalysisPolicy, DEFAULT_ANALYSIS_POLICY, analyze_json, dump_data, load_data
+from external.backpressure import InFlightLimiter, MemoryGauge, format_bytes, get_peak_rss
+from external.catalog import CityNames
+from external.concurrency import AdaptiveConcurrencyLimiter, ConcurrencySlot
+from external.exceptions import (AnalyzeError, PipelineError)
+from external.json_stream import select_json
+from external.metrics import latency_recorder
+from external.forecasting import ForecastWeatherSource, RawForecastWeatherSource, YandexWeatherAPIForecastWeatherSource
+from external.schemas import Weather, CompactWeather, Statistic
+from external.utils import city_catalog, timer
+
+T = TypeVar("T")
 
 
 def _filter_func_by_rating(x: Any) -> int:
@@ -26,43 +46,289 @@ def _filter_func_by_rating(x: Any) -> int:
 @dataclass
 class DataFetchingTask:
     output_weather_data_dir: Path
-    cities: Mapping = field(default_factory=lambda: CITIES)
-    weather_source: ForecastWeatherSource = YandexWeatherAPIForecastWeatherSource
+    # City names, iterated once per fetch, so a lazy iterable over a large catalog is fine.
+    # A one-shot iterator only serves one fetch, CityNames reads the catalog again on every fetch
+    cities: Iterable[str] = field(default_factory=lambda: CityNames(city_catalog))
+    weather_source: ForecastWeatherSource = field(default_factory=YandexWeatherAPIForecastWeatherSource)
+    validate_raw_weather_data: bool = False
+    concurrency_limiter: AdaptiveConcurrencyLimiter | None = None
+    # Caps cities fetched by iter_* methods and not yet processed: every yielded item holds a slot
+    # until its consumer releases it, iter_* methods release cities they skip themselves
+    in_flight_limiter: InFlightLimiter | None = None
+
+    def _get_max_workers(self) -> int | None:
+        return self.concurrency_limiter.max_limit if self.concurrency_limiter is not None else None
+
+    @contextmanager
+    def _fetch_pool(self) -> Iterator[ThreadPoolExecutor]:
+        """
+        Thread pool of iter_* methods: waits for running fetches only if iteration completed,
+        if it failed or was stopped by the consumer queued fetches are cancelled and running ones abandoned
+        """
+        pool = ThreadPoolExecutor(max_workers=self._get_max_workers())
+        try:
+            yield pool
+        except BaseException:
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+        pool.shutdown(wait=True)
+
+    def _concurrency_slot(self) -> ContextManager[ConcurrencySlot]:
+        if self.concurrency_limiter is None:
+            return nullcontext(ConcurrencySlot())
+        return self.concurrency_limiter.slot()
+
+    def _fetch_city_weather_data(self, city_name: str) -> Mapping | None:
+        # Weather source reports overload errors to the slot itself, unknown cities and 4xx are not overload
+        with self._concurrency_slot():
+            city_weather_data = self.weather_source.get_weather_by_city(city_name=city_name)
+        return city_weather_data
 
     def _get_weather_by_city(self, city_name: str) -> Weather:
-        city_weather_data = self.weather_source.get_weather_by_city(city_name=city_name)
+        city_weather_data = self._fetch_city_weather_data(city_name=city_name)
         weather = Weather(city=city_name, weather_data=city_weather_data)
         return weather
 
-    def _save_weather_data_to_json(self, weather: Weather) -> None:
+    def save_city_weather_data(self, weather: Weather) -> Path | None:
+        """Save weather of one city to output_weather_data_dir, None if there is no weather data"""
         save_path = self.output_weather_data_dir / f"{weather.city}.json"
         weather_data = weather.weather_data
         if weather_data is None:
-            return
+            return None
 
         json_as_string = json.dumps(weather_data, ensure_ascii=False, indent=4)
         save_path.write_text(json_as_string, encoding="utf8")
+        return save_path
+
+    def _save_raw_weather_by_city(self, city_name: str) -> Path | None:
+        save_path = self.output_weather_data_dir / f"{city_name}.json"
+        raw_weather_source = cast(RawForecastWeatherSource, self.weather_source)
+        with self._concurrency_slot():
+            is_saved = raw_weather_source.save_weather_by_city(
+                city_name=city_name,
+                path=save_path,
+                validate=self.validate_raw_weather_data,
+            )
+        return save_path if is_saved else None
+
+    def _iter_completed(self, pool: ThreadPoolExecutor, func: Callable[[str], T]) -> Iterator[T]:
+        """
+        Run func for every city and yield results in completion order.
+        At most FETCH_MAX_PENDING_CITIES cities are submitted ahead, so cities are read lazily.
+        In-flight slot of a city passes to the consumer with its result. Slots of cities that failed
+        or were not yielded because iteration stopped are released here.
+        """
+        pending: set[Future] = set()
+        # Submitted futures whose slot was not handed over to the consumer
+        holding_slot: set[Future] = set()
+        try:
+            for city_name in self.cities:
+                if len(pending) >= FETCH_MAX_PENDING_CITIES:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    yield from self._iter_results(done, holding_slot)
+                yield from self._wait_in_flight_slot(pending, holding_slot)
+                future = self._submit(pool, func, city_name)
+                pending.add(future)
+                holding_slot.add(future)
+
+            yield from self._iter_results(as_completed(pending), holding_slot)
+        finally:
+            for future in holding_slot:
+                future.cancel()
+                self.release_in_flight()
+
+    def _submit(self, pool: ThreadPoolExecutor, func: Callable[[str], T], city_name: str) -> Future:
+        try:
+            return pool.submit(func, city_name)
+        except BaseException:
+            self.release_in_flight()
+            raise
+
+    @staticmethod
+    def _iter_results(futures: Iterable[Future], holding_slot: set[Future]) -> Iterator:
+        for future in futures:
+            result = future.result()
+            holding_slot.discard(future)
+            yield result
+
+    def _wait_in_flight_slot(self, pending: set[Future], holding_slot: set[Future]) -> Iterator:
+        """Block until in_flight_limiter has room, yielding results completed meanwhile so they can be released"""
+        if self.in_flight_limiter is None:
+            return
+
+        while not self.in_flight_limiter.acquire(timeout=0 if pending else None):
+            done, _ = wait(pending, timeout=PIPELINE_POLL_INTERVAL, return_when=FIRST_COMPLETED)
+            pending.difference_update(done)
+            yield from self._iter_results(done, holding_slot)
+
+    def release_in_flight(self) -> None:
+        """Free in-flight slot of a city yielded by iter_* methods once its consumer is done with it"""
+        if self.in_flight_limiter is not None:
+            self.in_flight_limiter.release()
+
+    def _log_concurrency_metrics(self) -> None:
+        if self.concurrency_limiter is not None:
+            root_logger.info(f"Fetch concurrency: {self.concurrency_limiter.metrics}")
+
+    def fetching_raw_weather_data(self) -> Sequence[Path]:
+        """Stream responses straight to city files, weather source must support RawForecastWeatherSource"""
+        root_logger.info(f"Fetching raw weather data from API to {self.output_weather_data_dir}...")
+        with ThreadPoolExecutor(max_workers=self._get_max_workers()) as pool:
+            results = list(pool.map(self._save_raw_weather_by_city, self.cities))
+
+        self._log_concurrency_metrics()
+        root_logger.info("Raw weather data saved!")
+        return [path for path in results if path is not None]
+
+    def iter_raw_weather_data(self) -> Iterator[Path]:
+        """Same as fetching_raw_weather_data, but yields every saved file as soon as its request completes"""
+        root_logger.info(f"Fetching raw weather data from API to {self.output_weather_data_dir}...")
+        with self._fetch_pool() as pool:
+            for path in self._iter_completed(pool, self._save_raw_weather_by_city):
+                if path is not None:
+                    yield path
+                else:
+                    self.release_in_flight()
+
+        self._log_concurrency_metrics()
+        root_logger.info("Raw weather data saved!")
+
+    def iter_weather_data(self) -> Iterator[Weather]:
+        """Yield weather of every city as soon as its request completes, in completion order"""
+        root_logger.info("Fetching weather data from API...")
+        with self._fetch_pool() as pool:
+            yield from self._iter_completed(pool, self._get_weather_by_city)
+
+        self._log_concurrency_metrics()
+        root_logger.info("Weather data from API received!")
+
+    def iter_saved_weather_data(self) -> Iterator[Path]:
+        """Save weather of every city as soon as it is fetched and yield path to the saved file"""
+        for weather in self.iter_weather_data():
+            path = self.save_city_weather_data(weather)
+            if path is not None:
+                yield path
+            else:
+                self.release_in_flight()
 
     def fetching_weather_data(self) -> Sequence[Weather]:
         root_logger.info("Fetching weather data from API...")
-        with ThreadPoolExecutor() as pool:
-            results = list(pool.map(self._get_weather_by_city, self.cities.keys()))
+        with ThreadPoolExecutor(max_workers=self._get_max_workers()) as pool:
+            results = list(pool.map(self._get_weather_by_city, self.cities))
 
+        self._log_concurrency_metrics()
         root_logger.info("Weather data from API received!")
         return results
 
     def save_weather_data(self, weather_data: Sequence[Weather]):
         root_logger.info(f"Saving weather data to {self.output_weather_data_dir}...")
         with ThreadPoolExecutor() as pool:
-            pool.map(self._save_weather_data_to_json, weather_data)
+            pool.map(self.save_city_weather_data, weather_data)
         root_logger.info("Weather data saved!")
 
 
+class AnalyzeEngine(Enum):
+    # Runs external/analyzer.py script in a new interpreter for every file
+    SUBPROCESS = "subprocess"
+    # Calls analyze_json inside pool workers and returns results to the parent process
+    IN_PROCESS = "in_process"
+    # Same as IN_PROCESS with NumPy reductions over all hours of a batch of cities instead of objects per hour,
+    # pays off from a dozen or so cities per batch, a single city is faster with IN_PROCESS
+    VECTORIZED = "vectorized"
+
+    @property
+    def reads_compact(self) -> bool:
+        """CompactForecast is analyzed natively, other engines would convert it back to a dict"""
+        return self is AnalyzeEngine.VECTORIZED
+
+    def analyze(
+            self,
+            data: Mapping | CompactForecast | None,
+            policy: AnalysisPolicy = DEFAULT_ANALYSIS_POLICY,
+    ) -> Mapping:
+        if self is AnalyzeEngine.VECTORIZED:
+            if isinstance(data, CompactForecast):
+                return vectorized_analyzer.analyze_compact(data, policy=policy)
+            return vectorized_analyzer.analyze_json(data, policy=policy)
+
+        if isinstance(data, CompactForecast):
+            data = data.to_json()
+        return analyze_json(data, policy=policy)
+
+    def analyze_batch(
+            self,
+            data_list: Sequence[Mapping | CompactForecast | None],
+            policy: AnalysisPolicy = DEFAULT_ANALYSIS_POLICY,
+    ) -> Sequence[Mapping]:
+        if self is AnalyzeEngine.VECTORIZED:
+            forecasts = [
+                data if isinstance(data, CompactForecast) else vectorized_analyzer.to_compact(data)
+                for data in data_list
+            ]
+            return vectorized_analyzer.analyze_compact_batch(forecasts, policy=policy)
+
+        return [self.analyze(data, policy=policy) for data in data_list]
+
+
+# Policy of the current analysis pool worker, set once per process by the pool initializer
+_worker_analysis_policy: AnalysisPolicy = DEFAULT_ANALYSIS_POLICY
+
+
+def _init_analysis_worker(policy: AnalysisPolicy) -> None:
+    global _worker_analysis_policy
+    _worker_analysis_policy = policy
+
+
+def _get_analysis_policy(policy: AnalysisPolicy | None) -> AnalysisPolicy:
+    return _worker_analysis_policy if policy is None else policy
+
+
+def _iter_batches(items: Iterable[T], size: int) -> Iterator[list[T]]:
+    iterator = iter(items)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def _analyze_batch(
+        keys: Sequence[T],
+        data_list: Sequence[Mapping | CompactForecast | None],
+        engine: AnalyzeEngine,
+        policy: AnalysisPolicy,
+) -> list[tuple[T, Mapping | None]]:
+    try:
+        return list(zip(keys, engine.analyze_batch(data_list, policy=policy)))
+    except Exception:
+        pass
+
+    # One bad forecast fails the whole batch, so the batch is analyzed city by city to skip only bad ones
+    results: list[tuple[T, Mapping | None]] = []
+    for key, data in zip(keys, data_list):
+        analyzed_data = None
+        try:
+            analyzed_data = engine.analyze(data, policy=policy)
+        except Exception as err:
+            root_logger.error(UNEXPECTED_ERROR_MESSAGE_TEMPLATE.format(error=err))
+        results.append((key, analyzed_data))
+    return results
+
+
 @dataclass
 class DataCalculationTask:
     input_weather_data_dir: Path
     output_analyze_dir: Path
-    processes_count: int = cpu_count() - 1
+    processes_count: int = max(cpu_count() - 1, 1)
+    engine: AnalyzeEngine = AnalyzeEngine.IN_PROCESS
+    # Sent to pool workers once when they start, not with every file or forecast.
+    # Several policies over the same data are several tasks: replace(task, policy=...)
+    policy: AnalysisPolicy = DEFAULT_ANALYSIS_POLICY
+    # Cities per pool task for engines analyzing batches, others get one city per task
+    batch_size: int = ANALYZE_BATCH_SIZE
+
+    def get_batch_size(self) -> int:
+        return self.batch_size if self.engine.reads_compact else 1
+
+    def _create_pool(self) -> Pool:
+        return Pool(processes=self.processes_count, initializer=_init_analysis_worker, initargs=(self.policy,))
 
     def _run_analyze_command(self, weather_data_path: Path) -> None:
         output_analyze_path = self.output_analyze_dir / weather_data_path.name
@@ -70,7 +336,12 @@ class DataCalculationTask:
             path_to_weather_data=weather_data_path,
             output_analyze_path=output_analyze_path,
         )
-        command = string_command.split()
+        command = [
+            *string_command.split(),
+            "--hours-start", str(self.policy.hours_start),
+            "--hours-end", str(self.policy.hours_end),
+            "--conditions", *self.policy.suitable_conditions,
+        ]
         process = subprocess.Popen(command, stdout=subprocess.PIPE)
         output, err = process.communicate()
         exit_code = process.wait()
@@ -88,11 +359,120 @@ class DataCalculationTask:
         except Exception as err:
             root_logger.error(UNEXPECTED_ERROR_MESSAGE_TEMPLATE.format(error=err))
 
-    def calculate_weather(self) -> None:
+    @staticmethod
+    def _analyzing_weather_in_process(
+            weather_data_path: Path,
+            engine: AnalyzeEngine = AnalyzeEngine.IN_PROCESS,
+            policy: AnalysisPolicy | None = None,
+    ) -> tuple[Path, Mapping | None]:
+        """:param policy: policy of the current pool worker by default"""
+        analyzed_data = None
+        try:
+            data = load_data(str(weather_data_path))
+            analyzed_data = engine.analyze(data, policy=_get_analysis_policy(policy))
+        except Exception as err:
+            root_logger.error(UNEXPECTED_ERROR_MESSAGE_TEMPLATE.format(error=err))
+
+        return weather_data_path, analyzed_data
+
+    @staticmethod
+    def _analyzing_weather_data(
+            weather: Weather | CompactWeather,
+            engine: AnalyzeEngine = AnalyzeEngine.IN_PROCESS,
+            policy: AnalysisPolicy | None = None,
+    ) -> tuple[str, Mapping | None]:
+        """:param policy: policy of the current pool worker by default"""
+        analyzed_data = None
+        try:
+            data = weather.forecast if isinstance(weather, CompactWeather) else weather.weather_data
+            analyzed_data = engine.analyze(data, policy=_get_analysis_policy(policy))
+        except Exception as err:
+            root_logger.error(UNEXPECTED_ERROR_MESSAGE_TEMPLATE.format(error=err))
+
+        return weather.city, analyzed_data
+
+    @staticmethod
+    def _analyzing_weather_data_batch(
+            weather_batch: Sequence[Weather | CompactWeather],
+            engine: AnalyzeEngine = AnalyzeEngine.IN_PROCESS,
+            policy: AnalysisPolicy | None = None,
+    ) -> list[tuple[str, Mapping | None]]:
+        """:param policy: policy of the current pool worker by default"""
+        return _analyze_batch(
+            keys=[weather.city for weather in weather_batch],
+            data_list=[
+                weather.forecast if isinstance(weather, CompactWeather) else weather.weather_data
+                for weather in weather_batch
+            ],
+            engine=engine,
+            policy=_get_analysis_policy(policy),
+        )
+
+    @staticmethod
+    def _analyzing_weather_batch_in_process(
+            weather_data_paths: Sequence[Path],
+            engine: AnalyzeEngine = AnalyzeEngine.IN_PROCESS,
+            policy: AnalysisPolicy | None = None,
+    ) -> list[tuple[Path, Mapping | None]]:
+        """:param policy: policy of the current pool worker by default"""
+        loaded_paths, data_list = [], []
+        for weather_data_path in weather_data_paths:
+            try:
+                data_list.append(load_data(str(weather_data_path)))
+                loaded_paths.append(weather_data_path)
+            except Exception as err:
+                root_logger.error(UNEXPECTED_ERROR_MESSAGE_TEMPLATE.format(error=err))
+
+        policy = _get_analysis_policy(policy)
+        return _analyze_batch(keys=loaded_paths, data_list=data_list, engine=engine, policy=policy)
+
+    def iter_analyzed_weather_data(
+            self,
+            weather_data: Iterable[Weather | CompactWeather],
+    ) -> Iterator[tuple[str, Mapping]]:
+        """
+        Analyze already fetched weather without files
+        and yield (city name, analyzed data) in completion order, failed cities are skipped
+        """
+        with self._create_pool() as pool:
+            analyzing = partial(self._analyzing_weather_data_batch, engine=self.engine)
+            for results in pool.imap_unordered(analyzing, _iter_batches(weather_data, self.get_batch_size())):
+                for city_name, analyzed_data in results:
+                    if analyzed_data is not None:
+                        yield city_name, analyzed_data
+
+    def iter_analyzed_weather(
+            self,
+            weather_data_paths: Iterable[Path] | None = None,
+    ) -> Iterator[tuple[Path, Mapping]]:
+        """
+        Analyze files in pool workers without starting an interpreter per file
+        and yield (weather data path, analyzed data) in completion order, failed files are skipped
+        """
+        if weather_data_paths is None:
+            weather_data_paths = self._get_json_paths_with_weather_data()
+        with self._create_pool() as pool:
+            analyzing = partial(self._analyzing_weather_batch_in_process, engine=self.engine)
+            for results in pool.imap_unordered(analyzing, _iter_batches(weather_data_paths, self.get_batch_size())):
+                for path, analyzed_data in results:
+                    if analyzed_data is not None:
+                        yield path, analyzed_data
+
+    def calculate_weather(self, weather_data_paths: Iterable[Path] | None = None) -> None:
+        """
+        :param weather_data_paths: files to analyze, all files of input_weather_data_dir by default.
+        Iterator is consumed lazily, so analysis of first files starts while others are still being fetched.
+        """
         root_logger.info("Start analyzing weather data to...")
-        json_paths_with_weather_data = self._get_json_paths_with_weather_data()
-        with Pool(processes=self.processes_count) as pool:
-            pool.map(self._analyzing_weather, json_paths_with_weather_data)
+        if self.engine is not AnalyzeEngine.SUBPROCESS:
+            for path, analyzed_data in self.iter_analyzed_weather(weather_data_paths=weather_data_paths):
+                dump_data(analyzed_data, str(self.output_analyze_dir / path.name))
+        else:
+            if weather_data_paths is None:
+                weather_data_paths = self._get_json_paths_with_weather_data()
+            with Pool(processes=self.processes_count) as pool:
+                for _ in pool.imap_unordered(self._analyzing_weather, weather_data_paths):
+                    pass
 
         root_logger.info("Analyzing weather done!")
 
@@ -119,7 +499,7 @@ class DataAggregationTask:
         indexes = pd.MultiIndex.from_tuples(multiple_index, names=[self.CITY_DATE_COLUMN_NAME, None])
         return indexes
 
-    def _get_analyzed_data(self, path_to_data: Path) -> Mapping | None:
+    def _get_analyzed_data(self, path_to_data: Path) -> Sequence[Mapping] | None:
         analyzed_data = None
         try:
             with path_to_data.open(encoding="utf8") as f:
@@ -148,8 +528,23 @@ class DataAggregationTask:
         if days_data is None:
             return None
 
+        return self._create_city_dataframe(city_name=path_to_data.stem.capitalize(), days_data=days_data)
+
+    def create_dataframe_from_analyzed_data(self, city_name: str, analyzed_data: Mapping) -> pd.DataFrame | None:
+        """Same as reading analyzed data of the city from input_analyze_dir, but from memory"""
+        days_data = analyzed_data.get("days")
+        if days_data is None:
+            root_logger.error(KEY_ERROR_MESSAGE_TEMPLATE.format(error="days"))
+            return None
+
+        try:
+            return self._create_city_dataframe(city_name=city_name.capitalize(), days_data=days_data)
+        except Exception as err:
+            root_logger.error(UNEXPECTED_ERROR_MESSAGE_TEMPLATE.format(error=err))
+            return None
+
+    def _create_city_dataframe(self, city_name: str, days_data: Sequence[Mapping]) -> pd.DataFrame:
         # Create column and index names
-        city_name = path_to_data.stem.capitalize()
         multiple_index = self._create_multiple_index_by_city(city_name=city_name)
         columns = [item.get("date") for item in days_data]
         # Create data
@@ -176,12 +571,303 @@ class DataAggregationTask:
         city_dataframes = self._clear_dataframe_sequence_from_none(dataframes=results)
         return city_dataframes
 
+    def aggregate_analyzed_data(self, analyzed_weather_data: Iterable[tuple[str, Mapping]]) -> Sequence[pd.DataFrame]:
+        """Same as aggregate_analyze_data for (city name, analyzed data) pairs in memory"""
+        results = [
+            self.create_dataframe_from_analyzed_data(city_name=city_name, analyzed_data=analyzed_data)
+            for city_name, analyzed_data in analyzed_weather_data
+        ]
+        return self._clear_dataframe_sequence_from_none(dataframes=results)
+
     def save_aggregated_data(self, aggregated_data: Sequence[pd.DataFrame]) -> None:
         sorted_aggregated_data = sorted(aggregated_data, key=_filter_func_by_rating, reverse=True)
         result_df = pd.concat(sorted_aggregated_data, axis=0)
         result_df.to_csv(self.output_csv_path, sep=";", float_format='%.3f', decimal=",")
 
 
+class _StopSignal:
+    """Sentinel put to a pipeline queue once per consumer when its producer is done"""
+
+
+@dataclass(frozen=True)
+class _WorkerFailure:
+    stage: str
+    error: str
+
+
+def _analyze_pipeline_item(
+        item: Path | Weather | CompactWeather,
+        engine: AnalyzeEngine,
+        policy: AnalysisPolicy,
+) -> tuple[str, Mapping | None]:
+    if isinstance(item, (Weather, CompactWeather)):
+        return DataCalculationTask._analyzing_weather_data(item, engine=engine, policy=policy)
+
+    weather_data_path, analyzed_data = DataCalculationTask._analyzing_weather_in_process(
+        item,
+        engine=engine,
+        policy=policy,
+    )
+    return weather_data_path.stem, analyzed_data
+
+
+def _analyze_pipeline_items(
+        items: Sequence[Path | Weather | CompactWeather],
+        engine: AnalyzeEngine,
+        policy: AnalysisPolicy,
+) -> list[tuple[str, Mapping | None]]:
+    if engine.reads_compact and all(isinstance(item, (Weather, CompactWeather)) for item in items):
+        weather_batch = cast(Sequence[Weather | CompactWeather], items)
+        return DataCalculationTask._analyzing_weather_data_batch(weather_batch, engine=engine, policy=policy)
+    return [_analyze_pipeline_item(item, engine=engine, policy=policy) for item in items]
+
+
+def _get_pipeline_batch(weather_queue: multiprocessing.Queue, batch_size: int) -> tuple[list, bool]:
+    """Wait for one message and take up to batch_size already queued ones, return them and whether to stop"""
+    batch: list = []
+    message = weather_queue.get()
+    while not isinstance(message, _StopSignal):
+        batch.append(message)
+        if len(batch) >= batch_size:
+            return batch, False
+        try:
+            message = weather_queue.get_nowait()
+        except queue.Empty:
+            return batch, False
+    return batch, True
+
+
+def _analysis_worker(
+        weather_queue: multiprocessing.Queue,
+        result_queue: multiprocessing.Queue,
+        engine: AnalyzeEngine,
+        policy: AnalysisPolicy,
+        batch_size: int = 1,
+) -> None:
+    try:
+        is_stopped = False
+        while not is_stopped:
+            batch, is_stopped = _get_pipeline_batch(weather_queue, batch_size)
+            item_ids = [item_id for item_id, _ in batch]
+            items = [pickle.loads(payload) for _, payload in batch]
+            for item_id, result in zip(item_ids, _analyze_pipeline_items(items, engine=engine, policy=policy)):
+                result_queue.put((item_id, *result))
+    except BaseException:
+        result_queue.put(_WorkerFailure(stage="analysis", error=traceback.format_exc()))
+    finally:
+        result_queue.put(_StopSignal())
+
+
+@dataclass
+class DataPipelineTask:
+    """
+    Runs fetching, calculation and aggregation at the same time:
+    fetch threads -> bounded queue -> analysis processes -> bounded queue -> aggregator (calling thread).
+    Bounded queues hold back fetching while analysis falls behind. Failure of any stage stops the
+    pipeline and is raised from run() as PipelineError.
+
+    By default stages hand over city files. With in_memory forecasts and analysis results go through the queues
+    as objects (forecasts as CompactForecast if the engine reads it), files are only written if save_* is set.
+    in_flight_limiter caps forecasts held between fetch and aggregation, fetching waits for room.
+    """
+    fetching_task: DataFetchingTask
+    calculation_task: DataCalculationTask
+    aggregation_task: DataAggregationTask
+    queue_maxsize: int = PIPELINE_QUEUE_MAXSIZE
+    in_memory: bool = False
+    save_weather_data: bool = True
+    save_analyze_data: bool = True
+    in_flight_limiter: InFlightLimiter | None = None
+
+    def __post_init__(self) -> None:
+        self._stop_event = threading.Event()
+        self._analysis_gauge = MemoryGauge()
+        # Pickled size of forecasts sent to analysis by item id
+        self._item_sizes: dict[int, int] = {}
+        self._item_sizes_lock = threading.Lock()
+
+    def _put(self, pipeline_queue: multiprocessing.Queue, item: Any) -> bool:
+        """Blocking put which gives up when the pipeline is stopped"""
+        while not self._stop_event.is_set():
+            try:
+                pipeline_queue.put(item, timeout=PIPELINE_POLL_INTERVAL)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _to_analysis_item(self, weather: Weather) -> Weather | CompactWeather | None:
+        if weather.weather_data is None:
+            return None
+        if not self.calculation_task.engine.reads_compact:
+            # Only fields analysis reads are pickled to the workers
+            return Weather(city=weather.city, weather_data=select_json(weather.weather_data))
+
+        try:
+            forecast = CompactForecast.from_json(weather.weather_data) if weather.weather_data else None
+        except Exception as err:
+            root_logger.error(UNEXPECTED_ERROR_MESSAGE_TEMPLATE.format(error=err))
+            return None
+        return CompactWeather(city=weather.city, forecast=forecast)
+
+    def _iter_fetched(self, fetching_task: DataFetchingTask) -> Iterator[Path | Weather | CompactWeather]:
+        if not self.in_memory:
+            yield from fetching_task.iter_raw_weather_data()
+            return
+
+        for weather in fetching_task.iter_weather_data():
+            item = self._to_analysis_item(weather)
+            if item is None:
+                fetching_task.release_in_flight()
+                continue
+            if self.save_weather_data:
+                fetching_task.save_city_weather_data(weather)
+            yield item
+
+    def _iter_cities(self, cities: Iterable[str]) -> Iterator[str]:
+        for city_name in cities:
+            if self._stop_event.is_set():
+                return
+            yield city_name
+
+    def _track_item(self, item_id: int, size: int) -> None:
+        with self._item_sizes_lock:
+            self._item_sizes[item_id] = size
+        self._analysis_gauge.add(size=size)
+        if self.in_flight_limiter is not None:
+            self.in_flight_limiter.account(size)
+
+    def _untrack_item(self, item_id: int) -> None:
+        with self._item_sizes_lock:
+            size = self._item_sizes.pop(item_id)
+        self._analysis_gauge.remove(size=size)
+        if self.in_flight_limiter is not None:
+            self.in_flight_limiter.release(size)
+
+    def _untrack_all_items(self) -> None:
+        """Free slots of forecasts left in queues by stopped pipeline, so fetching blocked on the limiter ends"""
+        with self._item_sizes_lock:
+            item_ids = list(self._item_sizes)
+        for item_id in item_ids:
+            self._untrack_item(item_id)
+
+    def _fetch(
+            self,
+            fetching_task: DataFetchingTask,
+            weather_queue: multiprocessing.Queue,
+            result_queue: multiprocessing.Queue,
+    ) -> None:
+        try:
+            for item_id, item in enumerate(self._iter_fetched(fetching_task)):
+                # Pickled here instead of the queue feeder thread to know the size of every forecast
+                payload = pickle.dumps(item, protocol=pickle.HIGHEST_PROTOCOL)
+                self._track_item(item_id, len(payload))
+                if not self._put(weather_queue, (item_id, payload)):
+                    return
+        except BaseException:
+            result_queue.put(_WorkerFailure(stage="fetch", error=traceback.format_exc()))
+        finally:
+            for _ in range(self.calculation_task.processes_count):
+                self._put(weather_queue, _StopSignal())
+
+    def _aggregate_result(self, result: tuple[int, str, Mapping | None], aggregated_data: list[pd.DataFrame]) -> None:
+        item_id, city_name, analyzed_data = result
+        self._untrack_item(item_id)
+        if analyzed_data is None:
+            return
+
+        if self.save_analyze_data:
+            dump_data(analyzed_data, str(self.calculation_task.output_analyze_dir / f"{city_name}.json"))
+        dataframe = self.aggregation_task.create_dataframe_from_analyzed_data(city_name, analyzed_data)
+        if dataframe is not None:
+            aggregated_data.append(dataframe)
+
+    def _aggregate(self, result_queue: multiprocessing.Queue, workers: Sequence[multiprocessing.Process]) -> Sequence:
+        aggregated_data: list[pd.DataFrame] = []
+        stopped_count = 0
+        while stopped_count < len(workers):
+            try:
+                item = result_queue.get(timeout=PIPELINE_POLL_INTERVAL)
+            except queue.Empty:
+                if not any(worker.is_alive() for worker in workers):
+                    raise PipelineError("Weather pipeline failed: analysis processes exited unexpectedly")
+                continue
+
+            if isinstance(item, _StopSignal):
+                stopped_count += 1
+            elif isinstance(item, _WorkerFailure):
+                # Remaining stages are stopped by run()
+                raise PipelineError(f"Weather pipeline failed at {item.stage} stage:\n{item.error}")
+            else:
+                self._aggregate_result(item, aggregated_data)
+
+        return aggregated_data
+
+    def memory_report(self) -> str:
+        lines = ["Pipeline memory:"]
+        if self.in_flight_limiter is not None:
+            lines.append(f"  fetched and not aggregated: {self.in_flight_limiter.usage}")
+        lines.append(f"  sent to analysis: {self._analysis_gauge.usage}")
+        for stage, children in (("fetch and aggregation process", False), ("analysis processes", True)):
+            peak_rss = get_peak_rss(children=children)
+            if peak_rss is not None:
+                lines.append(f"  {stage} peak RSS: {format_bytes(peak_rss)}")
+        return "\n".join(lines)
+
+    def run(self) -> Sequence[pd.DataFrame]:
+        root_logger.info("Start weather pipeline...")
+        self._stop_event.clear()
+        self._analysis_gauge = MemoryGauge()
+        self._item_sizes.clear()
+        # Fetching stops taking new cities as soon as the pipeline is stopped
+        fetching_task = replace(self.fetching_task, cities=self._iter_cities(self.fetching_task.cities))
+        if self.in_flight_limiter is not None:
+            fetching_task = replace(fetching_task, in_flight_limiter=self.in_flight_limiter)
+        weather_queue: multiprocessing.Queue = multiprocessing.Queue(maxsize=self.queue_maxsize)
+        result_queue: multiprocessing.Queue = multiprocessing.Queue(maxsize=self.queue_maxsize)
+        workers = [
+            multiprocessing.Process(
+                target=_analysis_worker,
+                args=(
+                    weather_queue,
+                    result_queue,
+                    self.calculation_task.engine,
+                    self.calculation_task.policy,
+                    self.calculation_task.get_batch_size(),
+                ),
+                daemon=True,
+            )
+            for _ in range(self.calculation_task.processes_count)
+        ]
+        for worker in workers:
+            worker.start()
+        fetch_thread = threading.Thread(
+            target=self._fetch,
+            args=(fetching_task, weather_queue, result_queue),
+            daemon=True,
+        )
+        fetch_thread.start()
+
+        try:
+            aggregated_data = self._aggregate(result_queue=result_queue, workers=workers)
+        finally:
+            self._stop_event.set()
+            self._untrack_all_items()
+            fetch_thread.join(timeout=PIPELINE_JOIN_TIMEOUT)
+            if fetch_thread.is_alive():
+                root_logger.warning("Fetch stage did not stop in time, its running requests are abandoned")
+            self._untrack_all_items()
+            for worker in workers:
+                worker.join(timeout=PIPELINE_POLL_INTERVAL)
+                if worker.is_alive():
+                    worker.terminate()
+                    worker.join()
+
+        root_logger.info(self.memory_report())
+        root_logger.info("Weather pipeline done!")
+        return aggregated_data
+
+
 @dataclass
 class DataAnalyzingTask:
     CONCLUSION_TEMPLATE = "Города благоприятные для поездки:\n{city_names}"
@@ -225,23 +911,34 @@ class DataAnalyzingTask:
 
 @timer
 def main():
-    # Fetching and saving weather data
-    data_fetching_task = DataFetchingTask(output_weather_data_dir=SAVE_JSON_DIR)
-    weather_data = data_fetching_task.fetching_weather_data()
-    data_fetching_task.save_weather_data(weather_data=weather_data)
-    # Calculation
+    # Fetching, calculation and aggregation run simultaneously connected by queues
+    data_fetching_task = DataFetchingTask(
+        output_weather_data_dir=SAVE_JSON_DIR,
+        cities=CityNames(city_catalog),
+        weather_source=YandexWeatherAPIForecastWeatherSource(city_catalog=city_catalog),
+        concurrency_limiter=AdaptiveConcurrencyLimiter(),
+    )
     data_calculation_task = DataCalculationTask(
         input_weather_data_dir=SAVE_JSON_DIR,
         output_analyze_dir=ANALYZE_DIR,
     )
-    data_calculation_task.calculate_weather()
-    # Aggregation
     data_aggregation_task = DataAggregationTask(input_analyze_dir=ANALYZE_DIR)
-    aggregated_data = data_aggregation_task.aggregate_analyze_data()
+    data_pipeline_task = DataPipelineTask(
+        fetching_task=data_fetching_task,
+        calculation_task=data_calculation_task,
+        aggregation_task=data_aggregation_task,
+        in_memory=True,
+        # Fetched forecasts are only analyzed, writing them back as json would cost more than the analysis
+        save_weather_data=False,
+        in_flight_limiter=InFlightLimiter(),
+    )
+    aggregated_data = data_pipeline_task.run()
     data_aggregation_task.save_aggregated_data(aggregated_data=aggregated_data)
     # Conclusion
     conclusion = DataAnalyzingTask.conclusion(aggregated_data=aggregated_data)
     print(conclusion)
+    # Request latency phases
+    root_logger.info(f"Request latency by phase:\n{latency_recorder.dump()}")
 
 
 if __name__ == '__main__':
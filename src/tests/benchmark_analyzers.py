@@ -0,0 +1,42 @@
+"""
+Time per city of analysis engines, run from src directory:
+    python -m tests.benchmark_analyzers
+"""
+import json
+import timeit
+from pathlib import Path
+
+from external.analyzer import analyze_json
+from external.compact_forecast import CompactForecast
+from tasks import AnalyzeEngine
+from .mocks import WEATHER_EXAMPLE
+
+RESPONSE_EXAMPLE_PATH = Path(__file__).parents[2] / "examples" / "response.json"
+BATCH_SIZES = (1, 8, 32, 128)
+REPEAT = 5
+
+
+def _time_per_city(func, cities_count: int) -> float:
+    number = max(1, 256 // cities_count)
+    return min(timeit.repeat(func, number=number, repeat=REPEAT)) / number / cities_count * 1e6
+
+
+def main() -> None:
+    examples = (
+        ("mocks.WEATHER_EXAMPLE", WEATHER_EXAMPLE),
+        ("response.json", json.loads(RESPONSE_EXAMPLE_PATH.read_text())),
+    )
+    for name, data in examples:
+        forecast = CompactForecast.from_json(data)
+        print(f"{name}, us per city:")
+        print(f"  {'batch':>5} {'analyze_json':>12} {'vectorized json':>15} {'vectorized compact':>18}")
+        for batch_size in BATCH_SIZES:
+            data_list, forecasts = [data] * batch_size, [forecast] * batch_size
+            reference = _time_per_city(lambda: [analyze_json(item) for item in data_list], batch_size)
+            vectorized = _time_per_city(lambda: AnalyzeEngine.VECTORIZED.analyze_batch(data_list), batch_size)
+            compact = _time_per_city(lambda: AnalyzeEngine.VECTORIZED.analyze_batch(forecasts), batch_size)
+            print(f"  {batch_size:>5} {reference:>12.1f} {vectorized:>15.1f} {compact:>18.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,13 @@
 import json
 import shutil
+import threading
+from http.server import ThreadingHTTPServer
 from pathlib import Path
 
 import pytest
 
 from tasks import DataAggregationTask, DataFetchingTask, DataCalculationTask
-from .mocks import WEATHER_EXAMPLE, CITIES_FOR_TEST, ANALYZE_EXAMPLE, MockedWeatherSource
+from .mocks import WEATHER_EXAMPLE, CITIES_FOR_TEST, ANALYZE_EXAMPLE, MockedWeatherSource, MockedHTTPRequestHandler
 
 
 @pytest.fixture(scope="class")
@@ -82,3 +84,15 @@ def data_fetching_task_instance(temp_dir):
     yield instance
 
     shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+@pytest.fixture(scope="session")
+def http_server_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MockedHTTPRequestHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    yield f"http://127.0.0.1:{server.server_port}"
+
+    server.shutdown()
+    server.server_close()
@@ -1,3 +1,9 @@
+import gzip
+import json
+import threading
+import zlib
+from http.server import BaseHTTPRequestHandler
+from pathlib import Path
 from typing import Mapping
 
 import numpy as np
@@ -2033,3 +2039,69 @@ class MockedWeatherSource(ForecastWeatherSource):
     @classmethod
     def get_weather_by_city(cls, city_name: str) -> Mapping | None:
         return WEATHER_EXAMPLE
+
+
+class FailingParisWeatherSource(MockedWeatherSource):
+    @classmethod
+    def get_weather_by_city(cls, city_name: str) -> Mapping | None:
+        if city_name == "PARIS":
+            raise RuntimeError("fetch is broken")
+        return WEATHER_EXAMPLE
+
+
+class BlockingWeatherSource(MockedWeatherSource):
+    """PARIS fails at once, other cities wait for release"""
+    release = threading.Event()
+
+    @classmethod
+    def get_weather_by_city(cls, city_name: str) -> Mapping | None:
+        if city_name == "PARIS":
+            raise RuntimeError("fetch is broken")
+        cls.release.wait(timeout=10)
+        return WEATHER_EXAMPLE
+
+
+class MockedRawWeatherSource(MockedWeatherSource):
+    @classmethod
+    def save_weather_by_city(cls, city_name: str, path: Path, validate: bool = False) -> bool:
+        path.write_bytes(json.dumps(WEATHER_EXAMPLE).encode("utf8"))
+        return True
+
+
+class MockedHTTPRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # path -> (status, headers, body)
+    routes: dict = {
+        "/moscow.json": (200, {"Content-Type": "application/json"}, json.dumps(WEATHER_EXAMPLE).encode("utf8")),
+        "/bad.json": (200, {"Content-Type": "application/json"}, b"{not a json"),
+        "/server-error.json": (503, {}, b"unavailable"),
+        "/gzip.json": (200, {"Content-Encoding": "gzip"}, gzip.compress(json.dumps(WEATHER_EXAMPLE).encode("utf8"))),
+        "/deflate.json": (
+            200,
+            {"Content-Encoding": "deflate"},
+            zlib.compress(json.dumps(WEATHER_EXAMPLE).encode("utf8")),
+        ),
+        "/etag.json": (200, {"ETag": '"v1"'}, json.dumps(WEATHER_EXAMPLE).encode("utf8")),
+        "/hang-up.json": (200, {}, json.dumps(WEATHER_EXAMPLE).encode("utf8")),
+    }
+    # Keep-alive connection is closed after response without telling the client, like an idle server timeout
+    hang_up_paths = {"/hang-up.json"}
+    not_modified_count = 0
+
+    def do_GET(self):
+        status, headers, body = self.routes.get(self.path, (404, {}, b"not found"))
+        etag = headers.get("ETag")
+        if etag is not None and self.headers.get("If-None-Match") == etag:
+            MockedHTTPRequestHandler.not_modified_count += 1
+            status, body = 304, b""
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        if self.path in self.hang_up_paths:
+            self.close_connection = True
+
+    def log_message(self, format, *args):
+        pass
@@ -0,0 +1,131 @@
+import copy
+import io
+import json
+import subprocess
+import sys
+
+import pytest
+
+from external.analyzer import (AnalysisPolicy, DEFAULT_ANALYSIS_POLICY, analyze_files, analyze_json, analyze_ndjson,
+                               expand_input_paths, sort_by_key, sort_days, NDJSON_ERROR_KEY)
+from external import vectorized_analyzer
+from .mocks import WEATHER_EXAMPLE
+
+
+class TestAnalyzer:
+    def test_expand_input_paths(self, tmp_path):
+        for name in ("MOSCOW.json", "PARIS.json", "notes.txt"):
+            (tmp_path / name).write_text("{}")
+        moscow_path = str(tmp_path / "MOSCOW.json")
+
+        assert expand_input_paths([str(tmp_path)]) == [moscow_path, str(tmp_path / "PARIS.json")]
+        assert expand_input_paths([str(tmp_path / "M*.json")]) == [moscow_path]
+        assert expand_input_paths([moscow_path]) == [moscow_path]
+
+    def test_analyze_files(self, tmp_path):
+        input_dir = tmp_path / "input"
+        input_dir.mkdir()
+        (input_dir / "MOSCOW.json").write_text(json.dumps(WEATHER_EXAMPLE))
+        (input_dir / "BAD.json").write_text("{")
+        output_dir = tmp_path / "output"
+
+        failed_count = analyze_files(expand_input_paths([str(input_dir)]), str(output_dir))
+
+        assert failed_count == 1
+        assert json.loads((output_dir / "MOSCOW.json").read_text()) == analyze_json(WEATHER_EXAMPLE)
+
+    def test_analyze_files_with_same_names(self, tmp_path):
+        for city_dir in ("first", "second"):
+            (tmp_path / "input" / city_dir).mkdir(parents=True)
+            (tmp_path / "input" / city_dir / "MOSCOW.json").write_text(json.dumps(WEATHER_EXAMPLE))
+        output_dir = tmp_path / "output"
+
+        failed_count = analyze_files(expand_input_paths([str(tmp_path / "input" / "*" / "*.json")]), str(output_dir))
+
+        assert failed_count == 0
+        assert (output_dir / "first" / "MOSCOW.json").exists()
+        assert (output_dir / "second" / "MOSCOW.json").exists()
+
+    def test_analyze_ndjson(self):
+        input_stream = io.StringIO(f"{json.dumps(WEATHER_EXAMPLE)}\n\n{{bad\n{json.dumps(WEATHER_EXAMPLE)}\n")
+        output_stream = io.StringIO()
+
+        failed_count = analyze_ndjson(input_stream, output_stream)
+        lines = output_stream.getvalue().splitlines()
+
+        assert failed_count == 2
+        assert len(lines) == 4
+        assert json.loads(lines[0]) == json.loads(lines[3]) == analyze_json(WEATHER_EXAMPLE)
+        assert NDJSON_ERROR_KEY in json.loads(lines[1])
+        assert NDJSON_ERROR_KEY in json.loads(lines[2])
+
+    def test_ndjson_cli(self):
+        process = subprocess.run(
+            [sys.executable, "external/analyzer.py", "--ndjson"],
+            input=json.dumps(WEATHER_EXAMPLE) + "\n",
+            capture_output=True,
+            text=True,
+        )
+
+        assert process.returncode == 0
+        assert json.loads(process.stdout) == analyze_json(WEATHER_EXAMPLE)
+
+    def test_ndjson_cli_rejects_selective(self):
+        process = subprocess.run(
+            [sys.executable, "external/analyzer.py", "--ndjson", "--selective"],
+            input=json.dumps(WEATHER_EXAMPLE) + "\n",
+            capture_output=True,
+            text=True,
+        )
+
+        assert process.returncode == 2
+        assert process.stdout == ""
+
+    def test_sort_by_key(self):
+        items = ["3", "1", "2", "1"]
+        keys, sorted_items = sort_by_key(items, int)
+
+        assert keys == [1, 1, 2, 3]
+        assert sorted_items == ["1", "1", "2", "3"]
+        assert sort_by_key(sorted_items, int)[1] is sorted_items
+
+    def test_sort_days_keeps_empty_days_in_place(self):
+        days = [{"date": "2022-05-28"}, {}, {"date": "2022-05-26"}]
+
+        sorted_days = sort_days(days)
+
+        assert sorted_days == [{"date": "2022-05-26"}, {}, {"date": "2022-05-28"}]
+        assert sort_days(sorted_days) is sorted_days
+
+    def test_unsorted_days_and_hours(self):
+        forecasts = copy.deepcopy(WEATHER_EXAMPLE["forecasts"])
+        for day in forecasts:
+            day["hours"].reverse()
+        forecasts.reverse()
+
+        result = analyze_json({"forecasts": forecasts})
+
+        assert result == analyze_json(WEATHER_EXAMPLE)
+        assert [day["date"] for day in result["days"]] == sorted(day["date"] for day in forecasts)
+
+    def test_analysis_policy(self):
+        policy = AnalysisPolicy(hours_start=12, hours_end=12, suitable_conditions=["rain"])
+        data = {"forecasts": [{"date": "2022-05-26", "hours": [
+            {"hour": "11", "temp": 1, "condition": "rain"},
+            {"hour": "12", "temp": 3, "condition": "rain"},
+            {"hour": "13", "temp": 5, "condition": "clear"},
+        ]}]}
+
+        day = analyze_json(data, policy=policy)["days"][0]
+
+        assert (day["hours_start"], day["hours_end"], day["hours_count"]) == (12, 12, 1)
+        assert (day["temp_avg"], day["relevant_cond_hours"]) == (3, 1)
+        assert vectorized_analyzer.analyze_json(data, policy=policy) == analyze_json(data, policy=policy)
+        assert analyze_json(data) == analyze_json(data, policy=DEFAULT_ANALYSIS_POLICY)
+        assert policy == AnalysisPolicy(hours_start=12, hours_end=12, suitable_conditions=("rain",))
+
+    def test_analysis_policy_validation(self):
+        with pytest.raises(ValueError):
+            AnalysisPolicy(hours_start=20, hours_end=9)
+        with pytest.raises(ValueError):
+            AnalysisPolicy(suitable_conditions=("sunny",))
@@ -0,0 +1,50 @@
+import asyncio
+
+import pytest
+
+from external.async_client import AsyncYandexWeatherAPI
+from external.exceptions import ConnectionApiError, InvalidResponseDataError
+from external.metrics import (latency_recorder, request_label, DNS_PHASE, CONNECT_PHASE, TTFB_PHASE, BODY_READ_PHASE,
+                              JSON_DECODE_PHASE, TOTAL_PHASE)
+from .mocks import WEATHER_EXAMPLE
+
+
+class TestAsyncYandexWeatherAPI:
+    def test_get_forecasting(self, http_server_url):
+        data = asyncio.run(AsyncYandexWeatherAPI.get_forecasting(f"{http_server_url}/moscow.json"))
+        assert data == WEATHER_EXAMPLE
+
+    def test_get_forecasting_with_bad_json(self, http_server_url):
+        with pytest.raises(InvalidResponseDataError):
+            asyncio.run(AsyncYandexWeatherAPI.get_forecasting(f"{http_server_url}/bad.json"))
+
+    def test_get_forecasting_with_http_error(self, http_server_url):
+        with pytest.raises(ConnectionApiError):
+            asyncio.run(AsyncYandexWeatherAPI.get_forecasting(f"{http_server_url}/server-error.json"))
+
+    def test_url_without_host(self):
+        with pytest.raises(ConnectionApiError):
+            asyncio.run(AsyncYandexWeatherAPI.get_forecasting("http:///moscow.json"))
+
+    def test_gather(self, http_server_url):
+        urls = [f"{http_server_url}/moscow.json"] * 20 + [f"{http_server_url}/unknown.json"]
+        results = asyncio.run(AsyncYandexWeatherAPI.gather(urls, limit=4))
+
+        assert len(results) == 21
+        assert all(item == WEATHER_EXAMPLE for item in results[:-1])
+        assert isinstance(results[-1], ConnectionApiError)
+
+    def test_get_forecasting_gzip(self, http_server_url):
+        data = asyncio.run(AsyncYandexWeatherAPI.get_forecasting(f"{http_server_url}/gzip.json"))
+        assert data == WEATHER_EXAMPLE
+
+    def test_phases_recorded(self, http_server_url):
+        latency_recorder.clear()
+
+        async def get_forecasting():
+            with request_label("MOSCOW"):
+                return await AsyncYandexWeatherAPI.get_forecasting(f"{http_server_url}/moscow.json")
+
+        asyncio.run(get_forecasting())
+        for phase in (DNS_PHASE, CONNECT_PHASE, TTFB_PHASE, BODY_READ_PHASE, JSON_DECODE_PHASE, TOTAL_PHASE):
+            assert latency_recorder.get_histogram(phase, label="MOSCOW").count == 1
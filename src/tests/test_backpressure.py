@@ -0,0 +1,59 @@
+import threading
+
+from external.backpressure import InFlightLimiter, MemoryGauge, format_bytes, get_peak_rss
+
+
+class TestMemoryGauge:
+    def test_peaks(self):
+        gauge = MemoryGauge()
+        gauge.add(size=100)
+        gauge.add(size=50)
+        gauge.remove(size=100)
+
+        usage = gauge.usage
+        assert (usage.objects, usage.bytes) == (1, 50)
+        assert (usage.peak_objects, usage.peak_bytes) == (2, 150)
+
+
+class TestInFlightLimiter:
+    def test_object_limit(self):
+        limiter = InFlightLimiter(max_objects=2, max_bytes=None)
+
+        assert limiter.acquire(timeout=0)
+        assert limiter.acquire(timeout=0)
+        assert not limiter.acquire(timeout=0.01)
+        limiter.release()
+        assert limiter.acquire(timeout=0)
+
+    def test_byte_limit(self):
+        limiter = InFlightLimiter(max_objects=None, max_bytes=100)
+
+        assert limiter.acquire(timeout=0)
+        limiter.account(150)
+        assert not limiter.acquire(timeout=0.01)
+        limiter.release(150)
+        assert limiter.acquire(timeout=0)
+        assert limiter.usage.peak_bytes == 150
+
+    def test_release_wakes_waiter(self):
+        limiter = InFlightLimiter(max_objects=1, max_bytes=None)
+        limiter.acquire()
+        acquired = threading.Event()
+        thread = threading.Thread(target=lambda: limiter.acquire() and acquired.set())
+        thread.start()
+
+        assert not acquired.wait(timeout=0.05)
+        limiter.release()
+        assert acquired.wait(timeout=1)
+        thread.join()
+
+
+def test_format_bytes():
+    assert format_bytes(512) == "512.0 B"
+    assert format_bytes(3 * 1024 * 1024) == "3.0 MiB"
+
+
+def test_get_peak_rss():
+    peak_rss = get_peak_rss()
+
+    assert peak_rss is None or peak_rss > 0
@@ -0,0 +1,95 @@
+import time
+
+import pytest
+
+from external.caching import CachingForecastWeatherSource
+from external.compact_forecast import CompactForecast
+from .mocks import WEATHER_EXAMPLE
+
+
+class CountingWeatherSource:
+    def __init__(self):
+        self.calls = 0
+
+    def get_weather_by_city(self, city_name):
+        self.calls += 1
+        return WEATHER_EXAMPLE
+
+
+class TestCachingForecastWeatherSource:
+    def test_memory_hit(self):
+        source = CountingWeatherSource()
+        cached_source = CachingForecastWeatherSource(source=source)
+
+        assert cached_source.get_weather_by_city("MOSCOW") == WEATHER_EXAMPLE
+        assert cached_source.get_weather_by_city("MOSCOW") == WEATHER_EXAMPLE
+        assert source.calls == 1
+        assert (cached_source.stats.hits, cached_source.stats.misses) == (1, 1)
+
+    def test_compact_entries(self):
+        source = CountingWeatherSource()
+        cached_source = CachingForecastWeatherSource(source=source, compact=True)
+        target_weather_data = CompactForecast.from_json(WEATHER_EXAMPLE).to_json()
+
+        assert cached_source.get_weather_by_city("MOSCOW") == target_weather_data
+        assert cached_source.get_weather_by_city("MOSCOW") == target_weather_data
+        forecast = cached_source.get_compact_weather_by_city("MOSCOW")
+        assert cached_source.get_compact_weather_by_city("MOSCOW") is forecast
+        assert source.calls == 1
+
+    def test_lru_eviction(self):
+        source = CountingWeatherSource()
+        cached_source = CachingForecastWeatherSource(source=source, maxsize=1)
+
+        cached_source.get_weather_by_city("MOSCOW")
+        cached_source.get_weather_by_city("PARIS")
+        cached_source.get_weather_by_city("MOSCOW")
+        assert source.calls == 3
+        assert cached_source.stats.evictions == 2
+
+    def test_ttl_expiration(self):
+        source = CountingWeatherSource()
+        cached_source = CachingForecastWeatherSource(source=source, ttl=0.01)
+
+        cached_source.get_weather_by_city("MOSCOW")
+        time.sleep(0.02)
+        cached_source.get_weather_by_city("MOSCOW")
+        assert source.calls == 2
+        assert cached_source.stats.expirations == 1
+
+    def test_disk_layer(self, tmp_path):
+        source = CountingWeatherSource()
+        CachingForecastWeatherSource(source=source, cache_dir=tmp_path).get_weather_by_city("MOSCOW")
+        cached_source = CachingForecastWeatherSource(source=source, cache_dir=tmp_path)
+
+        assert cached_source.get_weather_by_city("MOSCOW") == WEATHER_EXAMPLE
+        assert source.calls == 1
+        assert cached_source.stats.disk_hits == 1
+
+    def test_disk_entry_expiration(self, tmp_path):
+        source = CountingWeatherSource()
+        CachingForecastWeatherSource(source=source, ttl=0, cache_dir=tmp_path).get_weather_by_city("MOSCOW")
+        cached_source = CachingForecastWeatherSource(source=source, cache_dir=tmp_path)
+
+        assert cached_source.get_weather_by_city("MOSCOW") == WEATHER_EXAMPLE
+        assert source.calls == 2
+        assert cached_source.stats.expirations == 1
+
+    @pytest.mark.parametrize("content", ['{"expires_at": 1', '{"data": {}}', "[]", '{"expires_at": "never"}'])
+    def test_broken_disk_entry(self, tmp_path, content):
+        source = CountingWeatherSource()
+        cached_source = CachingForecastWeatherSource(source=source, cache_dir=tmp_path)
+        cached_source._get_disk_path(tmp_path, "MOSCOW").write_text(content, encoding="utf8")
+
+        assert cached_source.get_weather_by_city("MOSCOW") == WEATHER_EXAMPLE
+        assert source.calls == 1
+
+    def test_clear(self, tmp_path):
+        source = CountingWeatherSource()
+        cached_source = CachingForecastWeatherSource(source=source, cache_dir=tmp_path / "cache")
+        cached_source.get_weather_by_city("MOSCOW")
+        cached_source.clear()
+
+        assert cached_source.get_weather_by_city("MOSCOW") == WEATHER_EXAMPLE
+        assert source.calls == 2
+        assert cached_source.stats.disk_hits == 0
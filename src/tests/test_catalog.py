@@ -0,0 +1,104 @@
+import json
+
+import pytest
+
+from external.catalog import CityCatalog, CityRecord, normalize_city_name
+from external.exceptions import CityCatalogError, CityKeyError
+from external.forecasting import YandexWeatherAPIForecastWeatherSource
+from external.utils import get_url_by_city_name
+
+CSV_CATALOG = """name,url,lat,lon,country
+MOSCOW,https://example.com/moscow.json,55.7558,37.6173,RU
+PARIS,https://example.com/paris.json,48.8566,2.3522,FR
+"Abu Dhabi",https://example.com/abudhabi.json,,,AE
+"""
+RECORDS = [
+    CityRecord(name="MOSCOW", url="https://example.com/moscow.json", lat=55.7558, lon=37.6173, country="RU"),
+    CityRecord(name="PARIS", url="https://example.com/paris.json", lat=48.8566, lon=2.3522, country="FR"),
+    CityRecord(name="Abu Dhabi", url="https://example.com/abudhabi.json", country="AE"),
+]
+
+
+@pytest.fixture
+def csv_catalog(tmp_path):
+    path = tmp_path / "cities.csv"
+    path.write_text(CSV_CATALOG, encoding="utf8")
+    return CityCatalog(path)
+
+
+@pytest.fixture
+def jsonl_catalog(tmp_path):
+    path = tmp_path / "cities.jsonl"
+    lines = [
+        json.dumps({"name": r.name, "url": r.url, "lat": r.lat, "lon": r.lon, "country": r.country}) for r in RECORDS
+    ]
+    path.write_text("\n".join(lines) + "\n", encoding="utf8")
+    return CityCatalog(path)
+
+
+class TestCityCatalog:
+    @pytest.mark.parametrize("catalog_fixture", ["csv_catalog", "jsonl_catalog"])
+    def test_iter(self, catalog_fixture, request):
+        catalog = request.getfixturevalue(catalog_fixture)
+
+        assert list(catalog) == RECORDS
+        assert len(catalog) == 3
+
+    @pytest.mark.parametrize("catalog_fixture", ["csv_catalog", "jsonl_catalog"])
+    def test_get_by_normalized_name(self, catalog_fixture, request):
+        catalog = request.getfixturevalue(catalog_fixture)
+
+        assert normalize_city_name("abu-dhabi") == "ABUDHABI"
+        assert catalog.get("abu-dhabi") == RECORDS[2]
+        assert catalog.get("paris") == RECORDS[1]
+        assert "Moscow" in catalog
+        assert catalog.get("TOKYO") is None
+
+    def test_get_url(self, csv_catalog):
+        assert csv_catalog.get_url("MOSCOW") == "https://example.com/moscow.json"
+        with pytest.raises(CityKeyError):
+            csv_catalog.get_url("TOKYO")
+
+    def test_filter(self, csv_catalog):
+        assert list(csv_catalog.filter(countries={"RU", "AE"})) == [RECORDS[0], RECORDS[2]]
+        assert list(csv_catalog.filter(predicate=lambda record: record.lat is None)) == [RECORDS[2]]
+
+    def test_shard(self, csv_catalog):
+        shards = [list(csv_catalog.shard(index=index, count=2)) for index in range(2)]
+
+        assert sorted(shards[0] + shards[1], key=RECORDS.index) == RECORDS
+        assert not set(shards[0]) & set(shards[1])
+        with pytest.raises(ValueError):
+            list(csv_catalog.shard(index=2, count=2))
+
+    def test_csv_with_bom_and_quoted_line_break(self, tmp_path):
+        path = tmp_path / "cities.csv"
+        catalog_lines = [
+            "name,url,country",
+            '"New\nYork",https://example.com/new-york.json,US',
+            "PARIS,https://example.com/paris.json,FR",
+        ]
+        path.write_text("\n".join(catalog_lines) + "\n", encoding="utf-8-sig")
+        catalog = CityCatalog(path)
+
+        assert [record.name for record in catalog] == ["New\nYork", "PARIS"]
+        assert catalog.get("NEWYORK").url == "https://example.com/new-york.json"
+        assert catalog.get("paris").country == "FR"
+
+    def test_bad_record(self, tmp_path):
+        path = tmp_path / "cities.jsonl"
+        path.write_text('{"name": "MOSCOW"}\n', encoding="utf8")
+
+        with pytest.raises(CityCatalogError):
+            list(CityCatalog(path))
+
+    def test_unsupported_format(self, tmp_path):
+        with pytest.raises(CityCatalogError):
+            CityCatalog(tmp_path / "cities.xml")
+
+    def test_forecast_source_uses_catalog(self, csv_catalog):
+        weather_source = YandexWeatherAPIForecastWeatherSource(city_catalog=csv_catalog)
+
+        assert weather_source._get_url_by_city("paris") == "https://example.com/paris.json"
+        assert weather_source._get_url_by_city("TOKYO") is None
+        assert YandexWeatherAPIForecastWeatherSource()._get_url_by_city("paris") == get_url_by_city_name("PARIS")
@@ -0,0 +1,173 @@
+import json
+import zlib
+
+import pytest
+
+from external.client import YandexWeatherAPI
+from external.compression import StreamDecoder
+from external.connection_pool import PoolManager
+from external.exceptions import ConnectionApiError, InvalidResponseDataError
+from external.http_cache import CachedResponse, HTTPDiskCache
+from external.metrics import (latency_recorder, request_label, LatencyRecorder, RequestTimings, DNS_PHASE,
+                              CONNECT_PHASE, TTFB_PHASE, BODY_READ_PHASE, JSON_DECODE_PHASE, TOTAL_PHASE, OTHER_LABEL)
+from .mocks import WEATHER_EXAMPLE, MockedHTTPRequestHandler
+
+
+class TestYandexWeatherAPI:
+    def test_get_forecasting(self, http_server_url):
+        assert YandexWeatherAPI.get_forecasting(f"{http_server_url}/moscow.json") == WEATHER_EXAMPLE
+
+    def test_get_forecasting_with_bad_json(self, http_server_url):
+        with pytest.raises(InvalidResponseDataError):
+            YandexWeatherAPI.get_forecasting(f"{http_server_url}/bad.json")
+
+    def test_get_forecasting_with_http_error(self, http_server_url):
+        with pytest.raises(ConnectionApiError):
+            YandexWeatherAPI.get_forecasting(f"{http_server_url}/server-error.json")
+
+    def test_get_forecasting_selective(self, http_server_url):
+        data = YandexWeatherAPI.get_forecasting(f"{http_server_url}/gzip.json", selective=True)
+        assert list(data.keys()) == ["forecasts"]
+        assert data["forecasts"][0]["hours"][0].keys() == {"hour", "temp", "condition"}
+
+
+class TestPoolManager:
+    def test_connection_reused(self, http_server_url):
+        pool_manager = PoolManager(maxsize=2)
+        url = f"{http_server_url}/moscow.json"
+        for _ in range(3):
+            with pool_manager.urlopen(url) as response:
+                response.read()
+
+        pool = pool_manager.connection_from_url(url)
+        assert len(pool._idle) == 1
+        pool_manager.clear()
+
+    def test_stale_connection_reconnected(self, http_server_url):
+        pool_manager = PoolManager(maxsize=1)
+        with pool_manager.urlopen(f"{http_server_url}/hang-up.json") as response:
+            response.read()
+        pool = pool_manager.connection_from_url(http_server_url)
+        stale_conn, _ = pool._idle[0]
+
+        with pool_manager.urlopen(f"{http_server_url}/moscow.json") as response:
+            assert json.loads(response.read()) == WEATHER_EXAMPLE
+
+        assert stale_conn.sock is None
+        assert pool._idle[0][0] is not stale_conn
+        pool_manager.clear()
+
+    def test_url_without_host(self):
+        with pytest.raises(ConnectionApiError):
+            PoolManager().connection_from_url("http:///moscow.json")
+
+    def test_idle_connection_evicted(self, http_server_url):
+        pool_manager = PoolManager(idle_timeout=0)
+        url = f"{http_server_url}/moscow.json"
+        with pool_manager.urlopen(url) as response:
+            response.read()
+
+        pool = pool_manager.connection_from_url(url)
+        conn, reused = pool._get_conn()
+        assert not reused
+        conn.close()
+
+
+class TestHTTPDiskCache:
+    def test_not_modified_served_from_cache(self, http_server_url, tmp_path, monkeypatch):
+        monkeypatch.setattr(YandexWeatherAPI, "http_cache", HTTPDiskCache(cache_dir=tmp_path))
+        url = f"{http_server_url}/etag.json"
+        not_modified_count = MockedHTTPRequestHandler.not_modified_count
+
+        assert YandexWeatherAPI.get_forecasting(url) == WEATHER_EXAMPLE
+        assert YandexWeatherAPI.http_cache.get(url).etag == '"v1"'
+        assert YandexWeatherAPI.get_forecasting(url) == WEATHER_EXAMPLE
+        assert MockedHTTPRequestHandler.not_modified_count == not_modified_count + 1
+
+    def test_selective_response_updates_cache(self, http_server_url, tmp_path, monkeypatch):
+        monkeypatch.setattr(YandexWeatherAPI, "http_cache", HTTPDiskCache(cache_dir=tmp_path))
+        url = f"{http_server_url}/etag.json"
+        YandexWeatherAPI.http_cache.set(url, CachedResponse(body=b"{}", etag='"v0"'))
+        not_modified_count = MockedHTTPRequestHandler.not_modified_count
+
+        data = YandexWeatherAPI.get_forecasting(url, selective=True)
+        assert YandexWeatherAPI.http_cache.get(url) == CachedResponse(
+            body=json.dumps(WEATHER_EXAMPLE).encode("utf8"),
+            etag='"v1"',
+        )
+        assert YandexWeatherAPI.get_forecasting(url, selective=True) == data
+        assert MockedHTTPRequestHandler.not_modified_count == not_modified_count + 1
+        assert sorted(path.suffix for path in tmp_path.iterdir()) == [".body", ".json"]
+
+    def test_response_without_validators_not_cached(self, http_server_url, tmp_path, monkeypatch):
+        monkeypatch.setattr(YandexWeatherAPI, "http_cache", HTTPDiskCache(cache_dir=tmp_path))
+        url = f"{http_server_url}/moscow.json"
+
+        YandexWeatherAPI.get_forecasting(url)
+        assert YandexWeatherAPI.http_cache.get(url) is None
+
+
+class TestCompressedResponses:
+    @pytest.mark.parametrize("path", ["/gzip.json", "/deflate.json"])
+    def test_get_forecasting(self, http_server_url, path):
+        assert YandexWeatherAPI.get_forecasting(f"{http_server_url}{path}") == WEATHER_EXAMPLE
+
+    def test_raw_deflate_stream(self):
+        compressor = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+        raw_deflate = compressor.compress(b'{"data": 1}') + compressor.flush()
+        decoder = StreamDecoder("deflate")
+        assert decoder.decompress(raw_deflate) + decoder.flush() == b'{"data": 1}'
+
+
+class TestSaveForecasting:
+    def test_save_forecasting(self, http_server_url, tmp_path):
+        path = tmp_path / "MOSCOW.json"
+        YandexWeatherAPI.save_forecasting(f"{http_server_url}/gzip.json", path, validate=True)
+        assert json.loads(path.read_bytes()) == WEATHER_EXAMPLE
+
+    def test_save_invalid_forecasting(self, http_server_url, tmp_path):
+        path = tmp_path / "MOSCOW.json"
+        with pytest.raises(InvalidResponseDataError):
+            YandexWeatherAPI.save_forecasting(f"{http_server_url}/bad.json", path, validate=True)
+        assert list(tmp_path.iterdir()) == []
+
+    def test_save_not_modified_forecasting(self, http_server_url, tmp_path, monkeypatch):
+        monkeypatch.setattr(YandexWeatherAPI, "http_cache", HTTPDiskCache(cache_dir=tmp_path / "cache"))
+        url = f"{http_server_url}/etag.json"
+        YandexWeatherAPI.save_forecasting(url, tmp_path / "first.json")
+        YandexWeatherAPI.save_forecasting(url, tmp_path / "second.json")
+        assert (tmp_path / "first.json").read_bytes() == (tmp_path / "second.json").read_bytes()
+
+
+class TestLatencyMetrics:
+    def test_phases_recorded(self, http_server_url):
+        latency_recorder.clear()
+        YandexWeatherAPI.pool_manager.clear()
+        with request_label("MOSCOW"):
+            YandexWeatherAPI.get_forecasting(f"{http_server_url}/moscow.json")
+
+        for phase in (DNS_PHASE, CONNECT_PHASE, TTFB_PHASE, BODY_READ_PHASE, JSON_DECODE_PHASE, TOTAL_PHASE):
+            assert latency_recorder.get_histogram(phase, label="MOSCOW").count == 1
+            assert latency_recorder.get_histogram(phase).count == 1
+        assert "[MOSCOW]" in latency_recorder.dump()
+
+    def test_labels_limited(self):
+        recorder = LatencyRecorder(max_labels=2)
+        timings = RequestTimings(phases={TOTAL_PHASE: 0.01})
+        for label in ("MOSCOW", "PARIS", "LONDON", "BERLIN", "MOSCOW"):
+            recorder.record(label, timings)
+
+        assert recorder.get_histogram(TOTAL_PHASE, label="MOSCOW").count == 2
+        assert recorder.get_histogram(TOTAL_PHASE, label="LONDON") is None
+        assert recorder.get_histogram(TOTAL_PHASE, label=OTHER_LABEL).count == 2
+        assert recorder.get_histogram(TOTAL_PHASE).count == 5
+        assert "[other requests]" in recorder.dump()
+
+    def test_reused_connection_skips_connect_phases(self, http_server_url):
+        url = f"{http_server_url}/moscow.json"
+        YandexWeatherAPI.get_forecasting(url)
+        latency_recorder.clear()
+        YandexWeatherAPI.get_forecasting(url)
+
+        assert latency_recorder.get_histogram(CONNECT_PHASE, label=url) is None
+        assert latency_recorder.get_histogram(TTFB_PHASE, label=url).count == 1
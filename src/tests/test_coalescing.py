@@ -0,0 +1,95 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from external.coalescing import SingleFlight, AsyncSingleFlight, CoalescingForecastWeatherSource
+from .mocks import WEATHER_EXAMPLE
+
+
+class BlockingCountingWeatherSource:
+    """Fetch signals started and waits for release, so the test knows it is in flight"""
+
+    def __init__(self):
+        self.calls = 0
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self._lock = threading.Lock()
+
+    def get_weather_by_city(self, city_name):
+        with self._lock:
+            self.calls += 1
+        self.started.set()
+        self.release.wait(timeout=10)
+        return WEATHER_EXAMPLE
+
+
+class CountingLock:
+    """Lock which lets waiting for a count of acquisitions"""
+
+    def __init__(self):
+        self.acquisitions = 0
+        self._lock = threading.Lock()
+        self._condition = threading.Condition()
+
+    def __enter__(self):
+        self._lock.acquire()
+        with self._condition:
+            self.acquisitions += 1
+            self._condition.notify_all()
+
+    def __exit__(self, *exc_info):
+        self._lock.release()
+
+    def wait_for(self, acquisitions):
+        with self._condition:
+            return self._condition.wait_for(lambda: self.acquisitions >= acquisitions, timeout=10)
+
+
+class TestSingleFlight:
+    def test_concurrent_calls_coalesced(self):
+        source = BlockingCountingWeatherSource()
+        coalescing_source = CoalescingForecastWeatherSource(source=source)
+        lock = CountingLock()
+        coalescing_source._single_flight._lock = lock
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            leader = pool.submit(coalescing_source.get_weather_by_city, "MOSCOW")
+            assert source.started.wait(timeout=10)
+            followers = [pool.submit(coalescing_source.get_weather_by_city, "MOSCOW") for _ in range(7)]
+            # Every follower has taken the lock in SingleFlight.do while the leader is blocked in fetch
+            assert lock.wait_for(acquisitions=8)
+            source.release.set()
+            results = [future.result() for future in [leader, *followers]]
+
+        assert all(item == WEATHER_EXAMPLE for item in results)
+        assert source.calls == 1
+
+    def test_error_shared_and_forgotten(self):
+        single_flight = SingleFlight()
+
+        def _fail():
+            raise ValueError("error")
+
+        with pytest.raises(ValueError):
+            single_flight.do("key", _fail)
+        assert single_flight.do("key", lambda: "ok") == "ok"
+
+
+class TestAsyncSingleFlight:
+    def test_concurrent_awaits_coalesced(self):
+        calls = 0
+
+        async def _fetch():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return WEATHER_EXAMPLE
+
+        async def _main():
+            single_flight = AsyncSingleFlight()
+            return await asyncio.gather(*(single_flight.do("MOSCOW", _fetch) for _ in range(10)))
+
+        results = asyncio.run(_main())
+        assert all(item == WEATHER_EXAMPLE for item in results)
+        assert calls == 1
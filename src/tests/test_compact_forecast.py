@@ -0,0 +1,55 @@
+import pickle
+from array import array
+
+import pytest
+
+from external.analyzer import analyze_json
+from external.compact_forecast import CONDITION_TYPECODE, CompactForecast, get_code_typecode
+from external.conditions import condition_registry
+from .mocks import WEATHER_EXAMPLE
+from .test_vectorized_analyzer import EDGE_CASES_EXAMPLE
+
+
+class TestCompactForecast:
+    def test_day_views(self):
+        forecast = CompactForecast.from_json(EDGE_CASES_EXAMPLE)
+        day = forecast[3]
+
+        assert len(forecast) == 5
+        assert forecast[0].is_empty
+        assert day.date == "2022-05-28"
+        assert list(day.hours) == [9, 12, 19, 20]
+        assert list(day.temperatures) == [2.7, 2, -2.7, 40]
+        assert day.conditions == [None, "overcast", "rain", "clear"]
+        assert forecast[-1].date == "2022-05-29"
+        with pytest.raises(IndexError):
+            forecast[5]
+
+    @pytest.mark.parametrize("data", [WEATHER_EXAMPLE, EDGE_CASES_EXAMPLE])
+    def test_to_json_keeps_analysis(self, data):
+        assert analyze_json(CompactForecast.from_json(data).to_json()) == analyze_json(data)
+
+    def test_pickle_is_smaller(self):
+        forecast = CompactForecast.from_json(WEATHER_EXAMPLE)
+        payload = pickle.dumps(forecast)
+
+        assert pickle.loads(payload).to_json() == forecast.to_json()
+        assert len(payload) * 3 < len(pickle.dumps(WEATHER_EXAMPLE))
+        assert forecast.nbytes > 0
+
+    def test_unknown_conditions_kept(self):
+        data = {"forecasts": [{"date": "2022-05-26", "hours": [
+            {"hour": "10", "temp": 1, "condition": "meteor-shower"},
+            {"hour": "11", "temp": 2, "condition": "clear"},
+        ]}]}
+        forecast = CompactForecast.from_json(data)
+
+        assert forecast[0].conditions == ["meteor-shower", "clear"]
+        assert forecast.to_json() == data
+
+    def test_condition_typecode_holds_registry(self):
+        assert get_code_typecode(256) == "B"
+        assert get_code_typecode(257) == "H"
+        assert get_code_typecode(1 << 16) == "H"
+        assert get_code_typecode((1 << 16) + 1) in ("I", "L")
+        array(CONDITION_TYPECODE, [len(condition_registry) - 1])
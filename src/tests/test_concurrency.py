@@ -0,0 +1,74 @@
+import pytest
+
+from external.concurrency import AdaptiveConcurrencyLimiter, report_request_error
+from external.exceptions import ConnectionApiError, HTTPStatusError
+
+
+class TestAdaptiveConcurrencyLimiter:
+    def test_additive_increase(self):
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=2, max_limit=3, latency_threshold=10)
+        for _ in range(3):
+            with limiter.slot():
+                pass
+        assert limiter.limit == 3
+
+        for _ in range(10):
+            with limiter.slot():
+                pass
+        assert limiter.limit == 3
+        assert limiter.metrics.successes == 13
+
+    def test_multiplicative_decrease(self):
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=16, min_limit=2)
+        with limiter.slot() as slot:
+            slot.mark_failed()
+        assert limiter.limit == 8
+
+        for _ in range(5):
+            with pytest.raises(TimeoutError):
+                with limiter.slot():
+                    raise TimeoutError
+        assert limiter.limit == 2
+        assert limiter.metrics.failures == 6
+
+    def test_slow_request_is_failure(self):
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=4, latency_threshold=0)
+        limiter.acquire()
+        limiter.release(latency=0.1)
+        assert limiter.limit == 2
+        assert limiter.metrics.in_flight == 0
+
+    def test_decrease_once_per_window(self):
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=8)
+        with limiter.slot() as first_slot, limiter.slot() as second_slot:
+            first_slot.mark_failed()
+            second_slot.mark_failed()
+        assert limiter.limit == 4
+        assert limiter.metrics.failures == 2
+
+        with limiter.slot() as slot:
+            slot.mark_failed()
+        assert limiter.limit == 2
+
+    @pytest.mark.parametrize("error", [HTTPStatusError(status=404, reason="Not Found"), KeyError("city")])
+    def test_not_overload_error(self, error):
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=4, latency_threshold=10)
+        with pytest.raises(type(error)):
+            with limiter.slot():
+                raise error
+        with limiter.slot():
+            report_request_error(error)
+        assert limiter.metrics.failures == 0
+
+    @pytest.mark.parametrize("error", [
+        HTTPStatusError(status=503, reason="Service Unavailable"),
+        ConnectionApiError(),
+        TimeoutError(),
+    ])
+    def test_reported_overload_error(self, error):
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=4)
+        with limiter.slot():
+            report_request_error(error)
+        report_request_error(error)
+        assert limiter.limit == 2
+        assert limiter.metrics.failures == 1
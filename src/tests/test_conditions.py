@@ -0,0 +1,36 @@
+import pytest
+
+from external.analyzer import DEFAULT_ANALYSIS_POLICY, INPUT_DAY_SUITABLE_CONDITIONS
+from external.conditions import (CONDITIONS_PATH, KNOWN_CONDITIONS, ConditionRegistry, condition_registry,
+                                 load_conditions)
+
+
+class TestConditionRegistry:
+    def test_known_conditions_match_file(self):
+        assert tuple(load_conditions(CONDITIONS_PATH)) == KNOWN_CONDITIONS
+        assert condition_registry.names == (None, *KNOWN_CONDITIONS)
+
+    def test_codes(self):
+        registry = ConditionRegistry(["clear", "rain"])
+        assert registry.get_code("clear") == 1
+        assert registry.get_code("rain") == 2
+        assert registry.get_name(2) == "rain"
+        assert registry.get_code(None) == ConditionRegistry.UNKNOWN_CODE
+        assert registry.get_code("meteor-shower") == ConditionRegistry.UNKNOWN_CODE
+        assert registry.get_name(ConditionRegistry.UNKNOWN_CODE) is None
+
+    def test_mask(self):
+        registry = ConditionRegistry(["clear", "cloudy", "rain"])
+        mask = registry.get_mask(["clear", "rain"])
+        assert [registry.is_in_mask(code, mask) for code in range(len(registry))] == [False, True, False, True]
+        assert registry.get_lookup_table(mask) == b"\x00\x01\x00\x01"
+
+    def test_mask_unknown_condition(self):
+        with pytest.raises(ValueError):
+            ConditionRegistry(["clear"]).get_mask(["clear", "rain"])
+
+    def test_suitable_conditions_mask(self):
+        for condition in KNOWN_CONDITIONS:
+            code = condition_registry.get_code(condition)
+            assert DEFAULT_ANALYSIS_POLICY.is_cond_suitable(code) == (condition in INPUT_DAY_SUITABLE_CONDITIONS)
+        assert not DEFAULT_ANALYSIS_POLICY.is_cond_suitable(ConditionRegistry.UNKNOWN_CODE)
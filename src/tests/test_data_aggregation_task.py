@@ -1,6 +1,6 @@
 import pandas as pd
 
-from .mocks import EXAMPLE_DATA_FOR_AGGREGATE
+from .mocks import ANALYZE_EXAMPLE, EXAMPLE_DATA_FOR_AGGREGATE
 
 
 class TestDataAggregationTask:
@@ -15,6 +15,13 @@ class TestDataAggregationTask:
         assert indexes is not None
         assert indexes[0][0] == "Moscow"
 
+    def test_aggregate_analyzed_data_in_memory(self, data_aggregation_task_instance):
+        file_dataframes = data_aggregation_task_instance.aggregate_analyze_data()
+        city_dataframes = data_aggregation_task_instance.aggregate_analyzed_data([("moscow", ANALYZE_EXAMPLE)])
+
+        assert len(city_dataframes) == 1
+        assert city_dataframes[0].equals(file_dataframes[0])
+
     def test_save_aggregated_data(self, data_aggregation_task_instance):
         data_aggregation_task_instance.save_aggregated_data(aggregated_data=EXAMPLE_DATA_FOR_AGGREGATE)
         assert data_aggregation_task_instance.output_csv_path.exists()
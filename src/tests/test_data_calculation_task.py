@@ -1,4 +1,15 @@
+import json
 import os
+from dataclasses import replace
+
+import pytest
+
+from external.analyzer import AnalysisPolicy, analyze_json
+from external.schemas import Weather
+from tasks import AnalyzeEngine
+from .mocks import WEATHER_EXAMPLE
+
+EVENING_POLICY = AnalysisPolicy(hours_start=17, hours_end=23, suitable_conditions=("clear", "partly-cloudy"))
 
 
 class TestDataCalculationTask:
@@ -8,3 +19,73 @@ class TestDataCalculationTask:
         assert len(os.listdir(data_calculation_task_instance.input_weather_data_dir)) == 1
         assert len(os.listdir(data_calculation_task_instance.output_analyze_dir)) == 1
         assert set(os.listdir(data_calculation_task_instance.output_analyze_dir)) == {"MOSCOW.json"}
+
+    def test_calculate_weather_in_subprocess(self, data_calculation_task_instance, monkeypatch):
+        output_path = data_calculation_task_instance.output_analyze_dir / "MOSCOW.json"
+        output_path.unlink(missing_ok=True)
+        monkeypatch.setattr(data_calculation_task_instance, "engine", AnalyzeEngine.SUBPROCESS)
+        data_calculation_task_instance.calculate_weather()
+
+        assert set(os.listdir(data_calculation_task_instance.output_analyze_dir)) == {"MOSCOW.json"}
+        assert json.loads(output_path.read_text(encoding="utf8"))["days"]
+
+    def test_iter_analyzed_weather(self, data_calculation_task_instance):
+        results = list(data_calculation_task_instance.iter_analyzed_weather())
+
+        assert [path.name for path, _ in results] == ["MOSCOW.json"]
+        assert results[0][1]["days"]
+
+    def test_analyze_json_does_not_share_result(self):
+        first = analyze_json(WEATHER_EXAMPLE)
+        second = analyze_json(WEATHER_EXAMPLE)
+        second["days"].clear()
+
+        assert first["days"]
+        assert first is not second
+
+    def test_iter_analyzed_weather_data(self, data_calculation_task_instance):
+        weather_data = [Weather(city="MOSCOW", weather_data=WEATHER_EXAMPLE)]
+        results = list(data_calculation_task_instance.iter_analyzed_weather_data(weather_data))
+
+        assert results == [("MOSCOW", analyze_json(WEATHER_EXAMPLE))]
+
+    def test_iter_analyzed_weather_data_vectorized(self, data_calculation_task_instance, monkeypatch):
+        monkeypatch.setattr(data_calculation_task_instance, "engine", AnalyzeEngine.VECTORIZED)
+        weather_data = [Weather(city="MOSCOW", weather_data=WEATHER_EXAMPLE)]
+        results = list(data_calculation_task_instance.iter_analyzed_weather_data(weather_data))
+
+        assert results == [("MOSCOW", analyze_json(WEATHER_EXAMPLE))]
+
+    @pytest.mark.parametrize("engine", [AnalyzeEngine.IN_PROCESS, AnalyzeEngine.VECTORIZED])
+    def test_policy_in_pool_workers(self, data_calculation_task_instance, engine):
+        weather_data = [Weather(city="MOSCOW", weather_data=WEATHER_EXAMPLE)]
+        for policy in (AnalysisPolicy(), EVENING_POLICY):
+            task = replace(data_calculation_task_instance, engine=engine, policy=policy)
+
+            assert list(task.iter_analyzed_weather_data(weather_data)) == [
+                ("MOSCOW", analyze_json(WEATHER_EXAMPLE, policy=policy))
+            ]
+            assert [data for _, data in task.iter_analyzed_weather()] == [analyze_json(WEATHER_EXAMPLE, policy=policy)]
+
+    def test_policy_in_subprocess(self, data_calculation_task_instance):
+        task = replace(data_calculation_task_instance, engine=AnalyzeEngine.SUBPROCESS, policy=EVENING_POLICY)
+        task.calculate_weather()
+
+        result = json.loads((task.output_analyze_dir / "MOSCOW.json").read_text())
+        assert result == analyze_json(WEATHER_EXAMPLE, policy=EVENING_POLICY)
+
+    def test_vectorized_batches(self, data_calculation_task_instance):
+        bad_data = {"forecasts": [{"date": "2022-05-26", "hours": [{"hour": "10"}]}]}
+        bad_weather = Weather(city="BAD", weather_data=bad_data)
+        weather_data = [Weather(city=f"CITY{index}", weather_data=WEATHER_EXAMPLE) for index in range(5)]
+        task = replace(data_calculation_task_instance, engine=AnalyzeEngine.VECTORIZED, batch_size=2)
+
+        results = list(task.iter_analyzed_weather_data([bad_weather, *weather_data]))
+
+        assert sorted(results) == sorted((weather.city, analyze_json(WEATHER_EXAMPLE)) for weather in weather_data)
+
+    def test_batch_size_only_for_batch_engines(self, data_calculation_task_instance):
+        task = replace(data_calculation_task_instance, batch_size=8)
+
+        assert replace(task, engine=AnalyzeEngine.IN_PROCESS).get_batch_size() == 1
+        assert replace(task, engine=AnalyzeEngine.VECTORIZED).get_batch_size() == 8
@@ -1,9 +1,18 @@
+import json
 import os
 from collections.abc import Sequence
 
+import pytest
+
+from external.backpressure import InFlightLimiter
+from external.catalog import CityRecord, city_names
+from external.concurrency import AdaptiveConcurrencyLimiter
+from external.forecasting import YandexWeatherAPIForecastWeatherSource
 from external.schemas import Weather
+from external.utils import city_catalog
+from tasks import DataFetchingTask
 from .conftest import CITIES_FOR_TEST
-from .mocks import WEATHER_EXAMPLE
+from .mocks import WEATHER_EXAMPLE, FailingParisWeatherSource, MockedRawWeatherSource, MockedWeatherSource
 
 
 class TestDataFetchingTask:
@@ -25,3 +34,79 @@ class TestDataFetchingTask:
 
         assert len(os.listdir(data_fetching_task_instance.output_weather_data_dir)) == 2
         assert set(os.listdir(data_fetching_task_instance.output_weather_data_dir)) == target_json_file_names
+
+    def test_fetching_raw_weather_data(self, data_fetching_task_instance, monkeypatch):
+        monkeypatch.setattr(data_fetching_task_instance, "weather_source", MockedRawWeatherSource)
+        paths = data_fetching_task_instance.fetching_raw_weather_data()
+
+        assert {path.name for path in paths} == {f"{city}.json" for city in CITIES_FOR_TEST.keys()}
+        assert all(json.loads(path.read_bytes()) == WEATHER_EXAMPLE for path in paths)
+
+    def test_iter_weather_data(self, data_fetching_task_instance):
+        weather_data = list(data_fetching_task_instance.iter_weather_data())
+
+        assert {weather.city for weather in weather_data} == set(CITIES_FOR_TEST.keys())
+        assert all(weather.weather_data == WEATHER_EXAMPLE for weather in weather_data)
+
+    def test_iter_saved_weather_data(self, data_fetching_task_instance):
+        paths = list(data_fetching_task_instance.iter_saved_weather_data())
+
+        assert {path.name for path in paths} == {f"{city}.json" for city in CITIES_FOR_TEST.keys()}
+        assert all(path.exists() for path in paths)
+
+    def test_fetching_weather_data_with_concurrency_limiter(self, data_fetching_task_instance, monkeypatch):
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=1)
+        monkeypatch.setattr(data_fetching_task_instance, "concurrency_limiter", limiter)
+        weather_data = data_fetching_task_instance.fetching_weather_data()
+
+        assert len(weather_data) == 2
+        assert limiter.metrics.successes == 2
+
+    def test_unknown_city_is_not_overload(self, data_fetching_task_instance, monkeypatch):
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=2)
+        monkeypatch.setattr(data_fetching_task_instance, "concurrency_limiter", limiter)
+        monkeypatch.setattr(data_fetching_task_instance, "weather_source", YandexWeatherAPIForecastWeatherSource())
+        monkeypatch.setattr(data_fetching_task_instance, "cities", ["ATLANTIS"])
+
+        assert data_fetching_task_instance.fetching_weather_data() == [Weather(city="ATLANTIS", weather_data=None)]
+        assert limiter.metrics.failures == 0
+        assert limiter.limit == 2
+
+    def test_default_cities_fetched_again(self, tmp_path):
+        fetching_task = DataFetchingTask(output_weather_data_dir=tmp_path, weather_source=MockedWeatherSource)
+
+        first_weather_data = fetching_task.fetching_weather_data()
+        assert len(first_weather_data) == len(list(city_catalog))
+        assert fetching_task.fetching_weather_data() == first_weather_data
+
+    def test_iter_weather_data_from_city_iterator(self, data_fetching_task_instance, monkeypatch):
+        records = [CityRecord(name=name, url=url) for name, url in CITIES_FOR_TEST.items()]
+        monkeypatch.setattr(data_fetching_task_instance, "cities", city_names(records))
+        weather_data = list(data_fetching_task_instance.iter_weather_data())
+
+        assert {weather.city for weather in weather_data} == set(CITIES_FOR_TEST.keys())
+
+    def test_in_flight_slot_released_on_fetch_error(self, data_fetching_task_instance, monkeypatch):
+        limiter = InFlightLimiter(max_objects=1, max_bytes=None)
+        monkeypatch.setattr(data_fetching_task_instance, "in_flight_limiter", limiter)
+        monkeypatch.setattr(data_fetching_task_instance, "weather_source", FailingParisWeatherSource)
+
+        with pytest.raises(RuntimeError, match="fetch is broken"):
+            for _ in data_fetching_task_instance.iter_weather_data():
+                limiter.release()
+        assert limiter.usage.objects == 0
+
+        monkeypatch.setattr(data_fetching_task_instance, "weather_source", MockedWeatherSource)
+        for _ in data_fetching_task_instance.iter_weather_data():
+            limiter.release()
+        assert limiter.usage.objects == 0
+
+    def test_in_flight_slots_released_when_iteration_stops(self, data_fetching_task_instance, monkeypatch):
+        limiter = InFlightLimiter(max_objects=None, max_bytes=None)
+        monkeypatch.setattr(data_fetching_task_instance, "in_flight_limiter", limiter)
+        weather_data = data_fetching_task_instance.iter_weather_data()
+
+        next(weather_data)
+        weather_data.close()
+
+        assert limiter.usage.objects == 1
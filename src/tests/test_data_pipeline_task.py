@@ -0,0 +1,153 @@
+import os
+import time
+from pathlib import Path
+
+import pytest
+
+from external.backpressure import InFlightLimiter
+from external.exceptions import PipelineError
+from external.json_stream import select_json
+from external.schemas import CompactWeather, Weather
+from tasks import AnalyzeEngine, DataAggregationTask, DataCalculationTask, DataFetchingTask, DataPipelineTask
+from .mocks import (WEATHER_EXAMPLE, CITIES_FOR_TEST, BlockingWeatherSource, FailingParisWeatherSource,
+                    MockedRawWeatherSource, MockedWeatherSource)
+
+
+class FailingRawWeatherSource(MockedRawWeatherSource):
+    @classmethod
+    def save_weather_by_city(cls, city_name: str, path: Path, validate: bool = False) -> bool:
+        raise RuntimeError("fetch is broken")
+
+
+@pytest.fixture
+def data_pipeline_task_instance(tmp_path):
+    weather_data_dir = tmp_path / "weather_data"
+    analyze_dir = tmp_path / "analyze_data"
+    weather_data_dir.mkdir()
+    analyze_dir.mkdir()
+    return DataPipelineTask(
+        fetching_task=DataFetchingTask(
+            output_weather_data_dir=weather_data_dir,
+            cities=CITIES_FOR_TEST,
+            weather_source=MockedRawWeatherSource,
+        ),
+        calculation_task=DataCalculationTask(
+            input_weather_data_dir=weather_data_dir,
+            output_analyze_dir=analyze_dir,
+            processes_count=2,
+        ),
+        aggregation_task=DataAggregationTask(input_analyze_dir=analyze_dir),
+        queue_maxsize=1,
+    )
+
+
+class TestDataPipelineTask:
+    def test_run(self, data_pipeline_task_instance):
+        aggregated_data = data_pipeline_task_instance.run()
+        analyze_dir = data_pipeline_task_instance.calculation_task.output_analyze_dir
+
+        assert {df.index[0][0] for df in aggregated_data} == {city.capitalize() for city in CITIES_FOR_TEST}
+        assert set(os.listdir(analyze_dir)) == {f"{city}.json" for city in CITIES_FOR_TEST}
+
+    def test_run_matches_stage_by_stage(self, data_pipeline_task_instance):
+        aggregated_data = data_pipeline_task_instance.run()
+        file_aggregated_data = data_pipeline_task_instance.aggregation_task.aggregate_analyze_data()
+
+        def by_city(dataframes):
+            return {df.index[0][0]: df for df in dataframes}
+
+        pipeline_frames, file_frames = by_city(aggregated_data), by_city(file_aggregated_data)
+        assert pipeline_frames.keys() == file_frames.keys()
+        assert all(pipeline_frames[city].equals(file_frames[city]) for city in pipeline_frames)
+
+    def test_run_in_memory(self, data_pipeline_task_instance, monkeypatch):
+        file_aggregated_data = data_pipeline_task_instance.run()
+        fetching_task = data_pipeline_task_instance.fetching_task
+        calculation_task = data_pipeline_task_instance.calculation_task
+        for directory in (fetching_task.output_weather_data_dir, calculation_task.output_analyze_dir):
+            for name in os.listdir(directory):
+                os.remove(directory / name)
+        monkeypatch.setattr(fetching_task, "weather_source", MockedWeatherSource)
+        monkeypatch.setattr(data_pipeline_task_instance, "in_memory", True)
+        monkeypatch.setattr(data_pipeline_task_instance, "save_weather_data", False)
+        monkeypatch.setattr(data_pipeline_task_instance, "save_analyze_data", False)
+
+        aggregated_data = data_pipeline_task_instance.run()
+
+        assert not os.listdir(fetching_task.output_weather_data_dir)
+        assert not os.listdir(calculation_task.output_analyze_dir)
+        assert sorted(df.to_json() for df in aggregated_data) == sorted(df.to_json() for df in file_aggregated_data)
+
+    def test_run_with_in_flight_limit(self, data_pipeline_task_instance, monkeypatch):
+        limiter = InFlightLimiter(max_objects=1, max_bytes=None)
+        monkeypatch.setattr(data_pipeline_task_instance, "in_flight_limiter", limiter)
+        monkeypatch.setattr(data_pipeline_task_instance.fetching_task, "weather_source", MockedWeatherSource)
+        monkeypatch.setattr(data_pipeline_task_instance, "in_memory", True)
+
+        aggregated_data = data_pipeline_task_instance.run()
+
+        assert len(aggregated_data) == len(CITIES_FOR_TEST)
+        assert limiter.usage.objects == 0
+        assert limiter.usage.bytes == 0
+        assert limiter.usage.peak_objects == 1
+        assert "sent to analysis" in data_pipeline_task_instance.memory_report()
+
+    def test_fetch_error_propagates(self, data_pipeline_task_instance, monkeypatch):
+        monkeypatch.setattr(data_pipeline_task_instance.fetching_task, "weather_source", FailingRawWeatherSource)
+
+        with pytest.raises(PipelineError, match="fetch is broken"):
+            data_pipeline_task_instance.run()
+
+    def test_fetch_error_propagates_with_in_flight_limit(self, data_pipeline_task_instance, monkeypatch):
+        limiter = InFlightLimiter(max_objects=1, max_bytes=None)
+        monkeypatch.setattr(data_pipeline_task_instance, "in_flight_limiter", limiter)
+        monkeypatch.setattr(data_pipeline_task_instance.fetching_task, "weather_source", FailingRawWeatherSource)
+
+        with pytest.raises(PipelineError, match="fetch is broken"):
+            data_pipeline_task_instance.run()
+
+    def test_in_flight_limiter_reused_after_fetch_error(self, data_pipeline_task_instance, monkeypatch):
+        limiter = InFlightLimiter(max_objects=1, max_bytes=None)
+        monkeypatch.setattr(data_pipeline_task_instance, "in_flight_limiter", limiter)
+        monkeypatch.setattr(data_pipeline_task_instance, "in_memory", True)
+        monkeypatch.setattr(data_pipeline_task_instance.fetching_task, "weather_source", FailingParisWeatherSource)
+
+        with pytest.raises(PipelineError, match="fetch is broken"):
+            data_pipeline_task_instance.run()
+        assert limiter.usage.objects == 0
+
+        monkeypatch.setattr(data_pipeline_task_instance.fetching_task, "weather_source", MockedWeatherSource)
+        assert len(data_pipeline_task_instance.run()) == len(CITIES_FOR_TEST)
+        assert limiter.usage.objects == 0
+
+    def test_forecasts_compacted_only_for_compact_engine(self, data_pipeline_task_instance, monkeypatch):
+        weather = Weather(city="MOSCOW", weather_data=WEATHER_EXAMPLE)
+
+        item = data_pipeline_task_instance._to_analysis_item(weather)
+        assert isinstance(item, Weather)
+        assert item.weather_data == select_json(WEATHER_EXAMPLE)
+        monkeypatch.setattr(data_pipeline_task_instance.calculation_task, "engine", AnalyzeEngine.VECTORIZED)
+        assert isinstance(data_pipeline_task_instance._to_analysis_item(weather), CompactWeather)
+
+    def test_run_in_memory_vectorized(self, data_pipeline_task_instance, monkeypatch):
+        file_aggregated_data = data_pipeline_task_instance.run()
+        monkeypatch.setattr(data_pipeline_task_instance.fetching_task, "weather_source", MockedWeatherSource)
+        monkeypatch.setattr(data_pipeline_task_instance.calculation_task, "engine", AnalyzeEngine.VECTORIZED)
+        monkeypatch.setattr(data_pipeline_task_instance, "in_memory", True)
+
+        aggregated_data = data_pipeline_task_instance.run()
+
+        assert sorted(df.to_json() for df in aggregated_data) == sorted(df.to_json() for df in file_aggregated_data)
+
+    def test_fetch_error_does_not_wait_for_running_requests(self, data_pipeline_task_instance, monkeypatch):
+        monkeypatch.setattr(data_pipeline_task_instance, "in_memory", True)
+        monkeypatch.setattr(data_pipeline_task_instance.fetching_task, "weather_source", BlockingWeatherSource)
+        BlockingWeatherSource.release.clear()
+        start = time.monotonic()
+
+        try:
+            with pytest.raises(PipelineError, match="fetch is broken"):
+                data_pipeline_task_instance.run()
+            assert time.monotonic() - start < 5
+        finally:
+            BlockingWeatherSource.release.set()
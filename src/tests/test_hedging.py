@@ -0,0 +1,37 @@
+import json
+import time
+
+from external.forecasting import JsonFileForecastWeatherSource
+from external.hedging import HedgedForecastWeatherSource
+from .mocks import WEATHER_EXAMPLE
+
+
+class SlowWeatherSource:
+    def __init__(self, delay, weather_data):
+        self.delay = delay
+        self.weather_data = weather_data
+
+    def get_weather_by_city(self, city_name):
+        time.sleep(self.delay)
+        return self.weather_data
+
+
+class TestHedgedForecastWeatherSource:
+    def test_fast_hedge_wins(self):
+        source = HedgedForecastWeatherSource(
+            sources=[SlowWeatherSource(1, {"source": "slow"}), SlowWeatherSource(0, {"source": "fast"})],
+            initial_delay=0.01,
+        )
+        start = time.monotonic()
+        assert source.get_weather_by_city("MOSCOW") == {"source": "fast"}
+        assert time.monotonic() - start < 0.5
+        source.close()
+
+    def test_failed_source_falls_back(self, tmp_path):
+        (tmp_path / "MOSCOW.json").write_text(json.dumps(WEATHER_EXAMPLE), encoding="utf8")
+        source = HedgedForecastWeatherSource(
+            sources=[SlowWeatherSource(0, None), JsonFileForecastWeatherSource(input_dir=tmp_path)],
+        )
+        assert source.get_weather_by_city("MOSCOW") == WEATHER_EXAMPLE
+        assert source.get_weather_by_city("PARIS") is None
+        source.close()
@@ -0,0 +1,52 @@
+import json
+from json import JSONDecodeError
+
+import pytest
+
+from external.json_stream import extract_json, select_json
+from .mocks import WEATHER_EXAMPLE
+
+RAW_WEATHER_EXAMPLE = json.dumps(WEATHER_EXAMPLE, ensure_ascii=False, indent=4).encode("utf8")
+
+
+def _split(data: bytes, size: int) -> list[bytes]:
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+class TestExtractJSON:
+    @pytest.mark.parametrize("chunk_size", [1, 7, 1024, len(RAW_WEATHER_EXAMPLE)])
+    def test_extract_forecasts(self, chunk_size):
+        target = {
+            "forecasts": [
+                {
+                    "date": day["date"],
+                    "hours": [
+                        {"hour": hour["hour"], "temp": hour["temp"], "condition": hour["condition"]}
+                        for hour in day["hours"]
+                    ],
+                }
+                for day in WEATHER_EXAMPLE["forecasts"]
+            ]
+        }
+        assert extract_json(_split(RAW_WEATHER_EXAMPLE, chunk_size)) == target
+
+    @pytest.mark.parametrize("chunk_size", [1, 3, 1024])
+    def test_extract_whole_document(self, chunk_size):
+        document = '{"a": [1, -2.5e3, {"b": "x\\\\\\"y"}], "c": null, "d": true, "e": "Привет"}'
+        assert extract_json(_split(document.encode("utf8"), chunk_size), spec=True) == json.loads(document)
+
+    @pytest.mark.parametrize("document", [b'{"a":', b'{"a" 1}', b"[1 2]", b"{}{}"])
+    def test_extract_invalid_document(self, document):
+        with pytest.raises(JSONDecodeError):
+            extract_json([document], spec=True)
+
+
+class TestSelectJSON:
+    @pytest.mark.parametrize("data", [
+        WEATHER_EXAMPLE,
+        {"forecasts": [{}, {"date": "2022-05-26", "hours": {"hour": "1"}}, 1, {"hours": [{"hour": "1"}, [], None]}]},
+        {"forecasts": {"date": "2022-05-26"}},
+        [],
+    ])
+    def test_select_json_same_as_extract_json(self, data):
+        assert select_json(data) == extract_json([json.dumps(data).encode("utf8")])
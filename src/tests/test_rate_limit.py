@@ -0,0 +1,56 @@
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from external.rate_limit import TokenBucketRateLimiter, RateLimitedForecastWeatherSource
+from .mocks import MockedWeatherSource, WEATHER_EXAMPLE
+
+
+def _acquire_tokens(limiter, count):
+    for _ in range(count):
+        with limiter:
+            pass
+
+
+class TestTokenBucketRateLimiter:
+    def test_rate(self):
+        limiter = TokenBucketRateLimiter(rate=50, burst=1)
+        start = time.monotonic()
+        _acquire_tokens(limiter, 6)
+        assert time.monotonic() - start >= 0.09
+
+    def test_max_concurrency(self):
+        limiter = TokenBucketRateLimiter(rate=1000, burst=1000, max_concurrency=2)
+        lock = threading.Lock()
+        in_flight = max_in_flight = 0
+
+        def _work(_):
+            nonlocal in_flight, max_in_flight
+            with limiter:
+                with lock:
+                    in_flight += 1
+                    max_in_flight = max(max_in_flight, in_flight)
+                time.sleep(0.01)
+                with lock:
+                    in_flight -= 1
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(_work, range(16)))
+        assert max_in_flight == 2
+
+    def test_shared_between_processes(self):
+        context = multiprocessing.get_context("fork")
+        limiter = TokenBucketRateLimiter(rate=50, burst=1, context=context)
+        processes = [context.Process(target=_acquire_tokens, args=(limiter, 3)) for _ in range(2)]
+        start = time.monotonic()
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        assert time.monotonic() - start >= 0.09
+
+
+def test_rate_limited_source():
+    source = RateLimitedForecastWeatherSource(source=MockedWeatherSource, limiter=TokenBucketRateLimiter())
+    assert source.get_weather_by_city("MOSCOW") == WEATHER_EXAMPLE
@@ -0,0 +1,52 @@
+import pytest
+
+from external.exceptions import CircuitOpenError, ConnectionApiError, HTTPStatusError
+from external.resilience import RetryPolicy, CircuitBreaker, CircuitState
+
+
+class FlakyFunction:
+    def __init__(self, errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return "ok"
+
+
+class TestRetryPolicy:
+    def test_retry_transient_errors(self):
+        func = FlakyFunction([ConnectionApiError("timeout"), HTTPStatusError(status=503, reason="Unavailable")])
+        assert RetryPolicy(attempts=3, backoff_base=0).call(func) == "ok"
+        assert func.calls == 3
+
+    def test_client_error_not_retried(self):
+        func = FlakyFunction([HTTPStatusError(status=404, reason="Not Found")])
+        with pytest.raises(HTTPStatusError):
+            RetryPolicy(attempts=3, backoff_base=0).call(func)
+        assert func.calls == 1
+
+
+class TestCircuitBreaker:
+    def test_open_after_failures(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+        func = FlakyFunction([ConnectionApiError("timeout")] * 2)
+        for _ in range(2):
+            with pytest.raises(ConnectionApiError):
+                breaker.call(func)
+
+        with pytest.raises(CircuitOpenError):
+            breaker.call(func)
+        assert breaker.state == CircuitState.OPEN
+        assert func.calls == 2
+
+    def test_half_open_probe_closes_circuit(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+        func = FlakyFunction([ConnectionApiError("timeout")])
+        with pytest.raises(ConnectionApiError):
+            breaker.call(func)
+
+        assert breaker.call(func) == "ok"
+        assert breaker.state == CircuitState.CLOSED
@@ -0,0 +1,51 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from external import analyzer, vectorized_analyzer
+from .mocks import WEATHER_EXAMPLE
+
+RESPONSE_EXAMPLE_PATH = Path(__file__).parents[2] / "examples" / "response.json"
+EDGE_CASES_EXAMPLE = {
+    "forecasts": [
+        {},
+        {"date": "2022-05-26", "hours": []},
+        {"date": "2022-05-27", "hours": [{"hour": "3", "temp": 1, "condition": "clear"}]},
+        {
+            "date": "2022-05-28",
+            "hours": [
+                {"hour": "19", "temp": -2.7, "condition": "rain"},
+                {"hour": "9", "temp": 2.7},
+                {"hour": "12", "temp": 2, "condition": "overcast"},
+                {"hour": "20", "temp": 40, "condition": "clear"},
+            ],
+        },
+        {"date": "2022-05-29", "hours": [{"hour": "10", "temp": 0, "condition": "cloudy"}]},
+    ]
+}
+
+
+class TestVectorizedAnalyzer:
+    @pytest.mark.parametrize("data", [
+        WEATHER_EXAMPLE,
+        json.loads(RESPONSE_EXAMPLE_PATH.read_text()),
+        EDGE_CASES_EXAMPLE,
+        {"forecasts": []},
+        {},
+    ])
+    def test_same_as_analyzer(self, data):
+        assert vectorized_analyzer.analyze_json(data) == analyzer.analyze_json(data)
+
+    def test_batch(self):
+        data_list = [WEATHER_EXAMPLE, {}, EDGE_CASES_EXAMPLE]
+
+        assert vectorized_analyzer.analyze_json_batch(data_list) == [analyzer.analyze_json(d) for d in data_list]
+
+    def test_missing_temperature(self):
+        data = {"forecasts": [{"date": "2022-05-26", "hours": [{"hour": "10"}]}]}
+
+        with pytest.raises(TypeError):
+            analyzer.analyze_json(data)
+        with pytest.raises(TypeError):
+            vectorized_analyzer.analyze_json(data)